@@ -1,129 +1,112 @@
 import json
-import math
 import os
 
-# 目录路径
+import numpy as np
+
+import instrumentation
+from color_palette import palette_for
+from simvec_model import SimVecChart
+from simvec_storage import load_simvec
+from spatial_index import classify_primitives
+from text_index import TextIndex
+
+# 图表类型与目录路径
+chart_type = 'bar'
 meta_data_dir = 'intermediate_data/cleaned_meta_data/bar'
 simvec_data_dir = 'intermediate_data/cleaned_simvec_data/bar'
 output_dir = 'intermediate_data/extracted_data/bar'
 
-# 确保输出目录存在
-os.makedirs(output_dir, exist_ok=True)
 
-# 7. 将十六进制颜色转换为 RGB 格式
-def hex_to_rgb(hex_color: str) -> tuple:
-    """将十六进制颜色转换为 (R,G,B) 元组格式"""
-    hex_color = hex_color.lstrip('#')
-    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+def extract_bar_data(metadata: dict, simvec_data: SimVecChart) -> list:
+    """根据清洗后的 metadata 与 simvec 列式数据计算柱状图数据"""
+    # 3. 每张图表构建一次文本索引
+    text_index = TextIndex(simvec_data.text)
 
-# 8. 计算颜色的欧氏距离
-def color_distance(rgb1: tuple, rgb2: tuple) -> float:
-    """计算两个 RGB 颜色之间的欧氏距离"""
-    return math.sqrt(sum((c1 - c2) ** 2 for c1, c2 in zip(rgb1, rgb2)))
+    # 4. 提取 X 轴 (分类数据) 和 Y 轴 (定量数据) 刻度
+    x_ticks = metadata['xAxis']['ticks']
+    y_ticks_labels = metadata['yAxis']['ticks']
 
-# 遍历元数据文件夹中的每一个 JSON 文件
-for file_name in os.listdir(meta_data_dir):
-    if not file_name.endswith('.json'):
-        continue
-    
+    # 5. 用所有匹配到的 Y 轴刻度一次拟合像素比例 (scale)
+    y_axis = text_index.fit_axis(y_ticks_labels, 'y')
+
+    # 7. 由图例 (legend) 构建一次调色板 (使用 RGB 格式)
+    palette = palette_for(metadata)
+    if palette.color_to_category is None:
+        print("没有找到 legend 数据，默认直接根据 RGB 颜色进行分类。")
+
+    # 8. 由空间索引排除图例色块与坐标轴 / 网格线, 批量确定其余矩形的分类 (category), 相同颜色只匹配一次
+    marks = classify_primitives(simvec_data, metadata, text_index).marks('rect')
+    categories = palette.classify(simvec_data.rect.rgb[marks])
+
+    # 9. 提取 X 轴刻度和像素坐标的映射关系 (刻度文本居中或右对齐, 取与矩形对齐的一种),
+    #    二分查找一次性把所有矩形归到最近的 X 轴刻度 (SimVec 中矩形的 x 已是中点坐标)
+    rect_positions = simvec_data.rect.position[marks]
+    x_axis = text_index.category_axis(x_ticks, rect_positions[:, 0])
+    x_labels, x_distances = x_axis.assign(rect_positions[:, 0])
+    ambiguous = np.flatnonzero(x_axis.ambiguous(x_distances)).tolist()
+    if ambiguous:
+        print(f"⚠️ {len(ambiguous)} 个矩形距离最近的 X 轴刻度较远, 分类可能不准确: {ambiguous}")
+
+    # 10. 解析每一个矩形（柱状图）的数据值
+    bar_data = []
+    for position, closest_x, category in zip(rect_positions.tolist(), x_labels, categories):
+        y_top = int(position[1])  # 矩形顶部边缘的 Y 坐标
+
+        # 计算 Y 轴数据值
+        y_value = round(y_axis.value(y_top), 1)
+
+        bar_data.append({"x": closest_x, "y": y_value, "category": category})
+
+    return bar_data
+
+
+def process_file(file_name: str):
+    """处理单个图表: 读取 metadata 与 simvec, 计算柱状图数据并写出结果"""
     file_base_name = os.path.splitext(file_name)[0]
     
     # 1. 读取 metadata JSON 文件
     meta_file_path = os.path.join(meta_data_dir, file_name)
-    simvec_file_path = os.path.join(simvec_data_dir, file_name)
-    output_file_path = os.path.join(output_dir, f"{file_base_name}.txt")
     
     print(f"\n正在处理文件: {file_name}")
     
-    with open(meta_file_path, 'r', encoding='utf-8') as f:
-        metadata = json.load(f)
-
-    # 2. 读取 simvec JSON 文件
-    with open(simvec_file_path, 'r', encoding='utf-8') as f:
-        simvec_data = json.load(f)
+    with instrumentation.stage(chart_type, file_base_name, 'load'):
+        with open(meta_file_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
 
-    # 3. 提取 X 轴 (分类数据) 和 Y 轴 (定量数据) 刻度
-    x_ticks = metadata['xAxis']['ticks']
-    y_ticks_labels = metadata['yAxis']['ticks']
+        # 2. 读取 simvec 数据 (优先内存映射二进制格式, 数值列不发生拷贝)
+        simvec_data = load_simvec(os.path.join(simvec_data_dir, file_base_name))
+    instrumentation.record_primitives(chart_type, file_base_name, simvec_data)
+    process_data(file_name, metadata, simvec_data)
 
-    # 4. 计算 Y 轴的像素比例 (scale)
-    y_max_value = int(y_ticks_labels[-1])  # Y 轴数据的最大值
-    y_min_value = int(y_ticks_labels[0])   # Y 轴数据的最小值
-
-    y_max_label = y_ticks_labels[-1]  # 最大值的原始标签
-    y_min_label = y_ticks_labels[0]   # 最小值的原始标签
-
-    # 5. 获取 Y 轴的最大和最小像素坐标
-    y_max_pixel = next(
-        int(text['position'][1]) 
-        for text in simvec_data['text'] 
-        if text['content'] == y_max_label
-    )
-
-    y_min_pixel = next(
-        int(text['position'][1]) 
-        for text in simvec_data['text'] 
-        if text['content'] == y_min_label
-    )
-
-    # 计算 Y 轴的 scale
-    y_scale = (y_max_value - y_min_value) / (y_min_pixel - y_max_pixel)
-
-    # 6. 提取 X 轴刻度和像素坐标的映射关系
-    x_label_positions = {
-        text['content']: int(text['position'][0])
-        for text in simvec_data['text']
-        if text['content'] in x_ticks
-    }
-
-    # 9. 解析图例 (legend) 中颜色到类别的映射关系 (使用 RGB 格式)
-    color_to_category = {}
-    tolerance = 60  # 允许的颜色容差范围
-
-    if 'legend' in metadata and isinstance(metadata['legend'], dict) and 'items' in metadata['legend'] and 'colors' in metadata['legend']:
-        legend_items = metadata['legend']['items']
-        legend_colors = [hex_to_rgb(color) for color in metadata['legend']['colors']]
-        color_to_category = dict(zip(legend_colors, legend_items))
-    else:
-        print("没有找到 legend 数据，默认直接根据 RGB 颜色进行分类。")
-        color_to_category = None  # 标记为无图例模式
-
-    # 10. 解析每一个矩形（柱状图）的数据值
-    bar_data = []
-    for rect in simvec_data['rect']:
-        x_center = int(rect['position'][0])  # 矩形顶部中点的 X 坐标
-        y_top = int(rect['position'][1])     # 矩形顶部边缘的 Y 坐标
-        rect_color = eval(rect['color'])     # 矩形的填充颜色 (转换为 RGB 元组)
 
-        # 计算 X 轴分类（找到最接近的 x_tick）
-        closest_x = min(
-            [(abs(x_center - pos), label) for label, pos in x_label_positions.items()],
-            key=lambda x: x[0]
-        )[1]
+def process_data(file_name: str, metadata: dict, simvec_data: SimVecChart):
+    """由已在内存中的 metadata 与 simvec 计算柱状图数据并写出结果 (pipeline 的内存模式直接调用)"""
+    # 确保输出目录存在
+    os.makedirs(output_dir, exist_ok=True)
 
-        # 计算 Y 轴数据值
-        y_value = y_max_value - (y_top - y_max_pixel) * y_scale
-        y_value = round(y_value, 1)
-
-        # 确定矩形的分类 (category)
-        if color_to_category:
-            category = "Unknown"
-            min_distance = float('inf')
-            
-            for legend_color, legend_category in color_to_category.items():
-                distance = color_distance(rect_color, legend_color)
-                if distance < min_distance and distance <= tolerance:
-                    min_distance = distance
-                    category = legend_category
-        else:
-            category = f"RGB{rect_color}"
+    file_base_name = os.path.splitext(file_name)[0]
+    output_file_path = os.path.join(output_dir, f"{file_base_name}.txt")
 
-        bar_data.append({"x": closest_x, "y": y_value, "category": category})
+    with instrumentation.stage(chart_type, file_base_name, 'extract'):
+        bar_data = extract_bar_data(metadata, simvec_data)
+    instrumentation.record_categories(chart_type, file_base_name, [bar["category"] for bar in bar_data])
 
     # 11. 输出计算结果到文件
-    with open(output_file_path, 'w', encoding='utf-8') as output_file:
-        output_file.write(f"计算出的柱状图数据 ({file_name}):\n")
-        for bar in bar_data:
-            output_file.write(json.dumps(bar, ensure_ascii=False) + ",\n")
-    
+    with instrumentation.stage(chart_type, file_base_name, 'write'):
+        with open(output_file_path, 'w', encoding='utf-8') as output_file:
+            output_file.write(f"计算出的柱状图数据 ({file_name}):\n")
+            for bar in bar_data:
+                output_file.write(json.dumps(bar, ensure_ascii=False) + ",\n")
+
     print(f"已保存到: {output_file_path}")
+
+
+if __name__ == "__main__":
+    # 遍历元数据文件夹中的每一个 JSON 文件
+    try:
+        for file_name in os.listdir(meta_data_dir):
+            if file_name.endswith('.json'):
+                process_file(file_name)
+    finally:
+        # 写出结构化日志与 Prometheus 快照
+        instrumentation.flush("bar_data_extractor")
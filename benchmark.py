@@ -0,0 +1,197 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+import data_formatter
+import pipeline
+import synthetic_charts
+import vega_lite_emitter
+from simvec_model import SimVecChart, box_types, polyline_types
+from simvec_storage import load_simvec, load_simvec_binary, save_simvec_binary
+
+# 依次计时的阶段
+stages = ["tokenize", "store", "load", "metadata", "extract", "vega_lite"]
+
+
+def count_primitives(columns: SimVecChart) -> int:
+    """图元数量: 矩形 / 文本 / 圆的个数加上折线与区域的顶点数"""
+    return sum(len(columns[kind]) for kind in box_types) + sum(len(columns[kind].points) for kind in polyline_types)
+
+
+def peak_rss_mb() -> float:
+    """当前进程的峰值常驻内存 (MB, Linux 下 ru_maxrss 以 KB 为单位)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def current_rss_mb() -> float:
+    """当前进程此刻的常驻内存 (MB); 没有 /proc 时退回峰值常驻内存"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+
+def compare_rows(rows: list, truth: list) -> dict:
+    """与真实数据逐行比较: 行数是否一致, 数值字段的最大绝对误差, 分类不一致的行数"""
+    result = {"rows": len(rows), "expected_rows": len(truth), "max_error": None, "category_mismatches": None}
+    if len(rows) != len(truth):
+        return result
+    errors, mismatches = [0.0], 0
+    for row, expected in zip(rows, truth):
+        for field in ("x", "y", "percentage"):
+            if isinstance(expected.get(field), (int, float)) and isinstance(row.get(field), (int, float)):
+                errors.append(abs(row[field] - expected[field]))
+            elif field in expected and row.get(field) != expected[field]:
+                mismatches += 1
+        mismatches += row.get("category") != expected.get("category")
+    result["max_error"] = max(errors)
+    result["category_mismatches"] = mismatches
+    return result
+
+
+def benchmark_chart(corpus_directory: str, chart_type: str, name: str, scratch_directory: str, keep_rows: bool = False) -> dict:
+    """
+    对单个图表依次运行各阶段, 返回每个阶段的耗时、内存与精度 (keep_rows 为 True 时同时返回抽取结果)
+    memory[阶段]: rss_delta_mb 为阶段前后常驻内存之差 (阶段保留下来的内存),
+    peak_growth_mb 为阶段使进程峰值常驻内存增加的量 (只有超过之前的峰值时才不为 0, 每个图表在独立进程中运行时最有意义)
+    """
+    timings, memory = {}, {}
+
+    def timed(stage, function, *args):
+        rss, peak = current_rss_mb(), peak_rss_mb()
+        start = time.perf_counter()
+        value = function(*args)
+        timings[stage] = time.perf_counter() - start
+        memory[stage] = {"rss_delta_mb": round(current_rss_mb() - rss, 2), "peak_growth_mb": round(peak_rss_mb() - peak, 2)}
+        return value
+
+    simvec_path = os.path.join(corpus_directory, "raw_simvec_data", chart_type, name + ".txt")
+    with open(os.path.join(corpus_directory, "raw_meta_data", chart_type, name + ".json"), "r", encoding="utf-8") as f:
+        raw_metadata = json.load(f)
+    binary_path = os.path.join(scratch_directory, f"{chart_type}_{name}.simvec")
+
+    columns = timed("tokenize", load_simvec, simvec_path)
+    timed("store", save_simvec_binary, binary_path, columns)
+    columns = timed("load", load_simvec_binary, binary_path)
+    metadata = timed("metadata", data_formatter.normalize_metadata, raw_metadata)
+    extract = getattr(pipeline.extractors[chart_type], f"extract_{chart_type}_data")
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        rows = timed("extract", extract, metadata, columns)
+    timed("vega_lite", lambda: vega_lite_emitter.dumps_spec(vega_lite_emitter.build_spec(chart_type, rows, metadata)))
+
+    result = {"chart_type": chart_type, "chart": name, "primitives": count_primitives(columns), "seconds": timings,
+              "memory": memory}
+    if keep_rows:
+        result["rows"] = rows
+    truth_path = os.path.join(corpus_directory, "ground_truth", chart_type, name + ".json")
+    if os.path.exists(truth_path):
+        with open(truth_path, "r", encoding="utf-8") as f:
+            result["accuracy"] = compare_rows(rows, json.load(f))
+    os.remove(binary_path)
+    return result
+
+
+def _isolated_chart(*args) -> dict:
+    """在独立子进程中运行 benchmark_chart, 附加该进程 (即该图表) 的峰值常驻内存"""
+    result = benchmark_chart(*args)
+    result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return result
+
+
+def run_benchmark(corpus_directory: str = synthetic_charts.default_output_directory, selected_types: list = None,
+                  isolate: bool = True) -> dict:
+    """
+    对语料中的所有图表逐个计时, 返回按图表类型汇总的吞吐量报告
+    isolate 为 True 时每个图表在新启动的子进程中运行, 各图表的峰值内存互不影响 (报告中的 peak_rss_mb 按图表给出)
+    """
+    selected_types = selected_types or list(synthetic_charts.generators)
+    tasks = []
+    for chart_type in selected_types:
+        chart_path = os.path.join(corpus_directory, "raw_simvec_data", chart_type)
+        if os.path.isdir(chart_path):
+            tasks.extend((chart_type, os.path.splitext(f)[0]) for f in sorted(os.listdir(chart_path)) if f.endswith(".txt"))
+
+    results = []
+    with tempfile.TemporaryDirectory() as scratch_directory:
+        if isolate:
+            # spawn 启动的子进程不继承父进程的内存, maxtasksperchild=1 保证每个图表使用新的进程
+            with multiprocessing.get_context("spawn").Pool(1, maxtasksperchild=1) as pool:
+                for chart_type, name in tasks:
+                    results.append(pool.apply(_isolated_chart, (corpus_directory, chart_type, name, scratch_directory)))
+        else:
+            for chart_type, name in tasks:
+                results.append(benchmark_chart(corpus_directory, chart_type, name, scratch_directory))
+
+    summary = {}
+    for chart_type in selected_types:
+        charts = [r for r in results if r["chart_type"] == chart_type]
+        if not charts:
+            continue
+        primitives = sum(r["primitives"] for r in charts)
+        summary[chart_type] = {
+            "charts": len(charts),
+            "primitives": primitives,
+            "stages": {
+                stage: {
+                    "seconds": round(seconds, 6),
+                    "charts_per_second": round(len(charts) / seconds, 2) if seconds else None,
+                    "primitives_per_second": round(primitives / seconds) if seconds else None,
+                    "max_rss_delta_mb": max(r["memory"][stage]["rss_delta_mb"] for r in charts),
+                }
+                for stage, seconds in ((s, sum(r["seconds"][s] for r in charts)) for s in stages)
+            },
+        }
+        if isolate:
+            summary[chart_type]["peak_rss_mb"] = max(r["peak_rss_mb"] for r in charts)
+    # 不隔离时只能给出整个进程的峰值常驻内存
+    return {"summary": summary, "charts": results, "isolated": isolate,
+            "peak_rss_mb": max((r["peak_rss_mb"] for r in results), default=0.0) if isolate else round(peak_rss_mb(), 1)}
+
+
+def print_report(report: dict):
+    """以表格形式打印吞吐量报告"""
+    print(f"{'类型':<10}{'阶段':<11}{'耗时 (s)':>11}{'图表/s':>12}{'图元/s':>14}{'内存增量 (MB)':>15}")
+    for chart_type, entry in report["summary"].items():
+        for stage, numbers in entry["stages"].items():
+            print(f"{chart_type:<10}{stage:<11}{numbers['seconds']:>11.4f}"
+                  f"{numbers['charts_per_second'] or 0:>12.2f}{numbers['primitives_per_second'] or 0:>14,}"
+                  f"{numbers['max_rss_delta_mb']:>15.1f}")
+    for r in report["charts"]:
+        parts = [f"{r['primitives']} 个图元"]
+        if "peak_rss_mb" in r:
+            parts.append(f"峰值内存 {r['peak_rss_mb']} MB")
+        accuracy = r.get("accuracy")
+        if accuracy:
+            parts.append(f"行数 {accuracy['rows']}/{accuracy['expected_rows']}, 最大误差 {accuracy['max_error']}, "
+                         f"分类不一致 {accuracy['category_mismatches']}")
+        print(f"{r['chart_type']}/{r['chart']}: {', '.join(parts)}")
+    print(f"峰值内存{'' if report['isolated'] else ' (整个进程)'}: {report['peak_rss_mb']} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="对合成语料逐阶段计时, 报告吞吐量与峰值内存")
+    parser.add_argument("--corpus", default=synthetic_charts.default_output_directory)
+    parser.add_argument("--types", nargs="+", choices=list(synthetic_charts.generators), default=None)
+    parser.add_argument("--generate", action="store_true", help="先按默认规模 (乘以 --scale) 生成语料")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--report", default=None, help="将完整报告写入该 JSON 文件, 便于比较不同版本")
+    parser.add_argument("--in-process", action="store_true", help="所有图表在当前进程中运行 (不单独测量每个图表的峰值内存)")
+    args = parser.parse_args()
+
+    if args.generate:
+        types = args.types or list(synthetic_charts.generators)
+        synthetic_charts.generate_corpus(
+            args.corpus, {t: max(2, int(synthetic_charts.default_sizes[t] * args.scale)) for t in types}
+        )
+
+    report = run_benchmark(args.corpus, args.types, isolate=not args.in_process)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f_out:
+            json.dump(report, f_out, indent=1, ensure_ascii=False)
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import sys
+import types
+
+# 构建清单的保存位置
+manifest_path = "intermediate_data/build_manifest.json"
+manifest_version = 1
+
+# 项目源码所在目录, 只有其中的模块会计入代码版本
+project_directory = os.path.dirname(os.path.abspath(__file__))
+
+_code_versions = {}
+
+
+def file_hash(path: str) -> str:
+    """计算文件内容的 SHA-256, 文件不存在时返回 None"""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def file_stat(path: str):
+    """文件的 [修改时间 (ns), 大小], 文件不存在时返回 None; 以列表表示, 与构建清单中读回的值可以直接比较"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _local_source_files(module: types.ModuleType, seen: set) -> set:
+    """递归收集模块及其引用的项目内模块的源文件"""
+    path = getattr(module, "__file__", None)
+    if not path or not os.path.abspath(path).startswith(project_directory) or path in seen:
+        return seen
+    seen.add(path)
+    for value in vars(module).values():
+        dependency = value if isinstance(value, types.ModuleType) else sys.modules.get(getattr(value, "__module__", None) or "")
+        if dependency is not None and dependency is not module:
+            _local_source_files(dependency, seen)
+    return seen
+
+
+def code_version(module: types.ModuleType) -> str:
+    """根据模块及其项目内依赖的源码计算代码版本, 任一源码变化都会使版本改变"""
+    if module.__name__ not in _code_versions:
+        digest = hashlib.sha256()
+        for path in sorted(_local_source_files(module, set())):
+            digest.update(os.path.basename(path).encode("utf-8"))
+            digest.update((file_hash(path) or "").encode("utf-8"))
+        _code_versions[module.__name__] = digest.hexdigest()[:16]
+    return _code_versions[module.__name__]
+
+
+def load_manifest(path: str = manifest_path) -> dict:
+    """读取构建清单, 不存在或版本不符时返回空清单"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"version": manifest_version, "charts": {}}
+    if manifest.get("version") != manifest_version:
+        return {"version": manifest_version, "charts": {}}
+    return manifest
+
+
+def save_manifest(manifest: dict, path: str = manifest_path):
+    """原子地写出构建清单, 避免中断时留下损坏的文件"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f_out:
+        json.dump(manifest, f_out, indent=1, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+class ChartCache:
+    """
+    单个图表在各阶段的缓存记录
+    每个阶段以 输入文件哈希 + 代码版本 + 选项 作为签名, 与上次构建一致且输出仍存在时跳过该阶段
+    输入文件的 (修改时间, 大小) 与上次记录相同时直接沿用记录的哈希, 只有变化过的文件才重新读取计算
+    """
+
+    def __init__(self, previous: dict = None, enabled: bool = True):
+        self.previous = previous or {}
+        self.enabled = enabled
+        self.entries = {}
+        self.skipped = []
+
+    def is_fresh(self, stage: str, input_paths: list, output_paths: list, code: str, options: dict = None) -> bool:
+        """记录阶段的新签名, 并判断该阶段能否跳过"""
+        previous = self.previous.get(stage) or {}
+        known_hashes, known_stats = previous.get("inputs", {}), previous.get("stats", {})
+        hashes, stats = {}, {}
+        for path in input_paths:
+            stats[path] = file_stat(path)
+            if stats[path] is not None and known_stats.get(path) == stats[path] and path in known_hashes:
+                hashes[path] = known_hashes[path]
+            else:
+                hashes[path] = file_hash(path)
+        entry = {
+            "inputs": hashes,
+            "stats": stats,
+            "code": code,
+            "options": options or {},
+            "outputs": list(output_paths),
+        }
+        self.entries[stage] = entry
+        # 只比较签名; 修改时间变化而内容未变 (例如 touch) 的输入不会使阶段失效
+        fresh = (
+            self.enabled
+            and all(previous.get(key) == entry[key] for key in ("inputs", "code", "options", "outputs"))
+            and all(os.path.exists(path) for path in output_paths)
+        )
+        if fresh:
+            self.skipped.append(stage)
+        return fresh
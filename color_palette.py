@@ -0,0 +1,107 @@
+from functools import lru_cache
+
+import numpy as np
+
+# 默认的颜色容差 (RGB 空间中的欧氏距离)
+default_tolerance = 60
+
+
+def hex_to_rgb(hex_color: str) -> tuple:
+    """将十六进制颜色转换为 (R,G,B) 元组格式"""
+    hex_color = hex_color.lstrip('#')
+    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+
+
+def pack_rgb(colors: np.ndarray) -> np.ndarray:
+    """将 (N,3) 颜色数组打包为 0xRRGGBB 形式的整数数组"""
+    colors = np.asarray(colors, dtype=np.uint32).reshape(-1, 3)
+    return (colors[:, 0] << 16) | (colors[:, 1] << 8) | colors[:, 2]
+
+
+def rgb_label(packed: int) -> str:
+    """无图例匹配时的分类名称, 与原先的 f"RGB{color}" 格式一致"""
+    return f"RGB{((packed >> 16) & 0xFF, (packed >> 8) & 0xFF, packed & 0xFF)}"
+
+
+class ColorPalette:
+    """
+    由 metadata 中的图例构建一次的调色板
+    对一批颜色做批量最近邻匹配, 并按打包后的 RGB 值缓存结果, 相同颜色只计算一次
+    """
+
+    def __init__(self, metadata: dict, tolerance: float = default_tolerance):
+        self.tolerance = tolerance
+        legend = metadata.get('legend')
+        if isinstance(legend, dict) and 'items' in legend and 'colors' in legend:
+            # 与原实现一致: 相同颜色的图例项以后出现的为准
+            self.color_to_category = dict(zip((hex_to_rgb(color) for color in legend['colors']), legend['items']))
+        else:
+            self.color_to_category = None  # 标记为无图例模式
+
+        self.categories = list(self.color_to_category.values()) if self.color_to_category else []
+        self.legend_colors = np.array(list(self.color_to_category or {}), dtype=np.int32).reshape(-1, 3)
+        self._memo = {}
+
+    @property
+    def has_legend(self) -> bool:
+        """是否存在可用于匹配的图例颜色"""
+        return bool(self.color_to_category)
+
+    def _match(self, packed: np.ndarray) -> list:
+        """对尚未缓存的颜色做一次批量最近邻计算, 返回图例下标 (超出容差时为 -1), 供缓存使用"""
+        colors = np.stack([(packed >> 16) & 0xFF, (packed >> 8) & 0xFF, packed & 0xFF], axis=1).astype(np.int32)
+        diff = colors[:, None, :] - self.legend_colors[None, :, :]
+        squared = np.einsum('ijk,ijk->ij', diff, diff)
+        nearest = squared.argmin(axis=1)
+        within = squared[np.arange(len(nearest)), nearest] <= self.tolerance ** 2
+        return np.where(within, nearest, -1).tolist()
+
+    def classify(self, rgb: np.ndarray, unmatched_label: str = "Unknown") -> list:
+        """
+        批量确定打包颜色 (simvec_model 中的 rgb 列) 的分类:
+          有图例时取容差内最近的图例项, 否则为 unmatched_label (为 None 时使用 RGB(...) 名称)
+          无图例时一律使用 RGB(...) 名称; 无效颜色 (-1, SimVec 中的 None) 视为未匹配
+        """
+        rgb = np.asarray(rgb, dtype=np.int64).reshape(-1)
+        if len(rgb) == 0:
+            return []
+        valid = rgb >= 0
+        unique, inverse = np.unique(np.where(valid, rgb, 0), return_inverse=True)
+
+        unique_list = unique.tolist()
+        if self.has_legend:
+            missing = [color for color in unique_list if color not in self._memo]
+            if missing:
+                self._memo.update(zip(missing, self._match(np.array(missing, dtype=np.uint32))))
+            labels = []
+            for color in unique_list:
+                index = self._memo[color]
+                if index >= 0:
+                    labels.append(self.categories[index])
+                else:
+                    labels.append(unmatched_label if unmatched_label is not None else rgb_label(color))
+        else:
+            labels = [rgb_label(color) for color in unique_list]
+
+        result = [labels[i] for i in inverse.tolist()]
+        invalid_label = unmatched_label if self.has_legend and unmatched_label is not None else "RGBNone"
+        for i in np.flatnonzero(~valid).tolist():
+            result[i] = invalid_label
+        return result
+
+
+@lru_cache(maxsize=256)
+def _cached_palette(items: tuple, colors: tuple, tolerance: float) -> ColorPalette:
+    """按图例内容缓存的调色板"""
+    return ColorPalette({'legend': {'items': list(items), 'colors': list(colors)}}, tolerance)
+
+
+def palette_for(metadata: dict, tolerance: float = default_tolerance) -> ColorPalette:
+    """
+    返回 metadata 图例对应的调色板, 图例相同的图表复用同一个实例 (及其颜色匹配缓存)
+    常驻进程中处理大量图表时, 常见图例只需解析一次
+    """
+    legend = metadata.get('legend')
+    if isinstance(legend, dict) and 'items' in legend and 'colors' in legend:
+        return _cached_palette(tuple(legend['items']), tuple(legend['colors']), tolerance)
+    return ColorPalette(metadata, tolerance)
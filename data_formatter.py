@@ -1,6 +1,12 @@
+import argparse
 import json
 import os
 
+import instrumentation
+from simvec_model import SimVecChart
+from simvec_storage import binary_extension, load_simvec, save_simvec_binary
+from simvec_tokenizer import columns_to_json, normalize_text_content
+
 # 输入和输出路径
 input_simvec_directory = "intermediate_data/raw_simvec_data"
 output_simvec_directory = "intermediate_data/cleaned_simvec_data"
@@ -8,137 +14,155 @@ output_simvec_directory = "intermediate_data/cleaned_simvec_data"
 input_metadata_directory = "intermediate_data/raw_meta_data"
 output_metadata_directory = "intermediate_data/cleaned_meta_data"
 
-# 确保输出目录存在
-os.makedirs(output_simvec_directory, exist_ok=True)
-os.makedirs(output_metadata_directory, exist_ok=True)
-
 # 支持的图表类型 (文件夹名称)
-chart_types = ["bar", "scatter", "pie","line"]
-
-# 规范化文本内容的函数
-def normalize_text_content(text: str) -> str:
-    """规范化文本内容"""
-    return text.replace(' ', '_').replace('\u2212', '-').replace(',', '')
-
-# 1. 处理 SimVec 文件
-for chart_type in chart_types:
-    input_chart_path = os.path.join(input_simvec_directory, chart_type)
-    output_chart_path = os.path.join(output_simvec_directory, chart_type)
-
-    # 确保输出子目录存在
-    os.makedirs(output_chart_path, exist_ok=True)
-
-    for filename in os.listdir(input_chart_path):
-        if filename.endswith(".txt"):
-            input_path = os.path.join(input_chart_path, filename)
-            output_path = os.path.join(output_chart_path, filename.replace(".txt", ".json"))
-
-            data = {
-                "rect": [],
-                "text": [],
-                "circle": [],
-                "line": [],
-                "area": []  # 新增 area 类型
-            }
-
-            with open(input_path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-
-                for line in lines:
-                    line = line.strip()
-                    
-                    if line.startswith("rect "):
-                        _, color, position_str = line.split(" ", 2)
-                        position = json.loads(position_str.replace('[', '[').replace(']', ']'))
-                        if color == "None":
-                            continue
-                        data["rect"].append({
-                            "color": color,
-                            "position": position
-                        })
-
-                    elif line.startswith("text "):
-                        _, content, position_str = line.split(" ", 2)
-                        content = normalize_text_content(content)
-                        position = json.loads(position_str.replace('[', '[').replace(']', ']'))
-                        data["text"].append({
-                            "content": content,
-                            "position": position
-                        })
-
-                    elif line.startswith("circle "):
-                        _, color, position_str = line.split(" ", 2)
-                        position = json.loads(position_str.replace('[', '[').replace(']', ']'))
-                        data["circle"].append({
-                            "color": color,
-                            "position": position
-                        })
-
-                    elif line.startswith("line "):
-                        _, color, points_str = line.split(" ", 2)
-                        points = [[int(p.split(',')[0]), int(p.split(',')[1])] for p in points_str.split(';')]
-                        data["line"].append({
-                            "color": color,
-                            "points": points
-                        })
-
-                    elif line.startswith("area "):  # 新增的 area 类型处理
-                        _, color, points_str = line.split(" ", 2)
-                        points = [[int(p.split(',')[0]), int(p.split(',')[1])] for p in points_str.split(';')]
-                        data["area"].append({
-                            "color": color,
-                            "points": points
-                        })
-
-            with open(output_path, "w", encoding="utf-8") as f_out:
-                json.dump(data, f_out, indent=2)
+chart_types = ["bar", "scatter", "pie", "line", "stackbar"]
+
+
+def _chart_key(output_path: str) -> tuple:
+    """由输出路径得到 (图表类型, 图表名称), 用于记录各阶段的指标"""
+    return os.path.basename(os.path.dirname(output_path)), os.path.splitext(os.path.basename(output_path))[0]
+
 
-            print(f"SimVec 转换完成: {output_path}")
-
-# 2. 处理 Metadata 文件
-for chart_type in chart_types:
-    input_chart_path = os.path.join(input_metadata_directory, chart_type)
-    output_chart_path = os.path.join(output_metadata_directory, chart_type)
-
-    os.makedirs(output_chart_path, exist_ok=True)
-
-    for filename in os.listdir(input_chart_path):
-        if filename.endswith(".json"):
-            input_path = os.path.join(input_chart_path, filename)
-            output_path = os.path.join(output_chart_path, filename)
-
-            with open(input_path, "r", encoding="utf-8") as f:
-                metadata = json.load(f)
-
-            # 处理 X 轴文本
-            if (
-                "xAxis" in metadata 
-                and metadata["xAxis"] is not None 
-                and "ticks" in metadata["xAxis"] 
-                and metadata["xAxis"]["ticks"] is not None
-            ):
-                metadata["xAxis"]["ticks"] = [
-                    normalize_text_content(tick) for tick in metadata["xAxis"]["ticks"]
-                ]
-
-            # 处理 Y 轴文本
-            if (
-                "yAxis" in metadata 
-                and metadata["yAxis"] is not None 
-                and "ticks" in metadata["yAxis"] 
-                and metadata["yAxis"]["ticks"] is not None
-            ):
-                metadata["yAxis"]["ticks"] = [
-                    normalize_text_content(tick) for tick in metadata["yAxis"]["ticks"]
-                ]
-
-            # 处理图例 (legend) 中的文本
-            if "legend" in metadata and isinstance(metadata["legend"], dict) and "items" in metadata["legend"]:
-                metadata["legend"]["items"] = [
-                    normalize_text_content(item) for item in metadata["legend"]["items"]
-                ]
-
-            with open(output_path, "w", encoding="utf-8") as f_out:
-                json.dump(metadata, f_out, indent=2)
-
-            print(f"Metadata 处理完成: {output_path}")
+# 1. 处理单个 SimVec 文件
+def format_simvec_file(input_path: str, output_base_path: str, write_json: bool = False):
+    """将 raw_simvec .txt 转换为 cleaned_simvec 数据 (output_base_path 不含扩展名)"""
+    chart_type, chart = _chart_key(output_base_path)
+
+    # 一次性解析为列式数组, 以紧凑的二进制格式保存
+    with instrumentation.stage(chart_type, chart, "tokenize"):
+        columns = load_simvec(input_path)
+    instrumentation.record_primitives(chart_type, chart, columns)
+    store_simvec_columns(columns, output_base_path, write_json)
+
+
+def store_simvec_columns(columns: SimVecChart, output_base_path: str, write_json: bool = False):
+    """将已解析的列式数组写成 cleaned_simvec 文件 (output_base_path 不含扩展名)"""
+    chart_type, chart = _chart_key(output_base_path)
+    with instrumentation.stage(chart_type, chart, "store"):
+        save_simvec_binary(output_base_path + binary_extension, columns)
+    print(f"SimVec 转换完成: {output_base_path + binary_extension}")
+
+    # 调试模式下同时输出 JSON
+    if write_json:
+        with instrumentation.stage(chart_type, chart, "store_json"):
+            data = columns_to_json(columns)
+            with open(output_base_path + ".json", "w", encoding="utf-8") as f_out:
+                json.dump(data, f_out, indent=2)
+        print(f"SimVec 转换完成: {output_base_path}.json")
+
+
+# 2. 规范化 Metadata 中的文本
+def normalize_metadata(metadata: dict) -> dict:
+    """规范化坐标轴刻度与图例中的文本 (原地修改并返回)"""
+    # 处理 X 轴文本
+    if (
+        "xAxis" in metadata
+        and metadata["xAxis"] is not None
+        and "ticks" in metadata["xAxis"]
+        and metadata["xAxis"]["ticks"] is not None
+    ):
+        metadata["xAxis"]["ticks"] = [
+            normalize_text_content(tick) for tick in metadata["xAxis"]["ticks"]
+        ]
+
+    # 处理 Y 轴文本
+    if (
+        "yAxis" in metadata
+        and metadata["yAxis"] is not None
+        and "ticks" in metadata["yAxis"]
+        and metadata["yAxis"]["ticks"] is not None
+    ):
+        metadata["yAxis"]["ticks"] = [
+            normalize_text_content(tick) for tick in metadata["yAxis"]["ticks"]
+        ]
+
+    # 处理图例 (legend) 中的文本
+    if "legend" in metadata and isinstance(metadata["legend"], dict) and "items" in metadata["legend"]:
+        metadata["legend"]["items"] = [
+            normalize_text_content(item) for item in metadata["legend"]["items"]
+        ]
+
+    return metadata
+
+
+def format_metadata_file(input_path: str, output_path: str):
+    """将 raw_meta_data 中的 JSON 规范化后写入 cleaned_meta_data"""
+    with instrumentation.stage(*_chart_key(output_path), "metadata"):
+        with open(input_path, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+
+        normalize_metadata(metadata)
+
+        with open(output_path, "w", encoding="utf-8") as f_out:
+            json.dump(metadata, f_out, indent=2)
+
+    print(f"Metadata 处理完成: {output_path}")
+
+
+# 3. 内存模式: 解析与规范化的结果直接交给抽取模块, 不经过 cleaned_* 文件
+def load_raw_chart(simvec_path: str, metadata_path: str, chart_type: str, chart: str) -> tuple:
+    """读取并规范化单个图表的 raw_simvec 与 raw_meta, 返回 (metadata, columns)"""
+    with instrumentation.stage(chart_type, chart, "tokenize"):
+        columns = load_simvec(simvec_path)
+    instrumentation.record_primitives(chart_type, chart, columns)
+
+    with instrumentation.stage(chart_type, chart, "metadata"):
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            metadata = normalize_metadata(json.load(f))
+    return metadata, columns
+
+
+def save_intermediates(metadata: dict, columns: SimVecChart, output_base_path: str, output_path: str, write_json: bool = False):
+    """调试用: 把内存中的规范化结果照常写入 cleaned_simvec_data 与 cleaned_meta_data"""
+    os.makedirs(os.path.dirname(output_base_path), exist_ok=True)
+    store_simvec_columns(columns, output_base_path, write_json)
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f_out:
+        json.dump(metadata, f_out, indent=2)
+    print(f"Metadata 处理完成: {output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="规范化 raw_simvec_data 与 raw_meta_data")
+    # cleaned_simvec_data 默认只写二进制格式, 传入 --json 时同时输出 JSON 便于调试
+    parser.add_argument("--json", action="store_true", help="同时输出 JSON 格式的 cleaned_simvec 数据")
+    args = parser.parse_args()
+
+    try:
+        # 1. 处理 SimVec 文件
+        for chart_type in chart_types:
+            input_chart_path = os.path.join(input_simvec_directory, chart_type)
+            output_chart_path = os.path.join(output_simvec_directory, chart_type)
+
+            # 尚无输入数据的图表类型直接跳过
+            if not os.path.isdir(input_chart_path):
+                continue
+
+            # 确保输出子目录存在
+            os.makedirs(output_chart_path, exist_ok=True)
+
+            for filename in os.listdir(input_chart_path):
+                if filename.endswith(".txt"):
+                    input_path = os.path.join(input_chart_path, filename)
+                    output_base_path = os.path.join(output_chart_path, os.path.splitext(filename)[0])
+                    format_simvec_file(input_path, output_base_path, args.json)
+
+        # 2. 处理 Metadata 文件
+        for chart_type in chart_types:
+            input_chart_path = os.path.join(input_metadata_directory, chart_type)
+            output_chart_path = os.path.join(output_metadata_directory, chart_type)
+
+            if not os.path.isdir(input_chart_path):
+                continue
+
+            os.makedirs(output_chart_path, exist_ok=True)
+
+            for filename in os.listdir(input_chart_path):
+                if filename.endswith(".json"):
+                    input_path = os.path.join(input_chart_path, filename)
+                    output_path = os.path.join(output_chart_path, filename)
+                    format_metadata_file(input_path, output_path)
+    finally:
+        # 写出结构化日志与 Prometheus 快照
+        instrumentation.flush("data_formatter")
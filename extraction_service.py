@@ -0,0 +1,209 @@
+import argparse
+import copy
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import data_formatter
+import pipeline
+import vega_lite_emitter
+from simvec_tokenizer import tokenize_simvec
+from svg_simvec_converter import convert_svg
+
+# 默认监听地址与队列长度 (超过 进程数 + 队列长度 的并发请求会被拒绝)
+default_host = "127.0.0.1"
+default_port = 8765
+default_queue_size = 32
+
+
+def _warm_worker():
+    """工作进程初始化: 抽取模块已在导入时加载, 这里把其中的打印重定向到 stderr, 避免干扰 stdin 协议的输出"""
+    sys.stdout = sys.stderr
+
+
+def extract_chart(request: dict) -> dict:
+    """
+    处理单个图表请求 (在工作进程中执行):
+      chart_type: 图表类型; metadata: 原始 metadata (会先规范化)
+      svg 或 simvec: SVG 文本 / SimVec 文本 (二选一)
+      format: "rows" (默认, 返回抽取出的数据行) 或 "vega_lite" (返回完整规范)
+      options: 可选, 传给抽取函数的关键字参数 (例如折线图的 {"resample": true})
+    """
+    chart_type = request.get("chart_type")
+    if chart_type not in pipeline.extractors:
+        raise ValueError(f"不支持的图表类型: {chart_type}")
+    if "metadata" not in request:
+        raise ValueError("缺少 metadata")
+
+    if "simvec" in request:
+        simvec_text = request["simvec"]
+    elif "svg" in request:
+        simvec_text = "\n".join(convert_svg(io.BytesIO(request["svg"].encode("utf-8"))))
+    else:
+        raise ValueError("缺少 svg 或 simvec")
+
+    metadata = data_formatter.normalize_metadata(copy.deepcopy(request["metadata"]))
+    columns = tokenize_simvec(simvec_text)
+    extract = getattr(pipeline.extractors[chart_type], f"extract_{chart_type}_data")
+    rows = extract(metadata, columns, **(request.get("options") or {}))
+
+    if request.get("format", "rows") == "vega_lite":
+        return {"spec": vega_lite_emitter.build_spec(chart_type, rows, metadata, request.get("name"))}
+    return {"data": rows}
+
+
+class ExtractionService:
+    """
+    常驻的抽取服务: 模块、调色板缓存等在工作进程中保持加载状态
+    同时处理的请求数受 进程数 + 队列长度 限制, 超出时由调用方决定拒绝还是等待 (背压)
+    """
+
+    def __init__(self, workers: int = None, queue_size: int = default_queue_size):
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        self.slots = threading.BoundedSemaphore(self.workers + queue_size)
+        # 预先启动全部工作进程, 第一个请求不必再承担进程启动与模块导入的开销
+        list(self.executor.map(abs, range(self.workers)))
+
+    def handle(self, request: dict, block: bool = True) -> dict:
+        """处理一个请求, 返回带耗时 (毫秒) 的响应; block 为 False 且没有空闲位置时返回 None"""
+        if not self.slots.acquire(blocking=block):
+            return None
+        try:
+            return self.run(request)
+        finally:
+            self.slots.release()
+
+    def run(self, request: dict) -> dict:
+        """在工作进程中执行请求 (调用方需已占用一个位置)"""
+        start = time.perf_counter()
+        try:
+            response = {"status": "ok", **self.executor.submit(extract_chart, request).result()}
+        except Exception as e:
+            response = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+        if "id" in request:
+            response["id"] = request["id"]
+        response["milliseconds"] = round((time.perf_counter() - start) * 1000, 2)
+        return response
+
+    def close(self):
+        self.executor.shutdown()
+
+
+def _make_handler(service: ExtractionService):
+    """构建绑定到服务实例的 HTTP 请求处理类"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, body: dict, headers: dict = None):
+            payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._reply(200, {"status": "ok", "workers": service.workers})
+            else:
+                self._reply(404, {"status": "failed", "error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/extract":
+                self._reply(404, {"status": "failed", "error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length).decode("utf-8"))
+            except (ValueError, UnicodeDecodeError) as e:
+                self._reply(400, {"status": "failed", "error": f"请求不是合法的 JSON: {e}"})
+                return
+
+            response = service.handle(request, block=False)
+            if response is None:
+                self._reply(503, {"status": "failed", "error": "服务繁忙, 请稍后重试"}, {"Retry-After": "1"})
+            else:
+                self._reply(200 if response["status"] == "ok" else 422, response)
+
+        def log_message(self, format, *args):
+            sys.stderr.write(f"{self.address_string()} {format % args}\n")
+
+    return Handler
+
+
+def serve_http(service: ExtractionService, host: str = default_host, port: int = default_port):
+    """启动本地 HTTP 服务: POST /extract 处理图表, GET /health 检查状态"""
+    server = ThreadingHTTPServer((host, port), _make_handler(service))
+    print(f"抽取服务已启动: http://{host}:{port}/extract ({service.workers} 个进程)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def serve_stdin(service: ExtractionService, input_stream=None, output_stream=None):
+    """
+    按行处理请求: 每行输入一个 JSON 请求, 每完成一个请求输出一行 JSON 响应 (以 id 对应, 按完成顺序输出)
+    队列已满时暂停读取输入, 形成背压
+    """
+    input_stream = input_stream or sys.stdin
+    output_stream = output_stream or sys.stdout
+    lock = threading.Lock()
+    threads = []
+
+    def respond(request: dict):
+        try:
+            response = service.run(request)
+        finally:
+            service.slots.release()
+        with lock:
+            output_stream.write(json.dumps(response, ensure_ascii=False) + "\n")
+            output_stream.flush()
+
+    for line in input_stream:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            with lock:
+                output_stream.write(json.dumps({"status": "failed", "error": f"请求不是合法的 JSON: {e}"}, ensure_ascii=False) + "\n")
+                output_stream.flush()
+            continue
+        # 先占用位置再启动线程, 没有空闲位置时在此阻塞, 不再读取新请求
+        service.slots.acquire()
+        thread = threading.Thread(target=respond, args=(request,), daemon=True)
+        thread.start()
+        threads.append(thread)
+        threads = [t for t in threads if t.is_alive()]
+
+    for thread in threads:
+        thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="常驻的 SVG / SimVec → 抽取数据 服务")
+    parser.add_argument("--stdin", action="store_true", help="使用按行分隔的 stdin / stdout 协议, 而不是 HTTP")
+    parser.add_argument("--host", default=default_host)
+    parser.add_argument("--port", type=int, default=default_port)
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数, 默认为 CPU 核数")
+    parser.add_argument("--queue-size", type=int, default=default_queue_size, help="等待中的请求上限")
+    args = parser.parse_args()
+
+    service = ExtractionService(args.workers, args.queue_size)
+    try:
+        if args.stdin:
+            serve_stdin(service)
+        else:
+            serve_http(service, args.host, args.port)
+    finally:
+        service.close()
@@ -0,0 +1,875 @@
+import argparse
+import contextlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+import benchmark
+import data_formatter
+import metadata_inference
+import svg_simvec_converter
+from simvec_tokenizer import normalize_text_content, tokenize_simvec
+
+# 参考值与基线的保存位置 (随代码一起提交)
+golden_directory = "golden_set"
+reference_directory = os.path.join(golden_directory, "references")
+baseline_path = os.path.join(golden_directory, "baseline.json")
+
+# 参考值只由 SVG 原文推导, 不经过被检查的转换 / 抽取代码 (见 svg_reference_rows);
+# SVG 无法推导时 (没有可定位的坐标轴或数据图元) 才使用 --update 时抽取结果的快照
+
+# 与参考值比较得到的两项指标: 由 SVG 推导的参考值报告为精度, 快照只报告与快照的偏差
+metric_names = {
+    "svg": ("value_error", "category_accuracy"),
+    "snapshot": ("value_drift", "category_agreement"),
+}
+
+# 依次计时的阶段: SVG 转换加上 benchmark 中的各阶段
+stages = ["convert"] + benchmark.stages
+
+# 默认的回归阈值:
+#   数值误差 (相对参考值范围) 比基线增加超过 error_tolerance
+#   分类正确率比基线下降超过 accuracy_tolerance
+#   某阶段的相对耗时 (总耗时除以同一台机器上校准负载的耗时) 超过基线的 (1 + latency_tolerance) 倍,
+#   且多出的耗时超过基线全部阶段总耗时的 latency_floor_share (忽略对整个流程无足轻重的计时噪声)
+default_error_tolerance = 0.005
+default_accuracy_tolerance = 0.0
+default_latency_tolerance = 0.5
+latency_floor_share = 0.05
+
+# 每个图表重复运行的次数, 各阶段取最短耗时; 第一次运行包含导入与缓存预热, 少于 min_repeat 次时耗时不可比
+default_repeat = 3
+min_repeat = 3
+
+# 校准负载的规模与运行次数 (在运行图表前后各校准一次, 取全部运行中的最短耗时)
+calibration_size = 50000
+calibration_runs = 10
+
+
+def calibrate(runs: int = calibration_runs) -> float:
+    """
+    在本机运行一段固定的校准负载 (解析逗号分隔的数值、排序、逐行拼接 JSON), 返回 runs 次中的最短耗时 (秒)
+    各阶段耗时除以该值后与基线比较, 基线可以在不同速度的机器上复用
+    """
+    values = np.random.default_rng(0).random(calibration_size)
+    text = ",".join(f"{value:.4f}" for value in values.tolist())
+    best = float("inf")
+    for _ in range(max(runs, 1)):
+        start = time.perf_counter()
+        parsed = np.array(text.split(","), dtype=np.float64)
+        order = np.argsort(parsed, kind="stable")
+        "\n".join(json.dumps({"x": i, "y": v}) for i, v in zip(order[:calibration_size // 5].tolist(), parsed.tolist()))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def golden_charts(selected_types: list = None) -> list:
+    """input_data 中的全部图表 (chart_type, name, svg 路径)"""
+    charts = []
+    for chart_type in selected_types or data_formatter.chart_types:
+        directory = os.path.join(svg_simvec_converter.input_svg_directory, chart_type)
+        if os.path.isdir(directory):
+            charts.extend(
+                (chart_type, os.path.splitext(f)[0], os.path.join(directory, f))
+                for f in sorted(os.listdir(directory)) if f.endswith(".svg")
+            )
+    return charts
+
+
+def chart_metadata(chart_type: str, name: str, simvec_text: str) -> tuple:
+    """返回 (原始 metadata, 来源): 优先使用 raw_meta_data, 没有时由 SimVec 推断"""
+    path = os.path.join(data_formatter.input_metadata_directory, chart_type, name + ".json")
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f), "model"
+    metadata, _ = metadata_inference.infer_metadata(tokenize_simvec(simvec_text))
+    return metadata, "inferred"
+
+
+_transform_pattern = re.compile(r"(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)")
+_number_pattern = re.compile(r"[-+]?(?:\d*\.\d+|\d+\.?)(?:[eE][-+]?\d+)?")
+_path_token_pattern = re.compile(r"[MmLlHhVvZzAaCcSsQqTt]|" + _number_pattern.pattern)
+_hex_pattern = re.compile(r"^#([0-9a-f]{3}|[0-9a-f]{6})$")
+_rgb_pattern = re.compile(r"^rgba?\(\s*([\d.]+)\s*,\s*([\d.]+)\s*,\s*([\d.]+)\s*(?:,\s*1\s*)?\)$")
+
+# 路径命令的参数个数
+_path_arguments = {"M": 2, "L": 2, "H": 1, "V": 1, "A": 7, "C": 6, "S": 4, "Q": 4, "T": 2}
+
+# 图例色块的最大边长, 刻度文本吸附到网格线的最大距离 (像素)
+legend_swatch_size = 30
+rule_snap_distance = 6
+
+
+def _tag(element) -> str:
+    return element.tag.rsplit("}", 1)[-1].lower()
+
+
+def _text(element) -> str:
+    return "".join(element.itertext()).strip()
+
+
+def _style(element, name: str, inherited: str) -> str:
+    """元素的样式属性: style 中的声明优先于同名属性, 都没有时继承父元素"""
+    style = dict(part.split(":", 1) for part in (element.get("style") or "").split(";") if ":" in part)
+    style = {key.strip().lower(): value.strip() for key, value in style.items()}
+    return style.get(name, element.get(name, inherited))
+
+
+def _svg_color(value: str):
+    """CSS 颜色 → (R, G, B), 无法解析 (none、渐变等) 时返回 None"""
+    value = (value or "").strip().lower()
+    if value in svg_simvec_converter.named_colors:
+        return svg_simvec_converter.named_colors[value]
+    match = _hex_pattern.match(value)
+    if match:
+        digits = match.group(1)
+        digits = "".join(ch * 2 for ch in digits) if len(digits) == 3 else digits
+        return tuple(int(digits[i:i + 2], 16) for i in (0, 2, 4))
+    match = _rgb_pattern.match(value)
+    return tuple(int(float(channel)) for channel in match.groups()) if match else None
+
+
+def _is_white(color) -> bool:
+    return color is not None and min(color) >= 245
+
+
+def _tick_number(label: str):
+    """刻度文本的数值 (允许千位分隔符、$、% 与 k / M / B 后缀), 不是数值时返回 None"""
+    label = label.replace(",", "").replace("\u2212", "-").strip().strip("$%")
+    scale = {"k": 1e3, "K": 1e3, "M": 1e6, "B": 1e9}.get(label[-1:], 1)
+    try:
+        return float(label[:-1] if scale != 1 else label) * scale
+    except ValueError:
+        return None
+
+
+def _transform_matrix(transform: str) -> np.ndarray:
+    """transform 属性 → 3x3 仿射矩阵 (按书写顺序右乘)"""
+    matrix = np.eye(3)
+    for name, arguments in _transform_pattern.findall(transform or ""):
+        values = [float(v) for v in _number_pattern.findall(arguments)]
+        step = np.eye(3)
+        if name == "matrix" and len(values) == 6:
+            step[:2] = [[values[0], values[2], values[4]], [values[1], values[3], values[5]]]
+        elif name == "translate" and values:
+            step[:2, 2] = values[0], (values[1] if len(values) > 1 else 0.0)
+        elif name == "scale" and values:
+            step[0, 0], step[1, 1] = values[0], (values[1] if len(values) > 1 else values[0])
+        elif name == "rotate" and values:
+            angle = np.radians(values[0])
+            cx, cy = (values[1], values[2]) if len(values) == 3 else (0.0, 0.0)
+            rotation = np.array([[np.cos(angle), -np.sin(angle), 0], [np.sin(angle), np.cos(angle), 0], [0, 0, 1]])
+            shift = np.array([[1, 0, cx], [0, 1, cy], [0, 0, 1]])
+            step = shift @ rotation @ np.linalg.inv(shift)
+        elif name == "skewX" and values:
+            step[0, 1] = np.tan(np.radians(values[0]))
+        elif name == "skewY" and values:
+            step[1, 0] = np.tan(np.radians(values[0]))
+        matrix = matrix @ step
+    return matrix
+
+
+def _apply(matrix: np.ndarray, points) -> np.ndarray:
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return points @ matrix[:2, :2].T + matrix[:2, 2]
+
+
+def parse_path(d: str) -> list:
+    """
+    路径数据 → 子路径列表 [{"points": [(x, y)], "closed": bool, "arcs": [(起点序号, 大弧标志, 顺时针标志)], "curved": bool}]
+    支持全部绝对 / 相对命令; 曲线 (C / S / Q / T) 只记录终点, 并标记 curved
+    """
+    tokens = _path_token_pattern.findall(d or "")
+    subpaths, current, command = [], None, None
+    x = y = 0.0
+    start = (0.0, 0.0)
+    index = 0
+    while index < len(tokens):
+        if tokens[index].isalpha():
+            command = tokens[index]
+            index += 1
+            if command in "Zz":
+                if current is not None:
+                    current["closed"] = True
+                x, y = start
+                current = None
+            continue
+        upper = (command or "").upper()
+        if upper not in _path_arguments or index + _path_arguments[upper] > len(tokens):
+            break
+        values = [float(token) for token in tokens[index:index + _path_arguments[upper]]]
+        index += _path_arguments[upper]
+        relative = command.islower()
+        if upper == "H":
+            x = values[0] + (x if relative else 0.0)
+        elif upper == "V":
+            y = values[0] + (y if relative else 0.0)
+        else:
+            x, y = values[-2] + (x if relative else 0.0), values[-1] + (y if relative else 0.0)
+        if upper == "M":
+            current = {"points": [(x, y)], "closed": False, "arcs": [], "curved": False}
+            subpaths.append(current)
+            start = (x, y)
+            # moveto 之后的坐标对按 lineto 处理
+            command = "l" if relative else "L"
+            continue
+        if current is None:
+            current = {"points": [start], "closed": False, "arcs": [], "curved": False}
+            subpaths.append(current)
+        if upper == "A":
+            current["arcs"].append((len(current["points"]) - 1, bool(values[3]), bool(values[4])))
+        current["curved"] |= upper in "CSQT"
+        current["points"].append((x, y))
+    return subpaths
+
+
+def _box(points: np.ndarray) -> tuple:
+    return float(points[:, 0].min()), float(points[:, 1].min()), float(points[:, 0].max()), float(points[:, 1].max())
+
+
+def _is_box_path(points: np.ndarray) -> bool:
+    """闭合子路径是否为轴对齐的矩形 (每个顶点都在包围盒的角上)"""
+    if len(points) < 4:
+        return False
+    x0, y0, x1, y1 = _box(points)
+    return bool(np.all((np.isclose(points[:, 0], x0) | np.isclose(points[:, 0], x1))
+                       & (np.isclose(points[:, 1], y0) | np.isclose(points[:, 1], y1))))
+
+
+def read_svg_geometry(svg_path) -> dict:
+    """
+    直接从 SVG 读出定位后的图元, 累加各级 transform (translate / scale / rotate / matrix) 得到画布坐标:
+      rects:    [(x0, y0, x1, y1, 填充色, 元素)], 包括闭合的轴对齐矩形 <path>
+      polylines: [(顶点数组, 描边色, 元素)], 未闭合的 <path> / <line> / <polyline>
+      circles:  [(cx, cy, r, 颜色, 元素)], 颜色为填充色, 没有时为描边色
+      slices:   [(圆心, 起点, 终点, 大弧标志, 顺时针标志, 填充色, 元素)], 含圆弧 (A 命令) 的闭合 <path>
+      texts:    [(x, y, 文本, 元素)], 位置为 x / y 属性 (锚点) 变换后的坐标
+      ticks:    同一父元素下的 d3 刻度 [(x, y, 文本)], 刻度为 class 含 tick 或含有 line.tick 的 <g>
+      legend:   {色块元素: 文本}, 色块为子树中唯一的小色块 (非白色), 文本为唯一的非数值文本
+    颜色为 (R, G, B), 无法解析 (none、渐变等) 时为 None; display:none 的子树整体跳过
+    """
+    geometry = {"rects": [], "polylines": [], "circles": [], "slices": [], "texts": [], "ticks": [], "legend": {}}
+    tick_groups, swatches = {}, {}
+
+    def walk(element, matrix, paint, parent):
+        tag = _tag(element)
+        if tag in svg_simvec_converter.non_rendered_tags or _style(element, "display", "") == "none":
+            return
+        matrix = matrix @ _transform_matrix(element.get("transform"))
+        paint = {name: _style(element, name, paint[name]) for name in paint}
+        fill, stroke = _svg_color(paint["fill"]), _svg_color(paint["stroke"])
+        number = lambda name: float((_number_pattern.findall(element.get(name) or "") or [0])[0])
+
+        shapes = []
+        if tag == "rect":
+            corners = [(0, 0), (1, 0), (0, 1), (1, 1)]
+            box = _box(_apply(matrix, [(number("x") + number("width") * u, number("y") + number("height") * v)
+                                       for u, v in corners]))
+            shapes.append(("rects", (*box, fill, element)))
+        elif tag in ("circle", "ellipse"):
+            (cx, cy), = _apply(matrix, [(number("cx"), number("cy"))])
+            radius = number("r") or number("rx")
+            shapes.append(("circles", (float(cx), float(cy), radius, fill if fill is not None else stroke, element)))
+        elif tag == "line":
+            points = _apply(matrix, [(number("x1"), number("y1")), (number("x2"), number("y2"))])
+            shapes.append(("polylines", (points, stroke, element)))
+        elif tag in ("polyline", "polygon"):
+            values = [float(v) for v in _number_pattern.findall(element.get("points") or "")]
+            points = _apply(matrix, list(zip(values[0::2], values[1::2])))
+            if tag == "polygon" and _is_box_path(points):
+                shapes.append(("rects", (*_box(points), fill, element)))
+            elif len(points) >= 2:
+                shapes.append(("polylines", (points, stroke, element)))
+        elif tag == "path":
+            for subpath in parse_path(element.get("d")):
+                points = _apply(matrix, subpath["points"])
+                if subpath["arcs"] and subpath["closed"]:
+                    # 扇形: 圆心为不在圆弧上的顶点; 镜像变换使顺时针标志反转
+                    arcs = [arc for arc in subpath["arcs"] if not np.allclose(points[arc[0]], points[arc[0] + 1])]
+                    arc_vertices = {i for arc_start, *_ in arcs for i in (arc_start, arc_start + 1)}
+                    others = [i for i in range(len(points)) if i not in arc_vertices]
+                    if not arcs or not others:
+                        continue
+                    arc_start, large, sweep = arcs[0]
+                    sweep ^= bool(np.linalg.det(matrix[:2, :2]) < 0)
+                    shapes.append(("slices", (points[others[0]], points[arc_start], points[arc_start + 1],
+                                              large, sweep, fill, element)))
+                elif subpath["closed"] and _is_box_path(points):
+                    shapes.append(("rects", (*_box(points), fill, element)))
+                elif not subpath["closed"] and len(points) >= 2:
+                    shapes.append(("polylines", (points, stroke, element)))
+        elif tag == "text":
+            content = _text(element)
+            if content and paint["fill"].strip().lower() != "none":
+                (x, y), = _apply(matrix, [(number("x"), number("y"))])
+                geometry["texts"].append((float(x), float(y), content, element))
+        elif tag == "g":
+            classes = (element.get("class") or "").split()
+            if "tick" in classes or any("tick" in (child.get("class") or "").split() for child in element):
+                (x, y), = _apply(matrix, [(0.0, 0.0)])
+                label = " ".join(_text(t) for t in element.iter() if _tag(t) == "text")
+                tick_groups.setdefault(parent, []).append((float(x), float(y), label))
+
+        for kind, shape in shapes:
+            geometry[kind].append(shape)
+            box = _box(shape[0]) if kind == "polylines" else shape[:4] if kind == "rects" else None
+            color = shape[-2]
+            if kind == "rects" and not _is_white(color) and color is not None \
+                    and max(box[2] - box[0], box[3] - box[1]) <= legend_swatch_size:
+                swatches[element] = color
+            elif kind == "circles" and color is not None and shape[2] * 2 <= legend_swatch_size:
+                swatches[element] = color
+        for child in element:
+            walk(child, matrix, paint, element)
+
+    root = ET.parse(svg_path).getroot()
+    walk(root, np.eye(3), {"fill": "black", "stroke": "none"}, None)
+    geometry["ticks"] = [ticks for ticks in tick_groups.values() if len(ticks) >= 2]
+
+    # 图例项: 只含一个色块与一个非数值文本的最小 <g>
+    texts = {element: content for *_, content, element in geometry["texts"]}
+    for group in root.iter():
+        if _tag(group) != "g":
+            continue
+        members = list(group.iter())
+        group_swatches = [element for element in members if element in swatches]
+        group_texts = [texts[element] for element in members if element in texts]
+        if len(group_swatches) == 1 and len(group_texts) == 1 and _tick_number(group_texts[0]) is None:
+            geometry["legend"][group_swatches[0]] = group_texts[0]
+    return geometry
+
+
+def _rules(geometry: dict, axis: int) -> np.ndarray:
+    """
+    与坐标轴垂直的直线 (网格线、刻度线) 的位置: axis 为 1 时返回水平线的 y, 为 0 时返回垂直线的 x
+    来源为两个顶点的直线段与很细的矩形
+    """
+    other = 1 - axis
+    positions = [
+        points[0, axis] for points, *_ in geometry["polylines"]
+        if len(points) == 2 and abs(points[0, axis] - points[1, axis]) < 0.5 and abs(points[0, other] - points[1, other]) > 3
+    ]
+    for x0, y0, x1, y1, *_ in geometry["rects"]:
+        low, high = (x0, x1) if axis == 0 else (y0, y1)
+        span = (y1 - y0) if axis == 0 else (x1 - x0)
+        if high - low <= 1.5 and span > 3 * max(high - low, 1):
+            positions.append((low + high) / 2)
+    return np.array(positions, dtype=np.float64)
+
+
+def _snap(pixels: np.ndarray, rules: np.ndarray) -> np.ndarray:
+    """刻度文本只给出锚点; 每个刻度都有不同的网格线在 rule_snap_distance 以内时, 改用网格线的位置"""
+    if len(rules) == 0:
+        return pixels
+    nearest = np.argmin(np.abs(pixels[:, None] - rules[None, :]), axis=1)
+    snapped = rules[nearest]
+    if np.all(np.abs(snapped - pixels) <= rule_snap_distance) and len(set(nearest.tolist())) == len(pixels):
+        return snapped
+    return pixels
+
+
+def _clusters(values: list, tolerance: float = 1.0) -> list:
+    """按位置聚类 (相邻值之差不超过 tolerance), 返回每类的下标列表"""
+    order = sorted(range(len(values)), key=lambda i: values[i])
+    clusters = []
+    for i in order:
+        if clusters and values[i] - values[clusters[-1][-1]] <= tolerance:
+            clusters[-1].append(i)
+        else:
+            clusters.append([i])
+    return clusters
+
+
+def _axis_ticks(geometry: dict, marks_box: tuple) -> dict:
+    """
+    各坐标轴的刻度 {"x": [(像素, 文本)], "y": [(像素, 文本)]}
+    优先使用 d3 刻度组 (位置精确); 没有时使用对齐的刻度文本:
+      X 轴: 在数据图元下方、y 相同的一行文本中最多的一行
+      Y 轴: 锚点 x 相同的一列数值文本中最多的一列, 并吸附到相邻的水平网格线
+    """
+    axes = {}
+    for ticks in geometry["ticks"]:
+        spread = np.ptp(np.array([tick[:2] for tick in ticks]), axis=0)
+        axis = "x" if spread[0] > spread[1] else "y"
+        if len(ticks) > len(axes.get(axis, [])):
+            axes[axis] = [(tick[0] if axis == "x" else tick[1], tick[2]) for tick in ticks]
+
+    legend_texts = set(geometry["legend"].values())
+    texts = [(x, y, content) for x, y, content, _ in geometry["texts"] if content not in legend_texts]
+    if "x" not in axes:
+        below = [text for text in texts if text[1] > marks_box[3]]
+        rows = [[below[i] for i in cluster] for cluster in _clusters([text[1] for text in below])]
+        rows = [row for row in rows if len(row) >= 2]
+        if rows:
+            axes["x"] = [(x, content) for x, _, content in max(rows, key=len)]
+    if "y" not in axes:
+        numeric = [text for text in texts if _tick_number(text[2]) is not None]
+        columns = [[numeric[i] for i in cluster] for cluster in _clusters([text[0] for text in numeric])]
+        columns = [column for column in columns if len({round(y, 1) for _, y, _ in column}) >= 2]
+        if columns:
+            column = max(columns, key=len)
+            pixels = _snap(np.array([y for _, y, _ in column]), _rules(geometry, 1))
+            axes["y"] = [(float(pixel), content) for pixel, (_, _, content) in zip(pixels, column)]
+    return axes
+
+
+def _numeric_fit(ticks: list):
+    """数值刻度的最小二乘直线 (斜率, 截距), 少于两个不同位置的数值刻度时返回 None"""
+    numeric = [(pixel, _tick_number(label)) for pixel, label in ticks if _tick_number(label) is not None]
+    if len({round(pixel, 3) for pixel, _ in numeric}) < 2:
+        return None
+    slope, intercept = np.polyfit([pixel for pixel, _ in numeric], [value for _, value in numeric], 1)
+    return float(slope), float(intercept)
+
+
+def _category(color, legend_colors: dict) -> str:
+    return legend_colors.get(color, "RGB(%d, %d, %d)" % color)
+
+
+def _legend_colors(geometry: dict) -> dict:
+    colors = {}
+    for kind in ("rects", "circles"):
+        for shape in geometry[kind]:
+            if shape[-1] in geometry["legend"]:
+                colors[shape[-2]] = normalize_text_content(geometry["legend"][shape[-1]])
+    return colors
+
+
+def _bar_rows(chart_type: str, geometry: dict) -> list:
+    """
+    柱状图 / 堆叠柱状图: 数据矩形为有颜色、非白色、不是图例色块也不是细网格线的矩形
+      数值: 从零线 (1 像素以内) 画起或堆叠在其他矩形上的矩形 (以及 stackbar 的全部矩形) 取带符号的高度,
+            其余 (坐标轴不从零开始) 取离零线较远的一条边
+      X:   矩形水平中点最近的刻度; 柱子的列数多于刻度时刻度无法归属, X 为 None (不比较分类)
+    """
+    rects = [
+        rect for rect in geometry["rects"]
+        if rect[4] is not None and not _is_white(rect[4]) and rect[5] not in geometry["legend"]
+        and not (len(set(rect[4])) == 1 and min(rect[2] - rect[0], rect[3] - rect[1]) <= 1.5)
+    ]
+    if not rects:
+        raise ValueError("SVG 中没有数据矩形")
+    marks_box = (min(r[0] for r in rects), min(r[1] for r in rects), max(r[2] for r in rects), max(r[3] for r in rects))
+    axes = _axis_ticks(geometry, marks_box)
+    fit = _numeric_fit(axes.get("y", []))
+    if fit is None:
+        raise ValueError("SVG 中没有两个以上的 Y 轴数值刻度")
+    slope, intercept = fit
+    zero = -intercept / slope
+
+    x_ticks = [(pixel, label) for pixel, label in axes.get("x", []) if label]
+    columns = _clusters([(r[0] + r[2]) / 2 for r in rects])
+    if len(columns) > len(x_ticks):
+        x_ticks = []
+    centers = np.array([pixel for pixel, _ in x_ticks])
+    legend_colors = _legend_colors(geometry)
+
+    rows = []
+    for cluster in columns:
+        column = [rects[i] for i in cluster]
+        edges = [edge for r in column for edge in (r[1], r[3])]
+        label = None
+        if x_ticks:
+            center = float(np.mean([(r[0] + r[2]) / 2 for r in column]))
+            label = normalize_text_content(x_ticks[int(np.argmin(np.abs(centers - center)))][1])
+        for x0, y0, x1, y1, color, _ in column:
+            near, far = (y1, y0) if abs(y1 - zero) <= abs(y0 - zero) else (y0, y1)
+            stacked = sum(abs(edge - near) < 0.5 for edge in edges) > 1
+            if chart_type == "stackbar" or stacked or abs(near - zero) <= 1:
+                value = abs(slope) * (y1 - y0) * (1 if (far - near) * slope >= 0 else -1)
+            else:
+                value = slope * far + intercept
+            rows.append({"x": label, "y": round(float(value), 4), "category": _category(color, legend_colors)})
+    return rows
+
+
+def _axis_mapping(ticks: list):
+    """刻度 → 像素到数据的映射: 数值刻度为直线拟合, 否则为最近刻度的文本; 没有刻度时返回 None"""
+    fit = _numeric_fit(ticks)
+    if fit is not None and all(_tick_number(label) is not None for _, label in ticks):
+        slope, intercept = fit
+        return lambda pixel: round(float(slope * pixel + intercept), 4)
+    if not ticks:
+        return None
+    centers = np.array([pixel for pixel, _ in ticks])
+    return lambda pixel: normalize_text_content(ticks[int(np.argmin(np.abs(centers - pixel)))][1])
+
+
+def _point_rows(points: list, geometry: dict) -> list:
+    """点 [(x, y, 颜色)] 经坐标轴映射为数据行"""
+    if not points:
+        raise ValueError("SVG 中没有数据图元")
+    xs, ys = [p[0] for p in points], [p[1] for p in points]
+    axes = _axis_ticks(geometry, (min(xs), min(ys), max(xs), max(ys)))
+    x_value, y_value = _axis_mapping(axes.get("x", [])), _axis_mapping(axes.get("y", []))
+    if x_value is None or y_value is None or _numeric_fit(axes["y"]) is None:
+        raise ValueError("SVG 中没有可定位的 X 轴刻度或两个以上的 Y 轴数值刻度")
+    legend_colors = _legend_colors(geometry)
+    return [{"x": x_value(x), "y": y_value(y), "category": _category(color, legend_colors)} for x, y, color in points]
+
+
+def _line_rows(chart_type: str, geometry: dict) -> list:
+    """折线图: 数据折线为有描边色、不是坐标轴 (class 含 domain) 且不全由水平 / 垂直线段组成的折线, 取其顶点"""
+    points = []
+    for vertices, color, element in geometry["polylines"]:
+        steps = np.diff(vertices, axis=0)
+        if color is None or len(vertices) < 3 or "domain" in (element.get("class") or "").split() \
+                or np.all(np.isclose(steps[:, 0], 0) | np.isclose(steps[:, 1], 0)):
+            continue
+        points.extend((float(x), float(y), color) for x, y in vertices)
+    return _point_rows(points, geometry)
+
+
+def _scatter_rows(chart_type: str, geometry: dict) -> list:
+    """散点图: 有颜色、半径大于 0 且不是图例色块的 <circle>, 取其圆心"""
+    return _point_rows([
+        (cx, cy, color) for cx, cy, radius, color, element in geometry["circles"]
+        if color is not None and radius > 0 and element not in geometry["legend"]
+    ], geometry)
+
+
+def _pie_rows(chart_type: str, geometry: dict) -> list:
+    """饼图: 每个扇形的圆心角由圆弧起止点与顺时针 / 大弧标志得到, 占比为圆心角 / 360°"""
+    legend_colors = _legend_colors(geometry)
+    rows = []
+    for center, start, end, large, sweep, color, _ in geometry["slices"]:
+        if color is None:
+            continue
+        angles = np.degrees(np.arctan2([start[1] - center[1], end[1] - center[1]], [start[0] - center[0], end[0] - center[0]]))
+        swept = (angles[1] - angles[0]) % 360 if sweep else (angles[0] - angles[1]) % 360
+        # 起止点重合时为整圆
+        swept = 360.0 if large and swept < 1e-6 else swept
+        rows.append({"category": _category(color, legend_colors), "percentage": round(float(swept / 360), 4)})
+    if not rows:
+        raise ValueError("SVG 中没有扇形")
+    return rows
+
+
+svg_reference_builders = {"bar": _bar_rows, "stackbar": _bar_rows, "line": _line_rows, "scatter": _scatter_rows,
+                          "pie": _pie_rows}
+
+
+def svg_reference_rows(chart_type: str, svg_path) -> list:
+    """
+    只由 SVG 原文推导参考值, 不使用被检查的 SimVec 转换、图元分类、调色板与坐标轴代码:
+      坐标轴: d3 刻度组的位置, 或对齐的刻度文本 (吸附到网格线); 数值刻度做最小二乘直线拟合
+      bar / stackbar: 矩形的边与高度;  line: 折线顶点;  scatter: 圆心;  pie: 扇形的圆心角
+      分类: 图例中与图元同色的文本, 没有图例时为 "RGB(r, g, b)"
+    无法推导 (没有可定位的坐标轴或数据图元) 时抛出 ValueError
+    """
+    if chart_type not in svg_reference_builders:
+        raise ValueError(f"不支持由 SVG 推导 {chart_type} 的参考值")
+    return svg_reference_builders[chart_type](chart_type, read_svg_geometry(svg_path))
+
+
+def _value(row: dict) -> float:
+    value = row.get("y", row.get("percentage"))
+    return value if isinstance(value, (int, float)) else 0.0
+
+
+def _pairs(rows: list, reference: list) -> list:
+    """
+    按分类值配对 (输出顺序不影响结果): 先按 X 分组 (参考值没有 X 时全部为一组),
+    组内先按分类配对 (同一分类内按数值排序), 剩下的行再按数值排序配对; 多出或缺少的行配对为 None
+    """
+    def zip_sorted(actual, expected):
+        actual, expected = sorted(actual, key=_value), sorted(expected, key=_value)
+        length = min(len(actual), len(expected))
+        return list(zip(actual[:length], expected[:length])), actual[length:], expected[length:]
+
+    by_x = any(row.get("x") is not None for row in reference)
+    groups = {}
+    for side, items in enumerate((rows, reference)):
+        for row in items:
+            key = str(row.get("x")) if by_x else None
+            groups.setdefault(key, {}).setdefault(str(row.get("category")), ([], []))[side].append(row)
+    pairs = []
+    for categories in groups.values():
+        left_actual, left_expected = [], []
+        for actual, expected in categories.values():
+            matched, rest_actual, rest_expected = zip_sorted(actual, expected)
+            pairs.extend(matched)
+            left_actual.extend(rest_actual)
+            left_expected.extend(rest_expected)
+        matched, rest_actual, rest_expected = zip_sorted(left_actual, left_expected)
+        pairs.extend(matched)
+        pairs.extend((row, None) for row in rest_actual)
+        pairs.extend((None, row) for row in rest_expected)
+    return pairs
+
+
+def _nearest_errors(chart_type: str, rows: list, reference: list, scales: dict) -> tuple:
+    """
+    数值 X 的折线 / 散点: 抽取结果的点数取决于重采样与去重, 不逐行配对, 而是逐行求到参考值的距离
+      line:    到同色折线 (按参考顶点线性插值) 的 Y 误差, 超出折线 X 范围的部分计入 X 误差
+      scatter: 到同色参考点的距离 (X、Y 误差中较大者)
+    没有同色参考值时对全部参考值计算; 返回 (每行的最小误差, 每行最近的参考值是否同色)
+    """
+    series = {}
+    for row in reference:
+        series.setdefault(row.get("category"), []).append((row["x"], row["y"]))
+    series = {category: np.array(sorted(points)) for category, points in series.items()}
+
+    def distances(x, y, points):
+        if chart_type == "line":
+            outside = max(points[0, 0] - x, x - points[-1, 0], 0.0) / scales["x"]
+            return max(abs(y - np.interp(x, points[:, 0], points[:, 1])) / scales["y"], outside)
+        return float(np.min(np.maximum(np.abs(points[:, 0] - x) / scales["x"], np.abs(points[:, 1] - y) / scales["y"])))
+
+    errors, correct = [], []
+    for row in rows:
+        if not isinstance(row.get("x"), (int, float)) or not isinstance(row.get("y"), (int, float)):
+            errors.append(float("inf"))
+            correct.append(False)
+            continue
+        by_category = {category: distances(row["x"], row["y"], points) for category, points in series.items()}
+        nearest = min(by_category, key=by_category.get)
+        errors.append(by_category.get(row.get("category"), by_category[nearest]))
+        correct.append(nearest == row.get("category"))
+    return errors, correct
+
+
+def compare_to_reference(chart_type: str, rows: list, reference: list, source: str = "svg") -> dict:
+    """
+    与参考值比较, 返回行数与 metric_names[source] 中的两项指标:
+      数值误差 / 偏差: 数值字段的最大绝对误差除以该字段参考值的最大绝对值
+      分类正确率 / 一致率: 分类相同的行数 / 两者中较多的行数 (多出或缺少的行计为错误)
+    参考值的 X 为数值 (折线 / 散点) 时改为逐行求到参考值的距离 (见 _nearest_errors), 正确率的分母为抽取的行数;
+    参考值的 X 为 None (刻度无法归属到柱子) 时只按数值配对, 不报告分类正确率
+    """
+    scales = {}
+    for field in ("x", "y", "percentage"):
+        values = [abs(r[field]) for r in reference if isinstance(r.get(field), (int, float))]
+        scales[field] = max(values) if values and max(values) > 0 else 1.0
+
+    error_name, accuracy_name = metric_names[source]
+    result = {"rows": len(rows), "expected_rows": len(reference)}
+    if reference and all(isinstance(r.get("x"), (int, float)) for r in reference):
+        errors, correct = _nearest_errors(chart_type, rows, reference, scales)
+        result[error_name] = round(max(errors, default=0.0), 6)
+        result[accuracy_name] = round(sum(correct) / len(rows), 6) if rows else 0.0
+        return result
+
+    pairs = _pairs(rows, reference)
+    value_error, correct = 0.0, 0
+    for actual, expected in pairs:
+        if actual is None or expected is None:
+            continue
+        correct += actual.get("category") == expected.get("category")
+        for field, scale in scales.items():
+            if isinstance(expected.get(field), (int, float)) and isinstance(actual.get(field), (int, float)):
+                value_error = max(value_error, abs(actual[field] - expected[field]) / scale)
+    result[error_name] = round(value_error, 6)
+    if not any("x" in r and r["x"] is None for r in reference):
+        result[accuracy_name] = round(correct / len(pairs), 6) if pairs else 1.0
+    return result
+
+
+def _reference_path(chart_type: str, name: str) -> str:
+    return os.path.join(reference_directory, chart_type, name + ".json")
+
+
+def run_golden_set(selected_types: list = None, repeat: int = default_repeat) -> tuple:
+    """
+    对 input_data 中的每个图表运行完整流程 (SVG 转换 → 解析 → 存储 → 读取 → metadata → 抽取 → Vega-Lite)
+    返回 (报告, {图表: 抽取结果}); 报告包含每个图表的精度 (或与快照的偏差)、各阶段最短耗时、各阶段的总耗时,
+    以及本机校准负载的耗时和各阶段总耗时相对它的倍数; 处理失败的图表记录错误与失败前各阶段的耗时
+    """
+    if repeat < min_repeat:
+        raise ValueError(f"repeat 至少为 {min_repeat} (第一次运行包含预热, 耗时不可比)")
+    charts, rows_by_chart = {}, {}
+    calibration = calibrate()
+    with tempfile.TemporaryDirectory() as corpus_directory:
+        scratch_directory = os.path.join(corpus_directory, "scratch")
+        os.makedirs(scratch_directory)
+        for chart_type, name, svg_path in golden_charts(selected_types):
+            key = f"{chart_type}/{name}"
+            result = charts[key] = {}
+            try:
+                convert_seconds = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    simvec_text = "\n".join(svg_simvec_converter.convert_svg(svg_path))
+                    convert_seconds.append(time.perf_counter() - start)
+                result["seconds"] = {"convert": round(min(convert_seconds), 6)}
+                metadata, result["metadata"] = chart_metadata(chart_type, name, simvec_text)
+                for folder, extension, content in (
+                    ("raw_simvec_data", ".txt", simvec_text),
+                    ("raw_meta_data", ".json", json.dumps(metadata, ensure_ascii=False)),
+                ):
+                    directory = os.path.join(corpus_directory, folder, chart_type)
+                    os.makedirs(directory, exist_ok=True)
+                    with open(os.path.join(directory, name + extension), "w", encoding="utf-8") as f_out:
+                        f_out.write(content)
+
+                runs = [
+                    benchmark.benchmark_chart(corpus_directory, chart_type, name, scratch_directory, keep_rows=True)
+                    for _ in range(repeat)
+                ]
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+                continue
+
+            for stage in benchmark.stages:
+                result["seconds"][stage] = round(min(run["seconds"][stage] for run in runs), 6)
+            rows_by_chart[key] = runs[0]["rows"]
+
+            reference_path = _reference_path(chart_type, name)
+            if os.path.exists(reference_path):
+                with open(reference_path, "r", encoding="utf-8") as f:
+                    reference = json.load(f)
+                result["reference"] = reference["source"]
+                result.update(compare_to_reference(chart_type, runs[0]["rows"], reference["rows"], reference["source"]))
+    # 图表运行前后各校准一次, 避开开始时 CPU 尚未升频或中途的短暂干扰
+    calibration = min(calibration, calibrate())
+
+    totals = {
+        stage: round(sum(r["seconds"].get(stage, 0.0) for r in charts.values() if "seconds" in r), 6) for stage in stages
+    }
+    report = {
+        "charts": charts,
+        "stages": totals,
+        "calibration": round(calibration, 6),
+        "relative": {stage: round(seconds / calibration, 4) for stage, seconds in totals.items()},
+    }
+    return report, rows_by_chart
+
+
+def write_references(selected_types: list = None, rows_by_chart: dict = None):
+    """
+    重新生成参考值: 由 SVG 推导 (包括处理失败的图表), SVG 无法推导时保存 rows_by_chart 中抽取结果的快照
+    """
+    rows_by_chart = rows_by_chart or {}
+    written = 0
+    for chart_type, name, svg_path in golden_charts(selected_types):
+        key = f"{chart_type}/{name}"
+        try:
+            rows, source = svg_reference_rows(chart_type, svg_path), "svg"
+        except ValueError as e:
+            if key not in rows_by_chart:
+                print(f"⚠️ 无法由 SVG 推导 {key} 的参考值, 也没有抽取结果可作快照: {e}")
+                continue
+            print(f"⚠️ 无法由 SVG 推导 {key} 的参考值, 改用快照: {e}")
+            rows, source = rows_by_chart[key], "snapshot"
+        path = _reference_path(chart_type, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f_out:
+            json.dump({"source": source, "rows": rows}, f_out, indent=1, ensure_ascii=False)
+        written += 1
+    print(f"参考值已写入: {reference_directory} ({written} 个图表)")
+
+
+def find_regressions(report: dict, baseline: dict, error_tolerance: float = default_error_tolerance,
+                     accuracy_tolerance: float = default_accuracy_tolerance,
+                     latency_tolerance: float = default_latency_tolerance) -> list:
+    """
+    与基线比较, 返回回归说明的列表 (为空表示通过)
+    图表处理失败时, 只有基线中未失败 (或没有) 的图表算回归; 基线中已失败的图表作为已知失败照常计时
+    耗时比较各阶段的相对耗时, 消除机器速度的差异; 多出的耗时还要超过基线全部阶段总耗时的 latency_floor_share
+    """
+    regressions = []
+    for key, actual in report["charts"].items():
+        if "error" in actual and "error" not in baseline["charts"].get(key, {}):
+            regressions.append(f"{key}: 处理失败 ({actual['error']})")
+    for key, expected in baseline["charts"].items():
+        actual = report["charts"].get(key)
+        if actual is None:
+            regressions.append(f"{key}: 图表缺失")
+            continue
+        for error_name, accuracy_name in metric_names.values():
+            if error_name not in expected or "error" in actual:
+                continue
+            if error_name not in actual:
+                regressions.append(f"{key}: 缺少参考值")
+                continue
+            if actual[error_name] > expected[error_name] + error_tolerance:
+                regressions.append(f"{key}: {error_name} {expected[error_name]} → {actual[error_name]}")
+            # 刻度无法归属时不报告分类正确率
+            if accuracy_name in expected and actual.get(accuracy_name, 0.0) < expected[accuracy_name] - accuracy_tolerance:
+                regressions.append(f"{key}: {accuracy_name} {expected[accuracy_name]} → {actual.get(accuracy_name)}")
+
+    floor = latency_floor_share * sum(baseline["relative"].values())
+    for stage, expected in baseline["relative"].items():
+        actual = report["relative"].get(stage, 0.0)
+        if actual > expected * (1 + latency_tolerance) and actual - expected > floor:
+            regressions.append(f"阶段 {stage}: 相对耗时 {expected:.2f} → {actual:.2f} (校准负载的倍数)")
+    return regressions
+
+
+def print_report(report: dict, baseline: dict = None):
+    """逐图表打印精度 (或与快照的偏差) 与耗时, 给出基线时附上基线的相对耗时"""
+    for key, result in report["charts"].items():
+        if "error" in result:
+            known = baseline and "error" in baseline["charts"].get(key, {})
+            print(f"{key}: {'已知失败' if known else '失败'} ({result['error']})")
+            continue
+        if "reference" not in result:
+            print(f"{key}: 没有参考值 (运行 --update 生成)")
+            continue
+        error_name, accuracy_name = metric_names[result["reference"]]
+        accuracy = result.get(accuracy_name, "不适用 (刻度无法归属)")
+        if result["reference"] == "svg":
+            print(f"{key}: 精度 行数 {result['rows']}/{result['expected_rows']}, 数值误差 {result[error_name]}, "
+                  f"分类正确率 {accuracy}, metadata {result['metadata']}")
+        else:
+            print(f"{key}: 快照 行数 {result['rows']}/{result['expected_rows']}, 数值偏差 {result[error_name]}, "
+                  f"分类一致率 {accuracy}, metadata {result['metadata']}")
+    print(f"校准负载 {report['calibration']:.4f}s")
+    for stage, seconds in report["stages"].items():
+        relative = report["relative"][stage]
+        note = f" (基线 {baseline['relative'][stage]:.2f})" if baseline and stage in baseline.get("relative", {}) else ""
+        print(f"阶段 {stage:<10}{seconds:>10.4f}s  相对 {relative:>7.2f}{note}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="对 input_data 中的图表运行完整流程, 精度或吞吐量相对基线回归时失败")
+    parser.add_argument("--types", nargs="+", choices=data_formatter.chart_types, default=None)
+    parser.add_argument("--repeat", type=int, default=default_repeat,
+                        help=f"每个图表的运行次数 (至少 {min_repeat}), 各阶段取最短耗时")
+    parser.add_argument("--update", action="store_true", help="重新生成参考值与基线")
+    parser.add_argument("--update-baseline", action="store_true", help="只更新基线 (有意的精度或性能变化)")
+    parser.add_argument("--error-tolerance", type=float, default=default_error_tolerance)
+    parser.add_argument("--accuracy-tolerance", type=float, default=default_accuracy_tolerance)
+    parser.add_argument("--latency-tolerance", type=float, default=default_latency_tolerance)
+    parser.add_argument("--report", default=None, help="将本次报告写入该 JSON 文件")
+    args = parser.parse_args()
+    if args.repeat < min_repeat:
+        parser.error(f"--repeat 至少为 {min_repeat}: 第一次运行包含导入与缓存预热, 耗时不可比")
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        report, rows_by_chart = run_golden_set(args.types, args.repeat)
+    if args.update:
+        write_references(args.types, rows_by_chart)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            report, _ = run_golden_set(args.types, args.repeat)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f_out:
+            json.dump(report, f_out, indent=1, ensure_ascii=False)
+
+    if args.update or args.update_baseline:
+        os.makedirs(golden_directory, exist_ok=True)
+        with open(baseline_path, "w", encoding="utf-8") as f_out:
+            json.dump(report, f_out, indent=1, ensure_ascii=False)
+        print_report(report)
+        print(f"基线已写入: {baseline_path}")
+        sys.exit(0)
+
+    if not os.path.exists(baseline_path):
+        print_report(report)
+        print(f"没有基线: {baseline_path} (运行 --update 生成)")
+        sys.exit(1)
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print_report(report, baseline)
+    regressions = find_regressions(report, baseline, args.error_tolerance, args.accuracy_tolerance, args.latency_tolerance)
+    for regression in regressions:
+        print(f"❌ {regression}")
+    if regressions:
+        sys.exit(1)
+    print("✅ 精度与吞吐量均未回归")
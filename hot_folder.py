@@ -0,0 +1,205 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import build_cache
+import data_formatter
+import instrumentation
+import pipeline
+import svg_simvec_converter
+
+# 轮询输入目录的间隔 (秒); 文件在相邻两次轮询之间大小与修改时间均未变化才视为写入完成
+default_interval = 1.0
+
+
+def _signature(entry: os.DirEntry) -> tuple:
+    stat = entry.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def scan_inputs(selected_types: list) -> dict:
+    """
+    列出输入目录中的全部图表: {(chart_type, name): {"svg" / "simvec" / "metadata": (路径, (mtime_ns, size))}}
+      svg:      input_data/<type>/<name>.svg
+      simvec:   raw_simvec_data/<type>/<name>.txt
+      metadata: raw_meta_data/<type>/<name>.json
+    """
+    charts = {}
+    for chart_type in selected_types:
+        for half, directory, extension in (
+            ("svg", svg_simvec_converter.input_svg_directory, ".svg"),
+            ("simvec", data_formatter.input_simvec_directory, ".txt"),
+            ("metadata", data_formatter.input_metadata_directory, ".json"),
+        ):
+            directory = os.path.join(directory, chart_type)
+            if not os.path.isdir(directory):
+                continue
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(extension) and entry.is_file():
+                        name = entry.name[:-len(extension)]
+                        try:
+                            charts.setdefault((chart_type, name), {})[half] = (entry.path, _signature(entry))
+                        except FileNotFoundError:
+                            continue
+    return charts
+
+
+def chart_version(files: dict):
+    """
+    图表输入的版本: SimVec 一半 (有 SVG 时取 SVG, 由它生成的 raw_simvec 不计入) 与 metadata 的签名
+    缺少任意一半时返回 None
+    """
+    source = files.get("svg") or files.get("simvec")
+    if source is None or "metadata" not in files:
+        return None
+    return source[1], files["metadata"][1]
+
+
+def process_arrival(task: tuple) -> dict:
+    """
+    在工作进程中处理一个新到达或有变化的图表: 有 SVG 时先转换为 raw_simvec (SVG 比现有 SimVec 新时才转换),
+    再运行 pipeline.process_chart
+    """
+    chart_type, chart_name, svg_path, options, previous = task
+    if svg_path:
+        simvec_path = os.path.join(data_formatter.input_simvec_directory, chart_type, chart_name + ".txt")
+        try:
+            if not os.path.exists(simvec_path) or os.path.getmtime(svg_path) > os.path.getmtime(simvec_path):
+                os.makedirs(os.path.dirname(simvec_path), exist_ok=True)
+                # 先写临时文件再替换, 同时运行的批处理脚本不会读到写了一半的 SimVec
+                svg_simvec_converter.convert_file(svg_path, simvec_path + ".tmp")
+                os.replace(simvec_path + ".tmp", simvec_path)
+        except Exception as e:
+            return {"chart_type": chart_type, "chart": chart_name, "status": "failed", "seconds": 0.0,
+                    "error": f"SVG 转换失败: {type(e).__name__}: {e}", "metrics": []}
+    return pipeline.process_chart((chart_type, chart_name, options, previous))
+
+
+def watch(selected_types: list = None, workers: int = None, interval: float = default_interval,
+          skip_existing: bool = False, once: bool = False, vega_lite: bool = False, in_memory: bool = False,
+          extractor_options: dict = None) -> list:
+    """
+    轮询 input_data、raw_simvec_data 与 raw_meta_data, 把新到达或有变化的图表交给有界的进程池处理:
+      - 文件在相邻两次轮询之间保持不变才视为写入完成; SimVec 与 metadata 两半都到齐后图表才进入队列
+      - 同时处理的图表不超过 workers 个, 其余在队列中等待; 处理中的图表再次变化时, 完成后重新处理
+      - 每个图表完成后立即写出 extracted_data (以及 Vega-Lite 规范), 并更新构建清单与指标
+    各阶段以增量模式运行, 未变化的阶段 (例如只更新了 metadata 时的 SimVec 规范化) 会被跳过
+    skip_existing 为 True 时, 启动时已存在的图表视为已处理; once 为 True 时处理完当前全部图表后返回
+    extractor_options 见 pipeline.run_pipeline
+    返回全部处理结果 (once 模式) 或在 Ctrl+C 后返回已完成的结果
+    """
+    selected_types = selected_types or pipeline.chart_types
+    workers = workers or os.cpu_count() or 1
+    manifest = build_cache.load_manifest()
+    options = {
+        "json": False,
+        "incremental": True,
+        "vega_lite": vega_lite,
+        "profile": False,
+        "in_memory": in_memory,
+        "keep_intermediates": False,
+        "extractor_options": extractor_options or {},
+    }
+
+    processed = {}
+    if skip_existing:
+        for key, files in scan_inputs(selected_types).items():
+            version = chart_version(files)
+            if version is not None:
+                processed[key] = version
+
+    previous_scan, queue, queued, running, results = {}, deque(), set(), {}, []
+    metrics, first_seen = {}, {}
+    next_scan = time.monotonic()
+    print(f"监视中: {', '.join(selected_types)} ({workers} 个进程, 每 {interval}s 轮询一次)", file=sys.stderr)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        try:
+            while True:
+                if time.monotonic() >= next_scan:
+                    scan = scan_inputs(selected_types)
+                    in_flight = queued | {task[:2] for task in running.values()}
+                    unsettled = 0
+                    for key, files in scan.items():
+                        version = chart_version(files)
+                        if version is None or processed.get(key) == version or key in in_flight:
+                            continue
+                        # 到达时间从第一次看到变化算起, 包括等待写入完成的时间
+                        first_seen.setdefault(key, time.monotonic())
+                        if files != previous_scan.get(key):
+                            unsettled += 1
+                            continue
+                        queue.append((key, first_seen.pop(key)))
+                        queued.add(key)
+                    previous_scan = scan
+                    next_scan = time.monotonic() + interval
+                    if once and not (queue or running or unsettled):
+                        break
+
+                while queue and len(running) < workers:
+                    (chart_type, chart_name), arrived = queue.popleft()
+                    queued.discard((chart_type, chart_name))
+                    files = previous_scan.get((chart_type, chart_name), {})
+                    version = chart_version(files)
+                    if version is None:
+                        continue
+                    processed[(chart_type, chart_name)] = version
+                    svg_path = files["svg"][0] if "svg" in files else None
+                    task = (chart_type, chart_name, svg_path, options, manifest["charts"].get(f"{chart_type}/{chart_name}"))
+                    running[executor.submit(process_arrival, task)] = (chart_type, chart_name, arrived)
+
+                if not running:
+                    time.sleep(max(0.0, next_scan - time.monotonic()))
+                    continue
+                done, _ = wait(running, timeout=max(0.0, next_scan - time.monotonic()), return_when=FIRST_COMPLETED)
+                if not done:
+                    continue
+
+                records = []
+                for future in done:
+                    chart_type, chart_name, arrived = running.pop(future)
+                    key = f"{chart_type}/{chart_name}"
+                    result = future.result()
+                    if result["status"] == "failed":
+                        print(f"  失败 {key}: {result['error']}", file=sys.stderr)
+                    else:
+                        if "cache" in result:
+                            manifest["charts"][key] = result.pop("cache")
+                        print(f"  {'完成' if result['status'] == 'ok' else '跳过'} {key} "
+                              f"({result['seconds']}s, 到达后 {time.monotonic() - arrived:.2f}s)", file=sys.stderr)
+                    for record in result.pop("metrics", []):
+                        metrics[key] = record
+                        records.append(record)
+                    results.append(result)
+                build_cache.save_manifest(manifest)
+                if records:
+                    # 结构化日志追加本批记录; Prometheus 快照汇总每个图表最近一次的记录
+                    instrumentation.write_json_log(records, "hot_folder")
+                    instrumentation.write_prometheus(list(metrics.values()), "hot_folder")
+        except KeyboardInterrupt:
+            print("已停止监视, 等待处理中的图表完成", file=sys.stderr)
+            for future in running:
+                future.cancel()
+    build_cache.save_manifest(manifest)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="监视输入目录, 增量处理新到达或有变化的图表")
+    parser.add_argument("--types", nargs="+", choices=pipeline.chart_types, default=pipeline.chart_types, help="要监视的图表类型")
+    parser.add_argument("--workers", type=int, default=None, help="同时处理的图表数 (进程数), 默认为 CPU 核数")
+    parser.add_argument("--interval", type=float, default=default_interval, help="轮询间隔 (秒)")
+    parser.add_argument("--skip-existing", action="store_true", help="启动时已存在的图表不处理, 只处理之后的变化")
+    parser.add_argument("--once", action="store_true", help="处理完当前全部图表后退出, 不继续监视")
+    parser.add_argument("--vega-lite", action="store_true", help="同时为每个图表生成 Vega-Lite 规范")
+    parser.add_argument("--in-memory", action="store_true", help="不经过 cleaned_* 文件, 在内存中完成规范化与抽取")
+    pipeline.add_extractor_arguments(parser)
+    args = parser.parse_args()
+
+    results = watch(args.types, args.workers, args.interval, args.skip_existing, args.once, args.vega_lite, args.in_memory,
+                    pipeline.extractor_options_from_args(args))
+    if args.once:
+        sys.exit(1 if any(r["status"] == "failed" for r in results) else 0)
@@ -0,0 +1,157 @@
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+
+from simvec_model import SimVecChart, polyline_types, simvec_types
+from text_index import AxisCalibrationError
+
+# 结构化日志与 Prometheus 快照的保存位置
+log_directory = "intermediate_data/logs"
+json_log_path = os.path.join(log_directory, "metrics.jsonl")
+profile_directory = os.path.join(log_directory, "profiles")
+
+# 未匹配图例时的回退分类: "Unknown" 或 "RGB(...)" / "RGBNone"
+fallback_category_pattern = re.compile(r"^(Unknown|RGB\(.*\)|RGBNone)$")
+
+# 当前进程中尚未取走的图表记录: (chart_type, chart) → 记录
+_records = {}
+
+
+def chart_record(chart_type: str, chart: str) -> dict:
+    """返回 (必要时创建) 某个图表的记录"""
+    key = (chart_type, chart)
+    if key not in _records:
+        _records[key] = {
+            "chart_type": chart_type,
+            "chart": chart,
+            "stages": {},
+            "primitives": {},
+            "categories": 0,
+            "fallback_categories": 0,
+            "calibration_failures": [],
+            "errors": [],
+        }
+    return _records[key]
+
+
+@contextmanager
+def stage(chart_type: str, chart: str, name: str):
+    """记录一个阶段的墙钟耗时; 阶段抛出的异常照常向上传递, 同时记入图表记录"""
+    record = chart_record(chart_type, chart)
+    start = time.perf_counter()
+    try:
+        yield record
+    except AxisCalibrationError as e:
+        record["calibration_failures"].append({"stage": name, "axis": e.axis, "error": str(e)})
+        raise
+    except Exception as e:
+        record["errors"].append({"stage": name, "error": f"{type(e).__name__}: {e}"})
+        raise
+    finally:
+        record["stages"][name] = record["stages"].get(name, 0.0) + time.perf_counter() - start
+
+
+def record_primitives(chart_type: str, chart: str, columns: SimVecChart):
+    """按类型记录图元数量 (折线与区域另外记录顶点数)"""
+    primitives = chart_record(chart_type, chart)["primitives"]
+    for kind in simvec_types:
+        primitives[kind] = len(columns[kind])
+    for kind in polyline_types:
+        primitives[f"{kind}_points"] = len(columns[kind].points)
+
+
+def record_categories(chart_type: str, chart: str, categories, weights=None):
+    """记录输出数据的分类数量, 以及其中回退到 "Unknown" / "RGB(...)" 的数量 (weights 为每个分类对应的行数)"""
+    record = chart_record(chart_type, chart)
+    weights = weights if weights is not None else [1] * len(categories)
+    for category, weight in zip(categories, weights):
+        record["categories"] += weight
+        if isinstance(category, str) and fallback_category_pattern.match(category):
+            record["fallback_categories"] += weight
+
+
+def take_records() -> list:
+    """取走当前进程中的全部图表记录 (工作进程把它们随结果返回给主进程)"""
+    records = list(_records.values())
+    _records.clear()
+    return records
+
+
+def write_json_log(records: list, source: str, path: str = json_log_path):
+    """以每行一个 JSON 对象的形式追加写入结构化日志"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    timestamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+    with open(path, "a", encoding="utf-8") as f_out:
+        f_out.write("".join(
+            json.dumps({"time": timestamp, "source": source, **r}, ensure_ascii=False) + "\n" for r in records
+        ))
+
+
+def _labels(**labels) -> str:
+    """生成 Prometheus 标签字符串, 转义反斜杠与引号"""
+    escaped = {k: str(v).replace("\\", "\\\\").replace('"', '\\"') for k, v in labels.items()}
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped.items()) + "}"
+
+
+def prometheus_snapshot(records: list, source: str) -> str:
+    """将本次运行的记录汇总为 Prometheus 文本格式, 所有指标带上 source 标签 (产生记录的脚本)"""
+    totals = {}
+
+    def add(metric: str, labels: str, value: float):
+        totals.setdefault(metric, {})
+        totals[metric][labels] = totals[metric].get(labels, 0) + value
+
+    for r in records:
+        chart_type = r["chart_type"]
+        add("simvec_charts_total", _labels(source=source, chart_type=chart_type, status="failed" if r["errors"] or r["calibration_failures"] else "ok"), 1)
+        for name, seconds in r["stages"].items():
+            add("simvec_stage_seconds_total", _labels(source=source, chart_type=chart_type, stage=name), seconds)
+            add("simvec_stage_runs_total", _labels(source=source, chart_type=chart_type, stage=name), 1)
+        for kind, count in r["primitives"].items():
+            add("simvec_primitives_total", _labels(source=source, chart_type=chart_type, kind=kind), count)
+        add("simvec_output_rows_total", _labels(source=source, chart_type=chart_type), r["categories"])
+        add("simvec_fallback_category_rows_total", _labels(source=source, chart_type=chart_type), r["fallback_categories"])
+        for failure in r["calibration_failures"]:
+            add("simvec_axis_calibration_failures_total", _labels(source=source, chart_type=chart_type, axis=failure["axis"]), 1)
+
+    descriptions = {
+        "simvec_charts_total": "Charts processed, by outcome",
+        "simvec_stage_seconds_total": "Wall time spent per stage",
+        "simvec_stage_runs_total": "Number of times each stage ran",
+        "simvec_primitives_total": "SimVec primitives by type",
+        "simvec_output_rows_total": "Extracted data rows",
+        "simvec_fallback_category_rows_total": "Rows whose category fell back to Unknown or RGB(...)",
+        "simvec_axis_calibration_failures_total": "Axis calibrations that could not match enough ticks",
+    }
+    lines = []
+    for metric, description in descriptions.items():
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} counter")
+        for labels, value in sorted(totals.get(metric, {}).items()):
+            lines.append(f"{metric}{labels} {round(value, 6)}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(records: list, source: str, directory: str = log_directory) -> str:
+    """
+    原子地写出 <source>.prom 文本快照 (可由 node_exporter 的 textfile collector 读取)
+    每个脚本各写一个文件, 互不覆盖
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{source}.prom")
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f_out:
+        f_out.write(prometheus_snapshot(records, source))
+    os.replace(temp_path, path)
+    return path
+
+
+def flush(source: str, records: list = None) -> list:
+    """写出结构化日志与 Prometheus 快照, 默认使用当前进程中的记录"""
+    records = take_records() if records is None else records
+    if records:
+        write_json_log(records, source)
+        write_prometheus(records, source)
+    return records
@@ -1,113 +1,137 @@
+import argparse
 import json
-import math
 import os
 
-# 目录路径
+import numpy as np
+
+import instrumentation
+from color_palette import palette_for
+from simvec_model import SimVecChart
+from simvec_storage import load_simvec
+from spatial_index import classify_primitives
+from text_index import TextIndex, tick_value
+
+# 图表类型与目录路径
+chart_type = 'line'
 meta_data_dir = 'intermediate_data/cleaned_meta_data/line'
 simvec_data_dir = 'intermediate_data/cleaned_simvec_data/line'
 output_dir = 'intermediate_data/extracted_data/line'
 
-# 确保输出目录存在
-os.makedirs(output_dir, exist_ok=True)
-
-# 颜色处理函数
-def hex_to_rgb(hex_color: str) -> tuple:
-    """将十六进制颜色转换为 (R, G, B) 元组格式"""
-    hex_color = hex_color.lstrip('#')
-    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-
-def color_distance(rgb1: tuple, rgb2: tuple) -> float:
-    """计算两个 RGB 颜色之间的欧氏距离"""
-    return math.sqrt(sum((c1 - c2) ** 2 for c1, c2 in zip(rgb1, rgb2)))
 
-# 遍历 `metadata` 目录中的每一个 JSON 文件
-for file_name in os.listdir(meta_data_dir):
-    if not file_name.endswith('.json'):
-        continue
+def extract_line_series(metadata: dict, simvec_data: SimVecChart, resample: bool = False) -> list:
+    """
+    根据清洗后的 metadata 与 simvec 列式数据, 批量计算每条折线的数据坐标
+    返回 [(category, x_values, y_values), ...], 坐标为 ndarray
+    resample 为 True 时只在 X 轴刻度处线性插值取值, 而不是输出每个像素级顶点
+    """
+    # 3. 提取 `X 轴` 和 `Y 轴` 刻度，并用所有匹配到的刻度拟合像素与数值的缩放比例
+    text_index = TextIndex(simvec_data.text)
+    x_axis = text_index.fit_axis(metadata['xAxis']['ticks'], 'x')
+    y_axis = text_index.fit_axis(metadata['yAxis']['ticks'], 'y')  # 像素坐标向下为正, 拟合出的斜率为负
+
+    # 4. 解析 `legend` (颜色分类), 构建一次调色板
+    palette = palette_for(metadata)
+    if palette.color_to_category is None:
+        print("⚠️ 没有 `legend` 数据，默认使用 RGB 颜色作为分类。")
 
+    # 5. 对所有顶点做一次仿射变换, 得到数据坐标 (X, Y)
+    line_column = simvec_data.line
+    offsets = line_column.offsets
+    points = np.asarray(line_column.points, dtype=np.float64).reshape(-1, 2)
+    x_values = x_axis.value(points[:, 0])
+    y_values = y_axis.value(points[:, 1])
+    tick_values = np.sort(np.array([v for v in map(tick_value, metadata['xAxis']['ticks']) if v is not None]))
+
+    # 6. 由空间索引排除坐标轴 / 网格线与图例中的短线, 按折线切分, 其余折线的类别 (category) 批量确定
+    marks = classify_primitives(simvec_data, metadata, text_index).marks('line')
+    series = []
+    categories = palette.classify(line_column.rgb[marks])
+    for i, category in zip(marks.tolist(), categories):
+        xs = x_values[offsets[i]:offsets[i + 1]]
+        ys = y_values[offsets[i]:offsets[i + 1]]
+        if resample and len(xs) > 0:
+            # 只保留落在折线 X 范围内的刻度, 按 X 排序后向量化插值
+            order = np.argsort(xs, kind='stable')
+            xs, ys = xs[order], ys[order]
+            ticks = tick_values[(tick_values >= xs[0]) & (tick_values <= xs[-1])]
+            xs, ys = ticks, np.interp(ticks, xs, ys)
+        series.append((category, xs, ys))
+
+    return series
+
+
+def series_rows(series: list):
+    """将折线坐标逐点展开为输出行 (保留两位小数)"""
+    for category, xs, ys in series:
+        for x_value, y_value in zip(xs.tolist(), ys.tolist()):
+            yield {"x": round(x_value, 2), "y": round(y_value, 2), "category": category}
+
+
+def extract_line_data(metadata: dict, simvec_data: SimVecChart, resample: bool = False) -> list:
+    """根据清洗后的 metadata 与 simvec 列式数据计算折线图数据"""
+    return list(series_rows(extract_line_series(metadata, simvec_data, resample)))
+
+
+def process_file(file_name: str, resample: bool = False):
+    """处理单个图表: 读取 metadata 与 simvec, 计算折线图数据并写出结果 (resample 见 extract_line_series)"""
     file_base_name = os.path.splitext(file_name)[0]
 
     # 文件路径
     meta_file_path = os.path.join(meta_data_dir, file_name)
-    simvec_file_path = os.path.join(simvec_data_dir, file_name)
-    output_file_path = os.path.join(output_dir, f"{file_base_name}.txt")
 
     print(f"\n正在处理文件: {file_name}")
 
-    # 1. 读取 `metadata`
-    with open(meta_file_path, 'r', encoding='utf-8') as f:
-        metadata = json.load(f)
-
-    # 2. 读取 `simvec`
-    with open(simvec_file_path, 'r', encoding='utf-8') as f:
-        simvec_data = json.load(f)
+    with instrumentation.stage(chart_type, file_base_name, 'load'):
+        # 1. 读取 `metadata`
+        with open(meta_file_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
 
-    # 3. 提取 `X 轴` 和 `Y 轴` 刻度，并计算 `scale`
-    x_ticks = metadata['xAxis']['ticks']
-    y_ticks = metadata['yAxis']['ticks']
+        # 2. 读取 `simvec` (优先内存映射二进制格式, 数值列不发生拷贝)
+        simvec_data = load_simvec(os.path.join(simvec_data_dir, file_base_name))
+    instrumentation.record_primitives(chart_type, file_base_name, simvec_data)
+    process_data(file_name, metadata, simvec_data, resample)
 
-    # 计算 `X 轴` 像素与数值的缩放比例
-    x_positions = {text['content']: text['position'][0] for text in simvec_data['text'] if text['content'] in x_ticks}
-    x_min_pixel = min(x_positions.values())
-    x_max_pixel = max(x_positions.values())
 
-    x_min_value = float(x_ticks[0])
-    x_max_value = float(x_ticks[-1])
+def process_data(file_name: str, metadata: dict, simvec_data: SimVecChart, resample: bool = False):
+    """由已在内存中的 metadata 与 simvec 计算折线图数据并写出结果 (pipeline 的内存模式直接调用)"""
+    # 确保输出目录存在
+    os.makedirs(output_dir, exist_ok=True)
 
-    x_scale = (x_max_value - x_min_value) / (x_max_pixel - x_min_pixel)
-
-    # 计算 `Y 轴` 像素与数值的缩放比例
-    y_positions = {text['content']: text['position'][1] for text in simvec_data['text'] if text['content'] in y_ticks}
-    y_min_pixel = min(y_positions.values())  # 低 y 坐标代表高数值
-    y_max_pixel = max(y_positions.values())  # 高 y 坐标代表低数值
+    file_base_name = os.path.splitext(file_name)[0]
+    output_file_path = os.path.join(output_dir, f"{file_base_name}.txt")
 
-    y_min_value = float(y_ticks[0])
-    y_max_value = float(y_ticks[-1])
+    with instrumentation.stage(chart_type, file_base_name, 'extract'):
+        series = extract_line_series(metadata, simvec_data, resample)
+    instrumentation.record_categories(
+        chart_type, file_base_name, [category for category, _, _ in series], [len(xs) for _, xs, _ in series]
+    )
+
+    # 7. 输出到文件 (分类名称每条折线只序列化一次, 整体一次写入)
+    with instrumentation.stage(chart_type, file_base_name, 'write'):
+        with open(output_file_path, 'w', encoding='utf-8') as output_file:
+            output_file.write(f"计算出的折线图数据 ({file_name}):\n")
+            lines = []
+            for category, xs, ys in series:
+                category_json = json.dumps(category, ensure_ascii=False)
+                lines.extend(
+                    f'{{"x": {round(x_value, 2)!r}, "y": {round(y_value, 2)!r}, "category": {category_json}}},\n'
+                    for x_value, y_value in zip(xs.tolist(), ys.tolist())
+                )
+            output_file.write("".join(lines))
 
-    y_scale = (y_max_value - y_min_value) / (y_min_pixel - y_max_pixel)
+    print(f" 结果已保存至: {output_file_path}")
 
-    # 4. 解析 `legend` (颜色分类)
-    color_to_category = {}
-    tolerance = 60  # 颜色匹配的容差
 
-    if 'legend' in metadata and isinstance(metadata['legend'], dict) and 'items' in metadata['legend'] and 'colors' in metadata['legend']:
-        legend_items = metadata['legend']['items']
-        legend_colors = [hex_to_rgb(color) for color in metadata['legend']['colors']]
-        color_to_category = dict(zip(legend_colors, legend_items))
-    else:
-        print("⚠️ 没有 `legend` 数据，默认使用 RGB 颜色作为分类。")
-        color_to_category = None  # 无图例模式
-
-    # 5. 解析 `line` 数据
-    line_data = []
-    for line in simvec_data['line']:
-        line_color = eval(line['color'])  # 解析 RGB 颜色
-        points = line['points']
-
-        # 确定类别 (category)
-        if color_to_category:
-            category = "Unknown"
-            min_distance = float('inf')
-
-            for legend_color, legend_category in color_to_category.items():
-                distance = color_distance(line_color, legend_color)
-                if distance < min_distance and distance <= tolerance:
-                    min_distance = distance
-                    category = legend_category
-        else:
-            category = f"RGB{line_color}"
-
-        # 计算标准化坐标 (X, Y)
-        for x_pixel, y_pixel in points:
-            x_value = x_min_value + (x_pixel - x_min_pixel) * x_scale
-            y_value = y_max_value - (y_pixel - y_max_pixel) * y_scale  # 由于像素坐标向下为正，需要反转 Y 轴
-
-            line_data.append({"x": round(x_value, 2), "y": round(y_value, 2), "category": category})
-
-    # 6. 输出到文件
-    with open(output_file_path, 'w', encoding='utf-8') as output_file:
-        output_file.write(f"计算出的折线图数据 ({file_name}):\n")
-        for line in line_data:
-            output_file.write(json.dumps(line, ensure_ascii=False) + ",\n")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="由 cleaned_* 数据计算折线图数据")
+    parser.add_argument("--resample", action="store_true", help="每条折线只在 X 轴刻度处插值输出, 而不是输出所有像素级顶点")
+    args = parser.parse_args()
 
-    print(f" 结果已保存至: {output_file_path}")
+    # 遍历 `metadata` 目录中的每一个 JSON 文件
+    try:
+        for file_name in os.listdir(meta_data_dir):
+            if file_name.endswith('.json'):
+                process_file(file_name, args.resample)
+    finally:
+        # 写出结构化日志与 Prometheus 快照
+        instrumentation.flush("line_data_extractor")
@@ -0,0 +1,394 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+import data_formatter
+import spatial_index
+from simvec_model import SimVecChart, unpack_rgb
+from spatial_index import ChartLayout, bounding_boxes, classify_primitives, legend_gap, swatch_shaped
+from simvec_storage import load_simvec
+from simvec_tokenizer import normalize_text_content
+from text_index import AxisCalibrationError, TextIndex, tick_value
+
+# 置信度不低于该值时直接使用推断结果, 否则交给多模态模型
+default_threshold = 0.8
+
+# 同一行 (x 轴刻度) / 同一列 (y 轴刻度, 右对齐) 的文本坐标容差 (像素)
+alignment_tolerance = 2.5
+
+# 各图表类型的抽取模块需要拟合的定量坐标轴; 推断出的刻度无法拟合时置信度不超过 uncalibrated_score
+calibrated_axes = {
+    "Bar Chart": ("y",),
+    "Stacked Bar Chart": ("y",),
+    "Line Chart": ("x", "y"),
+    "Scatter Plot": ("x", "y"),
+}
+uncalibrated_score = 0.5
+
+
+def _is_number(text: str) -> bool:
+    return tick_value(text) is not None
+
+
+def _display(text: str) -> str:
+    """SimVec 文本中的空格已被替换为下划线, 还原为 metadata 中的写法"""
+    return text.replace("_", " ")
+
+
+def _hex(rgb: int) -> str:
+    return "#{:06X}".format(int(rgb))
+
+
+def _aligned_groups(values: np.ndarray, tolerance: float = alignment_tolerance) -> list:
+    """把坐标排序后按间隔切分成组, 返回每组的下标数组"""
+    if len(values) == 0:
+        return []
+    order = np.argsort(values, kind="stable")
+    breaks = np.flatnonzero(np.diff(values[order]) > tolerance) + 1
+    return np.split(order, breaks)
+
+
+def _with_swatches(layout: ChartLayout, swatches: dict) -> ChartLayout:
+    """在 classify_primitives 的结果上把图例色块标记为 legend, 返回新的 ChartLayout"""
+    roles = {kind: kind_roles.copy() for kind, kind_roles in layout.roles.items()}
+    for kind, rows in swatches.items():
+        roles[kind][sorted(rows)] = spatial_index.legend
+    return ChartLayout(roles, layout.plot_area)
+
+
+def _find_legend(columns: SimVecChart, texts: list, layout: ChartLayout) -> tuple:
+    """
+    图例: 紧挨文本的小正方形色块 (矩形或圆), 尺寸条件与抽取模块相同 (spatial_index.swatch_shaped)
+    文本通常位于色块右侧; 右侧一个图例项都找不到时, 再找色块左侧的文本 (右对齐的图例, 例如 d3 的 text-anchor: end)
+    色块的尺寸条件一次向量化判断; 色块按边缘排序后, 每个文本只二分查找 legend_gap 像素以内的色块
+    返回 (legend 或 None, 图例文本下标集合, {图元类型: 色块下标集合})
+    """
+    names = ("rect", "circle")
+    boxes = bounding_boxes(columns)
+    kinds, rows, lefts, rights, middles, heights = [], [], [], [], [], []
+    for code, kind in enumerate(names):
+        box = boxes[kind]
+        w, h = box[:, 2] - box[:, 0], box[:, 3] - box[:, 1]
+        # 推断时还不知道图例文本, 另外要求色块近似正方形
+        found = np.flatnonzero(columns[kind].valid & swatch_shaped(box, kind) & (np.abs(w - h) <= 2))
+        kinds.append(np.full(len(found), code))
+        rows.append(found)
+        lefts.append(box[found, 0])
+        rights.append(box[found, 2])
+        middles.append((box[found, 1] + box[found, 3]) / 2)
+        heights.append(h[found])
+    kinds, rows, lefts, rights, middles, heights = (np.concatenate(a) for a in (kinds, rows, lefts, rights, middles, heights))
+
+    # 文本的 x 坐标为右边缘
+    text_position = columns.text.position
+    text_rights = text_position[:, 0]
+    text_lefts = text_rights - text_position[:, 2]
+    for edges, text_edges, side in ((rights, text_lefts, 1), (lefts, text_rights, -1)):
+        order = np.argsort(edges, kind="stable")
+        # 色块与文本之间的间距 side * (文本边缘 - 色块边缘) 在 [-2, legend_gap] 以内
+        low, high = (text_edges - legend_gap, text_edges + 2) if side > 0 else (text_edges - 2, text_edges + legend_gap)
+        starts = np.searchsorted(edges[order], low, side="left")
+        ends = np.searchsorted(edges[order], high, side="right")
+
+        # 垂直方向对齐的候选文本: {(类型代码, 色块下标): [(间距, 文本下标), ...]}
+        candidates = {}
+        for t in np.flatnonzero(ends > starts).tolist():
+            span = order[starts[t]:ends[t]]
+            ty, th = text_position[t, 1], text_position[t, 3]
+            span = span[np.abs(ty - middles[span]) <= np.maximum(heights[span], th) / 2 + 1]
+            for code, i, gap in zip(kinds[span].tolist(), rows[span].tolist(), (side * (text_edges[t] - edges[span])).tolist()):
+                candidates.setdefault((code, i), []).append((gap, t))
+
+        # 按图元顺序为每个色块选取间距最小、尚未被占用的文本
+        items, used_texts, swatches = [], set(), {name: set() for name in names}
+        for code, i in sorted(candidates):
+            free = [candidate for candidate in candidates[(code, i)] if candidate[1] not in used_texts]
+            if free:
+                _, t = min(free)
+                kind = names[code]
+                x, y = columns[kind].position[i, :2].tolist()
+                used_texts.add(t)
+                swatches[kind].add(i)
+                items.append((y, x, _display(texts[t]), _hex(columns[kind].rgb[i])))
+
+        if len(items) >= 2 or (items and len(_data_colors(columns, _with_swatches(layout, swatches))) == 1):
+            # 图例按阅读顺序 (先上下后左右) 排列
+            items.sort(key=lambda item: (round(item[0] / 4), item[1]))
+            return {"items": [item[2] for item in items], "colors": [item[3] for item in items]}, used_texts, swatches
+        # 单个孤立的 "色块 + 文本" 更可能是误判, 只有在图表只有一种颜色时才保留
+    return None, set(), {name: set() for name in names}
+
+
+def _data_rects(columns: SimVecChart, layout: ChartLayout) -> np.ndarray:
+    """数据矩形: 有颜色、非白色、非坐标轴 / 网格线、非图例色块、非背景的矩形下标"""
+    column = columns.rect
+    position = column.position
+    if len(position) == 0:
+        return np.zeros(0, dtype=np.int64)
+    canvas = max(float((position[:, 0] + position[:, 2] / 2).max()), 1.0) * max(float((position[:, 1] + position[:, 3]).max()), 1.0)
+    color = unpack_rgb(column.rgb).astype(np.int64)
+    keep = (
+        column.valid
+        & (layout.roles["rect"] == spatial_index.mark)
+        & ~np.all(color >= 245, axis=1)
+        & (position[:, 2] > 0)
+        & (position[:, 3] > 0)
+        & (position[:, 2] * position[:, 3] < canvas / 2)
+    )
+    return np.flatnonzero(keep)
+
+
+def _data_lines(columns: SimVecChart, layout: ChartLayout) -> list:
+    """数据折线: 有颜色且至少 3 个顶点, 排除坐标轴与刻度线"""
+    column = columns.line
+    valid = column.valid & (layout.roles["line"] == spatial_index.mark)
+    lines = []
+    for i in range(len(column)):
+        points = column.polyline(i)
+        if not valid[i] or len(points) < 3:
+            continue
+        # 带刻度线的坐标轴是 3 ~ 4 个顶点的折角, 数据折线通常有斜线段或更多顶点
+        steps = np.diff(points, axis=0)
+        if np.any((steps[:, 0] != 0) & (steps[:, 1] != 0)) or len(points) > 4:
+            lines.append(i)
+    return lines
+
+
+def _data_colors(columns: SimVecChart, layout: ChartLayout) -> set:
+    """数据图元中出现的颜色 (不含图例色块)"""
+    colors = set(columns.rect.rgb[_data_rects(columns, layout)].tolist())
+    for kind in ("circle", "area"):
+        column = columns[kind]
+        colors.update(column.rgb[column.valid & (layout.roles[kind] == spatial_index.mark)].tolist())
+    colors.update(columns.line.rgb[np.array(_data_lines(columns, layout), dtype=np.int64)].tolist())
+    return colors
+
+
+def _chart_type(columns: SimVecChart, layout: ChartLayout) -> tuple:
+    """由数据图元的组成判断图表类型, 返回 (chartType, 置信度)"""
+    rects = _data_rects(columns, layout)
+    lines = _data_lines(columns, layout)
+    circles = int(np.count_nonzero(layout.roles["circle"] == spatial_index.mark))
+    areas = int(np.count_nonzero(columns.area.valid))
+    total = len(rects) + len(lines) + circles + areas
+    if total == 0:
+        return None, 0.0
+
+    if areas >= 2 and not lines and areas >= len(rects):
+        return "Pie Chart", areas / total
+    if lines:
+        # 折线上的标记点同样支持折线图
+        return "Line Chart", (len(lines) + circles) / total
+    if circles >= 3:
+        return "Scatter Plot", circles / total
+    if len(rects):
+        position = columns.rect.position[rects]
+        centers = np.rint(position[:, 0]).astype(np.int64)
+        stacked = False
+        for group in _aligned_groups(centers.astype(np.float64), 0.5):
+            if len(group) > 1:
+                colors = set(columns.rect.rgb[rects[group]].tolist())
+                stacked = stacked or len(colors) > 1 and len(colors) == len(group)
+        return ("Stacked Bar Chart" if stacked else "Bar Chart"), len(rects) / total
+    return None, 0.0
+
+
+def _linearity(pixels: np.ndarray, values: np.ndarray) -> float:
+    """刻度数值与像素坐标的线性程度 (R²), 定量坐标轴的刻度应当等距"""
+    if len(pixels) < 3 or np.ptp(pixels) == 0 or np.ptp(values) == 0:
+        return 0.5
+    return float(np.corrcoef(pixels, values)[0, 1] ** 2)
+
+
+def _find_axes(columns: SimVecChart, texts: list, excluded: set, categorical_x: bool) -> tuple:
+    """
+    坐标轴刻度: y 轴为右端对齐的一列文本 (优先纯数值), x 轴为同一行中最多的一组文本
+    返回 (xAxis, yAxis, 坐标轴置信度, 已使用的文本下标集合)
+    """
+    position = columns.text.position
+    candidates = np.array([i for i in range(len(texts)) if i not in excluded], dtype=np.int64)
+    if len(candidates) < 4:
+        return None, None, 0.3, set()
+
+    # y 轴: 同一列 (文本 x 坐标即右端) 的文本, 数值刻度优先, 其次数量多者, 再次靠左者
+    columns_found = [candidates[g] for g in _aligned_groups(position[candidates, 0]) if len(g) >= 2]
+    columns_found.sort(key=lambda g: (
+        not all(_is_number(texts[i]) for i in g.tolist()), -len(g), float(position[g, 0].mean())
+    ))
+    y_ticks = columns_found[0] if columns_found else np.zeros(0, dtype=np.int64)
+    used = set(y_ticks.tolist())
+
+    # x 轴: 同一行 (文本 y 坐标) 的文本, 数量多者优先, 其次靠下者
+    rest = np.array([i for i in candidates.tolist() if i not in used], dtype=np.int64)
+    rows_found = [rest[g] for g in _aligned_groups(position[rest, 1]) if len(g) >= 2] if len(rest) else []
+    rows_found.sort(key=lambda g: (-len(g), -float(position[g, 1].mean())))
+    x_ticks = rows_found[0] if rows_found else np.zeros(0, dtype=np.int64)
+    used.update(x_ticks.tolist())
+
+    # y 轴刻度自下而上, x 轴刻度自左而右
+    y_ticks = y_ticks[np.argsort(-position[y_ticks, 1], kind="stable")]
+    x_ticks = x_ticks[np.argsort(position[x_ticks, 0] - position[x_ticks, 2] / 2, kind="stable")]
+
+    scores = []
+    axes = []
+    for ticks, axis, pixel_column, categorical in ((x_ticks, "x", 0, categorical_x), (y_ticks, "y", 1, False)):
+        labels = [texts[i] for i in ticks.tolist()]
+        numeric = bool(labels) and all(_is_number(label) for label in labels)
+        if len(labels) < 2:
+            axes.append(None)
+            scores.append(0.3)
+            continue
+        if numeric and not categorical:
+            pixels = position[ticks, pixel_column] - (position[ticks, 2] / 2 if pixel_column == 0 else 0)
+            values = np.array([tick_value(label) for label in labels])
+            scores.append(min(1.0, _linearity(pixels, values)))
+        else:
+            scores.append(1.0 if len(labels) >= 3 else 0.7)
+        axes.append({
+            "name": None,
+            "ticks": [_display(label) for label in labels],
+            "type": "Quantitative" if numeric and not categorical else "Categorical",
+        })
+
+    # 坐标轴名称: x 轴刻度下方最近的横排文本, y 轴刻度左侧最近的竖排文本
+    x_axis, y_axis = axes
+    remaining = [i for i in candidates.tolist() if i not in used]
+    if x_axis is not None:
+        row = float(position[x_ticks, 1].mean())
+        below = [i for i in remaining if position[i, 1] > row and position[i, 2] >= position[i, 3]]
+        if below:
+            name = min(below, key=lambda i: position[i, 1])
+            x_axis["name"] = _display(texts[name])
+            used.add(name)
+    if y_axis is not None:
+        left = float((position[y_ticks, 0] - position[y_ticks, 2]).min())
+        beside = [i for i in remaining if position[i, 0] < left and position[i, 3] > position[i, 2] and i not in used]
+        if beside:
+            name = max(beside, key=lambda i: position[i, 0])
+            y_axis["name"] = _display(texts[name])
+            used.add(name)
+    return x_axis, y_axis, min(scores), used
+
+
+def _calibrates(columns: SimVecChart, axis: dict, axis_name: str) -> bool:
+    """推断出的刻度经 data_formatter 规范化后, 能否像抽取模块那样拟合出坐标轴比例"""
+    if axis is None or axis["type"] != "Quantitative":
+        return False
+    try:
+        TextIndex(columns.text).fit_axis([normalize_text_content(tick) for tick in axis["ticks"]], axis_name)
+    except AxisCalibrationError:
+        return False
+    return True
+
+
+def _title(columns: SimVecChart, texts: list, excluded: set, layout: ChartLayout) -> str:
+    """标题: 位于全部数据图元与刻度上方、最靠上的横排文本"""
+    position = columns.text.position
+    tops = [float(position[i, 1]) for i in excluded]
+    rects = _data_rects(columns, layout)
+    if len(rects):
+        tops.append(float(columns.rect.position[rects, 1].min()))
+    if len(columns.circle):
+        tops.append(float(columns.circle.position[:, 1].min()))
+    for kind in ("line", "area"):
+        if len(columns[kind].points):
+            tops.append(float(columns[kind].points[:, 1].min()))
+    limit = min(tops) if tops else float("inf")
+    above = [i for i in range(len(texts)) if i not in excluded and position[i, 1] < limit and position[i, 2] >= position[i, 3]]
+    if not above:
+        return None
+    return _display(texts[min(above, key=lambda i: position[i, 1])])
+
+
+def infer_metadata(columns: SimVecChart) -> tuple:
+    """
+    由 SimVec 列式数据直接推断 metadata (与模型输出相同的结构), 返回 (metadata, 置信度 0 ~ 1)
+    置信度取图表类型、坐标轴、图例三部分中最低的一项
+    """
+    texts = columns.text.content
+    # 与抽取模块相同的坐标轴 / 网格线判断; 此时还没有 metadata, 图例色块由 _find_legend 推断后再标记
+    layout = classify_primitives(columns, {})
+    legend, legend_texts, swatches = _find_legend(columns, texts, layout)
+    layout = _with_swatches(layout, swatches)
+    chart_type, type_score = _chart_type(columns, layout)
+
+    if chart_type == "Pie Chart":
+        x_axis = y_axis = {"name": None, "ticks": None, "type": None}
+        axis_score, used = 1.0, set(legend_texts)
+    else:
+        x_axis, y_axis, axis_score, used = _find_axes(
+            columns, texts, legend_texts, chart_type in ("Bar Chart", "Stacked Bar Chart")
+        )
+        used |= legend_texts
+        # 折线图与散点图的两个坐标轴都应当是定量的, 否则交给模型判断
+        if chart_type in ("Line Chart", "Scatter Plot") and any(
+            axis is not None and axis["type"] != "Quantitative" for axis in (x_axis, y_axis)
+        ):
+            axis_score = min(axis_score, 0.6)
+        # 抽取模块无法由这些刻度拟合坐标轴时, 直接写入 raw_meta_data 只会让抽取失败, 交给模型处理
+        axes = {"x": x_axis, "y": y_axis}
+        if not all(_calibrates(columns, axes[name], name) for name in calibrated_axes.get(chart_type, ())):
+            axis_score = min(axis_score, uncalibrated_score)
+
+    # 图例: 多种数据颜色时应当有图例, 且图例颜色数不少于数据颜色数
+    data_colors = len(_data_colors(columns, layout))
+    if legend is None:
+        legend_score = 1.0 if data_colors <= 1 else 0.5
+    else:
+        legend_score = 1.0 if len(legend["items"]) >= data_colors else 0.7
+
+    metadata = {
+        "chartType": chart_type,
+        "title": _title(columns, texts, used, layout),
+        "xAxis": x_axis,
+        "yAxis": y_axis,
+        "legend": legend,
+    }
+    return metadata, round(min(type_score, axis_score, legend_score), 3)
+
+
+def infer_metadata_file(simvec_path: str) -> tuple:
+    """读取 raw_simvec .txt 并推断 metadata"""
+    return infer_metadata(load_simvec(simvec_path))
+
+
+def write_inferred(metadata: dict, confidence: float, output_path: str):
+    """写出推断的 raw_meta_data (在模型输出的结构上附加 confidence 字段)"""
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f_out:
+        json.dump({**metadata, "confidence": confidence}, f_out, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="由 SimVec 推断 metadata, 置信度足够时直接写入 raw_meta_data")
+    parser.add_argument("--types", nargs="+", choices=data_formatter.chart_types, default=data_formatter.chart_types)
+    parser.add_argument("--threshold", type=float, default=default_threshold)
+    parser.add_argument("--overwrite", action="store_true", help="覆盖已存在的 raw_meta_data (默认只补全缺失的)")
+    parser.add_argument("--dry-run", action="store_true", help="只打印推断结果与置信度, 不写文件")
+    args = parser.parse_args()
+
+    low_confidence = []
+    for chart_type in args.types:
+        input_chart_path = os.path.join(data_formatter.input_simvec_directory, chart_type)
+        if not os.path.isdir(input_chart_path):
+            continue
+        for file_name in sorted(os.listdir(input_chart_path)):
+            if not file_name.endswith(".txt"):
+                continue
+            name = os.path.splitext(file_name)[0]
+            output_path = os.path.join(data_formatter.input_metadata_directory, chart_type, name + ".json")
+            if os.path.exists(output_path) and not args.overwrite and not args.dry_run:
+                continue
+            metadata, confidence = infer_metadata_file(os.path.join(input_chart_path, file_name))
+            print(f"{chart_type}/{name}: {metadata['chartType']}, 置信度 {confidence}")
+            if args.dry_run:
+                print(json.dumps(metadata, ensure_ascii=False))
+            elif confidence >= args.threshold:
+                write_inferred(metadata, confidence, output_path)
+            else:
+                low_confidence.append(f"{chart_type}/{name}")
+
+    if low_confidence:
+        print(f"置信度低于 {args.threshold}, 需要交给模型: {', '.join(low_confidence)}")
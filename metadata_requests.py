@@ -0,0 +1,322 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import data_formatter
+import metadata_inference
+import simvec_compressor
+
+# 输入: 优先使用 SVG (与模型看到的图像一致), 没有 SVG 时使用 raw_simvec 文本
+svg_directory = "input_data"
+prompt_path = "prompt/prompt_for_metadata.txt"
+
+# 请求批次、请求索引与按请求键 (内容哈希 + 提示词 + 模型 + 预算) 缓存的模型响应
+request_directory = "intermediate_data/mllm/requests"
+index_path = "intermediate_data/mllm/index.json"
+cache_directory = "intermediate_data/mllm/cache"
+
+default_batch_size = 20
+default_endpoint = "http://127.0.0.1:8766/v1/batch"
+default_mock_port = 8766
+default_model = None
+
+# 模型输出的 metadata 字段; 坐标轴为 null 或带 name / ticks / type 的对象, 图例为 null 或带 items / colors 的对象
+metadata_fields = ("chartType", "title", "xAxis", "yAxis", "legend")
+axis_fields = ("name", "ticks", "type")
+legend_fields = ("items", "colors")
+
+
+def content_hash(content: bytes) -> str:
+    """图表内容的 SHA-256 (统一换行符后计算), 内容相同的图表只请求一次"""
+    return hashlib.sha256(content.replace(b"\r\n", b"\n")).hexdigest()
+
+
+def request_key(content_key: str, prompt: str, model: str = None, simvec_budget: int = None) -> str:
+    """请求 id 与缓存键: 图表内容哈希、提示词、模型与 SimVec 预算任一项变化时都重新请求, 不会复用旧的响应"""
+    signature = json.dumps([content_key, hashlib.sha256(prompt.encode("utf-8")).hexdigest(), model, simvec_budget])
+    return hashlib.sha256(signature.encode("utf-8")).hexdigest()
+
+
+def chart_sources(selected_types: list = None) -> list:
+    """列出全部图表的 (chart_type, chart_name, 文件路径, 内容类型)"""
+    sources = []
+    for chart_type in selected_types or data_formatter.chart_types:
+        charts = {}
+        simvec_path = os.path.join(data_formatter.input_simvec_directory, chart_type)
+        if os.path.isdir(simvec_path):
+            for f in sorted(os.listdir(simvec_path)):
+                if f.endswith(".txt"):
+                    charts[os.path.splitext(f)[0]] = (os.path.join(simvec_path, f), "text/x-simvec")
+        svg_path = os.path.join(svg_directory, chart_type)
+        if os.path.isdir(svg_path):
+            for f in sorted(os.listdir(svg_path)):
+                if f.endswith(".svg"):
+                    charts[os.path.splitext(f)[0]] = (os.path.join(svg_path, f), "image/svg+xml")
+        sources.extend((chart_type, name, path, content_type) for name, (path, content_type) in sorted(charts.items()))
+    return sources
+
+
+def build_requests(selected_types: list = None, batch_size: int = default_batch_size,
+                   output_directory: str = request_directory, infer_threshold: float = None, overwrite: bool = False,
+                   simvec_budget: int = None, model: str = default_model) -> dict:
+    """
+    按请求键 (request_key) 去重后生成请求批次 batch-00000.jsonl, ... (每行一个请求, 已缓存响应的图表不再请求)
+    已有 raw_meta_data 的图表不再请求 (overwrite 为 True 时照常请求)
+    给出 infer_threshold 时, 先由 SimVec 推断 metadata, 置信度足够的图表直接写入 raw_meta_data, 不再请求模型
+    给出 simvec_budget 时, SimVec 内容先压缩到该 token 预算内再放入请求 (内容哈希仍按原始内容计算, 预算计入请求键)
+    同时写出 请求键 → 图表列表 的索引, 返回索引
+    """
+    with open(prompt_path, "r", encoding="utf-8") as f:
+        prompt = f.read()
+
+    index, requests, inferred = {}, [], 0
+    for chart_type, name, path, content_type in chart_sources(selected_types):
+        simvec_path = os.path.join(data_formatter.input_simvec_directory, chart_type, name + ".txt")
+        metadata_path = os.path.join(data_formatter.input_metadata_directory, chart_type, name + ".json")
+        if os.path.exists(metadata_path) and not overwrite:
+            continue
+        if infer_threshold is not None and os.path.exists(simvec_path):
+            metadata, confidence = metadata_inference.infer_metadata_file(simvec_path)
+            if confidence >= infer_threshold:
+                metadata_inference.write_inferred(metadata, confidence, metadata_path)
+                inferred += 1
+                continue
+
+        with open(path, "rb") as f:
+            content = f.read()
+        # 预算只影响 SimVec 内容, SVG 请求的缓存不因预算变化而失效
+        budget = simvec_budget if content_type == "text/x-simvec" else None
+        key = request_key(content_hash(content), prompt, model, budget)
+        if key not in index:
+            index[key] = []
+            if not os.path.exists(os.path.join(cache_directory, key + ".json")):
+                text = content.decode("utf-8")
+                if budget is not None:
+                    text, _ = simvec_compressor.compress_simvec(text, budget)
+                requests.append({"id": key, "prompt": prompt, "model": model, "content_type": content_type, "content": text})
+        index[key].append([chart_type, name])
+
+    os.makedirs(output_directory, exist_ok=True)
+    for old_batch in os.listdir(output_directory):
+        if old_batch.startswith("batch-") and old_batch.endswith(".jsonl"):
+            os.remove(os.path.join(output_directory, old_batch))
+    for start in range(0, len(requests), batch_size):
+        path = os.path.join(output_directory, f"batch-{start // batch_size:05d}.jsonl")
+        with open(path, "w", encoding="utf-8") as f_out:
+            f_out.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in requests[start:start + batch_size]))
+
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    with open(index_path, "w", encoding="utf-8") as f_out:
+        json.dump(index, f_out, indent=1)
+
+    charts = sum(len(names) for names in index.values())
+    if infer_threshold is not None:
+        print(f"本地推断: {inferred} 个图表的置信度不低于 {infer_threshold}, 已直接写入 raw_meta_data")
+    print(f"请求已生成: {charts} 个图表, 去重后 {len(index)} 个, 其中 {len(requests)} 个需要请求 "
+          f"({(len(requests) + batch_size - 1) // batch_size} 个批次)")
+    return index
+
+
+def send_batches(endpoint: str = default_endpoint, input_directory: str = request_directory) -> int:
+    """
+    逐个批次发送到模型服务 (POST JSONL, 返回每行 {"id", "output"} 的 JSONL), 响应按请求键写入缓存
+    发送前再次跳过已缓存的请求, 中断后重跑不会重复付费; 返回新缓存的响应数
+    失败的批次、带 error 的响应与无法解析为完整 metadata 的响应不写入缓存, 下次运行时重新请求
+    """
+    os.makedirs(cache_directory, exist_ok=True)
+    cached = 0
+    for batch in sorted(f for f in os.listdir(input_directory) if f.startswith("batch-") and f.endswith(".jsonl")):
+        with open(os.path.join(input_directory, batch), "r", encoding="utf-8") as f:
+            lines = [line for line in f if line.strip()]
+        lines = [line for line in lines if not os.path.exists(os.path.join(cache_directory, json.loads(line)["id"] + ".json"))]
+        if not lines:
+            continue
+
+        request = urllib.request.Request(
+            endpoint, data="".join(lines).encode("utf-8"), headers={"Content-Type": "application/x-ndjson"}
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                body = response.read().decode("utf-8")
+        except urllib.error.HTTPError as e:
+            print(f"⚠️ 批次失败: {batch} (HTTP {e.code}), 响应不写入缓存")
+            continue
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            try:
+                if result.get("error"):
+                    raise ValueError(f"模型服务返回错误: {result['error']}")
+                check_metadata(parse_model_output(result.get("output") or ""))
+            except ValueError as e:
+                print(f"⚠️ 响应不写入缓存 {str(result.get('id'))[:12]}: {e}")
+                continue
+            path = os.path.join(cache_directory, result["id"] + ".json")
+            with open(path + ".tmp", "w", encoding="utf-8") as f_out:
+                json.dump(result, f_out, ensure_ascii=False)
+            os.replace(path + ".tmp", path)
+            cached += 1
+        print(f"批次已完成: {batch} ({len(lines)} 个请求)")
+    return cached
+
+
+def parse_model_output(text: str) -> dict:
+    """从模型的文本输出中取出 JSON 对象 (忽略 ```json 代码块标记与前后的说明文字)"""
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        raise ValueError("模型输出中没有 JSON 对象")
+    return json.loads(text[start:end + 1])
+
+
+def check_metadata(metadata) -> dict:
+    """
+    检查模型输出是否为完整的 metadata: 包含全部 metadata_fields, chartType 为非空字符串,
+    坐标轴与图例为 null 或包含各自全部字段的对象; 各字段为 null 的结果与缺少字段的结果抛出 ValueError
+    """
+    if not isinstance(metadata, dict):
+        raise ValueError("metadata 不是 JSON 对象")
+    missing = [field for field in metadata_fields if field not in metadata]
+    if missing:
+        raise ValueError(f"metadata 缺少字段: {', '.join(missing)}")
+    if not isinstance(metadata["chartType"], str) or not metadata["chartType"].strip():
+        raise ValueError("metadata 没有 chartType")
+    for field, fields in (("xAxis", axis_fields), ("yAxis", axis_fields), ("legend", legend_fields)):
+        value = metadata[field]
+        if value is None:
+            continue
+        if not isinstance(value, dict) or any(key not in value for key in fields):
+            raise ValueError(f"metadata 的 {field} 不完整")
+        for key in ("ticks", "items", "colors"):
+            if value.get(key) is not None and not isinstance(value[key], list):
+                raise ValueError(f"metadata 的 {field}.{key} 不是列表")
+    return metadata
+
+
+def split_responses(overwrite: bool = False) -> int:
+    """
+    把缓存中的模型响应拆回 raw_meta_data/<type>/<name>.json (内容相同的图表共用一个响应), 返回写出的文件数
+    不完整的响应 (见 check_metadata) 跳过, 不会覆盖已有的文件
+    """
+    with open(index_path, "r", encoding="utf-8") as f:
+        index = json.load(f)
+
+    written = 0
+    for key, charts in index.items():
+        path = os.path.join(cache_directory, key + ".json")
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            output = json.load(f).get("output", "")
+        try:
+            metadata = check_metadata(parse_model_output(output))
+        except ValueError as e:
+            print(f"⚠️ 无法解析模型输出 {key[:12]} ({', '.join(f'{t}/{n}' for t, n in charts)}): {e}")
+            continue
+        for chart_type, name in charts:
+            output_path = os.path.join(data_formatter.input_metadata_directory, chart_type, name + ".json")
+            if os.path.exists(output_path) and not overwrite:
+                continue
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            with open(output_path, "w", encoding="utf-8") as f_out:
+                json.dump(metadata, f_out, indent=2, ensure_ascii=False)
+            written += 1
+    print(f"raw_meta_data 已写出 {written} 个文件")
+    return written
+
+
+def _mock_answers() -> dict:
+    """
+    本地替身服务的答案: 由 build 写出的请求索引把请求 id 对应到图表, 已有 raw_meta_data 的图表返回该 metadata
+    (压缩后的 SimVec 内容与原文件不同, 只能按 id 而不是请求内容查找)
+    """
+    if not os.path.exists(index_path):
+        return {}
+    with open(index_path, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    answers = {}
+    for key, charts in index.items():
+        for chart_type, name in charts:
+            metadata_path = os.path.join(data_formatter.input_metadata_directory, chart_type, name + ".json")
+            if os.path.exists(metadata_path):
+                with open(metadata_path, "r", encoding="utf-8") as f_meta:
+                    answers[key] = json.load(f_meta)
+                break
+    return answers
+
+
+def mock_server(port: int = default_mock_port, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    本地替身模型服务, 用于测试: POST /v1/batch 接收 JSONL 请求, 按行返回 {"id", "output"}
+    每个批次重新读取请求索引; 已知图表返回现有的 metadata, 未知图表返回各字段为 null 的结果
+    输出格式模仿模型 ("json" 前缀 + 缩进的 JSON)
+    """
+    empty = {field: None for field in metadata_fields}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/v1/batch":
+                self.send_error(404)
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+            answers = _mock_answers()
+            results = []
+            for line in body.splitlines():
+                if line.strip():
+                    request = json.loads(line)
+                    output = "json\n" + json.dumps(answers.get(request["id"], empty), indent=2, ensure_ascii=False)
+                    results.append(json.dumps({"id": request["id"], "output": output}, ensure_ascii=False))
+            payload = ("\n".join(results) + "\n").encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            sys.stderr.write(f"{self.address_string()} {format % args}\n")
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def serve_mock(port: int = default_mock_port, host: str = "127.0.0.1"):
+    """启动本地替身模型服务 (见 mock_server), 直到 Ctrl+C"""
+    server = mock_server(port, host)
+    print(f"模型替身服务已启动: http://{host}:{port}/v1/batch", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成去重、分批的 MLLM metadata 请求, 缓存响应并拆回 raw_meta_data")
+    parser.add_argument("command", choices=["build", "send", "split", "run", "mock"],
+                        help="build: 生成请求批次; send: 发送并缓存; split: 写出 raw_meta_data; run: 依次执行三步; mock: 启动本地替身服务")
+    parser.add_argument("--types", nargs="+", choices=data_formatter.chart_types, default=None)
+    parser.add_argument("--batch-size", type=int, default=default_batch_size)
+    parser.add_argument("--endpoint", default=default_endpoint)
+    parser.add_argument("--port", type=int, default=default_mock_port)
+    parser.add_argument("--overwrite", action="store_true", help="覆盖已存在的 raw_meta_data 文件")
+    parser.add_argument("--infer-threshold", type=float, default=None,
+                        help="先在本地由 SimVec 推断 metadata, 置信度不低于该值的图表不请求模型")
+    parser.add_argument("--simvec-budget", type=int, default=None, help="把请求中的 SimVec 压缩到该 token 预算内")
+    parser.add_argument("--model", default=default_model, help="请求的模型名称 (计入缓存键)")
+    args = parser.parse_args()
+
+    if args.command == "mock":
+        serve_mock(args.port)
+    if args.command in ("build", "run"):
+        build_requests(args.types, args.batch_size, infer_threshold=args.infer_threshold, overwrite=args.overwrite,
+                       simvec_budget=args.simvec_budget, model=args.model)
+    if args.command in ("send", "run"):
+        print(f"新缓存的响应: {send_batches(args.endpoint)}")
+    if args.command in ("split", "run"):
+        split_responses(args.overwrite)
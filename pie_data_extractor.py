@@ -1,110 +1,100 @@
 import json
-import math
 import os
 
-# 目录路径
+import numpy as np
+
+import instrumentation
+from color_palette import palette_for
+from pie_geometry import find_center, group_slices, swept_angles
+from simvec_model import SimVecChart
+from simvec_storage import load_simvec
+
+# 图表类型与目录路径
+chart_type = 'pie'
 meta_data_dir = 'intermediate_data/cleaned_meta_data/pie'
 simvec_data_dir = 'intermediate_data/cleaned_simvec_data/pie'
 output_dir = 'intermediate_data/extracted_data/pie'
 
-# 确保输出目录存在
-os.makedirs(output_dir, exist_ok=True)
-
-# 将十六进制颜色转换为 RGB 格式
-def hex_to_rgb(hex_color: str) -> tuple:
-    """将十六进制颜色转换为 (R,G,B) 元组格式"""
-    hex_color = hex_color.lstrip('#')
-    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-
-# 计算颜色的欧氏距离
-def color_distance(rgb1: tuple, rgb2: tuple) -> float:
-    """计算两个 RGB 颜色之间的欧氏距离"""
-    return math.sqrt(sum((c1 - c2) ** 2 for c1, c2 in zip(rgb1, rgb2)))
-
-# 计算两个点之间的角度 (以圆心为基准)
-def calculate_angle(center: tuple, point: tuple) -> float:
-    """计算从圆心到某点的角度 (0-360 度)"""
-    dx, dy = point[0] - center[0], point[1] - center[1]
-    angle = math.degrees(math.atan2(dy, dx))
-    return angle % 360
-
-# 遍历元数据文件夹中的每一个 JSON 文件
-for file_name in os.listdir(meta_data_dir):
-    if not file_name.endswith('.json'):
-        continue
-    
+
+def extract_pie_data(metadata: dict, simvec_data: SimVecChart) -> list:
+    """根据清洗后的 metadata 与 simvec 列式数据计算饼图数据"""
+    # 由图例 (legend) 构建一次调色板 (使用 RGB 格式)
+    palette = palette_for(metadata)
+    if palette.color_to_category is None:
+        print("没有找到 legend 数据，默认直接根据 RGB 颜色进行分类。")
+
+    # 解析饼图数据
+    pie_data = []
+
+    # 寻找圆心 (出现在所有区域中的点)
+    area_column = simvec_data.area
+    center = find_center(area_column.points)
+    print(f"检测到的圆心: {center}")
+
+    # 对所有顶点一次计算每个区域扫过的圆心角
+    angles = swept_angles(area_column.points, area_column.offsets, center)
+    for i in np.flatnonzero(np.isnan(angles)).tolist():
+        print(f"区域 {i} 的点数不足，跳过")
+
+    # 按颜色合并区域, 每种颜色只确定一次分类 (category), 未匹配图例时使用自身颜色表示
+    slices = group_slices(area_column.rgb.tolist(), angles)
+    first_areas = [first for first, _ in slices.values()]
+    categories = palette.classify(area_column.rgb[first_areas], unmatched_label=None)
+
+    # 计算区域的占比 (圆心角度 / 360)
+    for category, (_, angle) in zip(categories, slices.values()):
+        pie_data.append({"category": category, "percentage": round(angle / 360, 4)})
+
+    return pie_data
+
+
+def process_file(file_name: str):
+    """处理单个图表: 读取 metadata 与 simvec, 计算饼图数据并写出结果"""
     file_base_name = os.path.splitext(file_name)[0]
     
     # 读取 metadata JSON 文件
     meta_file_path = os.path.join(meta_data_dir, file_name)
-    simvec_file_path = os.path.join(simvec_data_dir, file_name)
-    output_file_path = os.path.join(output_dir, f"{file_base_name}.txt")
     
     print(f"\n正在处理文件: {file_name}")
     
-    with open(meta_file_path, 'r', encoding='utf-8') as f:
-        metadata = json.load(f)
-
-    # 读取 simvec JSON 文件
-    with open(simvec_file_path, 'r', encoding='utf-8') as f:
-        simvec_data = json.load(f)
-
-    # 解析图例 (legend) 中颜色到类别的映射关系 (使用 RGB 格式)
-    color_to_category = {}
-    tolerance = 60  # 允许的颜色容差范围
-
-    if 'legend' in metadata and isinstance(metadata['legend'], dict) and 'items' in metadata['legend'] and 'colors' in metadata['legend']:
-        legend_items = metadata['legend']['items']
-        legend_colors = [hex_to_rgb(color) for color in metadata['legend']['colors']]
-        color_to_category = dict(zip(legend_colors, legend_items))
-    else:
-        print("没有找到 legend 数据，默认直接根据 RGB 颜色进行分类。")
-        color_to_category = None  # 标记为无图例模式
+    with instrumentation.stage(chart_type, file_base_name, 'load'):
+        with open(meta_file_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
 
-    # 解析饼图数据
-    pie_data = []
+        # 读取 simvec 数据 (优先内存映射二进制格式, 数值列不发生拷贝)
+        simvec_data = load_simvec(os.path.join(simvec_data_dir, file_base_name))
+    instrumentation.record_primitives(chart_type, file_base_name, simvec_data)
+    process_data(file_name, metadata, simvec_data)
 
-    # 寻找圆心 (出现在所有区域中的点)
-    all_points = [tuple(p) for area in simvec_data['area'] for p in area['points']]
-    center = max(set(all_points), key=all_points.count)
-    print(f"检测到的圆心: {center}")
 
-    # 计算每个区域的角度和类别
-    for area in simvec_data['area']:
-        area_color = eval(area['color'])
-        points = [tuple(p) for p in area['points'] if tuple(p) != center]
-
-        if len(points) < 2:
-            print(f"区域 {area} 的点数不足，跳过")
-            continue
-
-        # 计算区域起始和结束角度
-        start_angle = calculate_angle(center, points[0])
-        end_angle = calculate_angle(center, points[1])
-
-        # 计算区域的占比 (圆心角度 / 360)
-        angle_diff = (end_angle - start_angle) % 360
-        percentage = round(angle_diff / 360, 4)
-
-        # 确定区域的分类 (category)
-        if color_to_category:
-            category = f"RGB{area_color}"
-            min_distance = float('inf')
-            
-            for legend_color, legend_category in color_to_category.items():
-                distance = color_distance(area_color, legend_color)
-                if distance < min_distance and distance <= tolerance:
-                    min_distance = distance
-                    category = legend_category
-        else:
-            category = f"RGB{area_color}"
-
-        pie_data.append({"category": category, "percentage": percentage})
+def process_data(file_name: str, metadata: dict, simvec_data: SimVecChart):
+    """由已在内存中的 metadata 与 simvec 计算饼图数据并写出结果 (pipeline 的内存模式直接调用)"""
+    # 确保输出目录存在
+    os.makedirs(output_dir, exist_ok=True)
+
+    file_base_name = os.path.splitext(file_name)[0]
+    output_file_path = os.path.join(output_dir, f"{file_base_name}.txt")
+
+    with instrumentation.stage(chart_type, file_base_name, 'extract'):
+        pie_data = extract_pie_data(metadata, simvec_data)
+    instrumentation.record_categories(chart_type, file_base_name, [pie["category"] for pie in pie_data])
 
     # 输出计算结果到文件
-    with open(output_file_path, 'w', encoding='utf-8') as output_file:
-        output_file.write(f"计算出的饼图数据 ({file_name}):\n")
-        for pie in pie_data:
-            output_file.write(json.dumps(pie, ensure_ascii=False) + ",\n")
-    
+    with instrumentation.stage(chart_type, file_base_name, 'write'):
+        with open(output_file_path, 'w', encoding='utf-8') as output_file:
+            output_file.write(f"计算出的饼图数据 ({file_name}):\n")
+            for pie in pie_data:
+                output_file.write(json.dumps(pie, ensure_ascii=False) + ",\n")
+
     print(f"已保存到: {output_file_path}")
+
+
+if __name__ == "__main__":
+    # 遍历元数据文件夹中的每一个 JSON 文件
+    try:
+        for file_name in os.listdir(meta_data_dir):
+            if file_name.endswith('.json'):
+                process_file(file_name)
+    finally:
+        # 写出结构化日志与 Prometheus 快照
+        instrumentation.flush("pie_data_extractor")
@@ -0,0 +1,81 @@
+from collections import Counter
+
+import numpy as np
+
+
+def find_center(points: np.ndarray) -> tuple:
+    """
+    寻找饼图圆心: 每个扇形区域都经过圆心, 因此取出现次数最多的顶点
+    用哈希计数一次遍历完成, 与顶点数量成线性关系
+    """
+    counts = Counter(map(tuple, np.asarray(points).reshape(-1, 2).tolist()))
+    if not counts:
+        raise ValueError("SimVec 中没有 area 顶点, 无法确定饼图圆心")
+    return counts.most_common(1)[0][0]
+
+
+def swept_angles(points: np.ndarray, offsets: np.ndarray, center: tuple) -> np.ndarray:
+    """
+    计算每个区域 (扇形) 扫过的圆心角 (度), 对所有顶点一次向量化计算 atan2:
+      先在每个区域中找出圆心顶点, 把环旋转到圆心之后的第一个顶点, 弧上的顶点依次为圆心的一个邻点 → ... → 另一个邻点
+      (区域不经过圆心时按原顺序); 相邻弧顶点间的角度增量归一化到 (-180, 180] 后累加, 得到带符号的扫角
+      弧线被细分为折线时 (3 个及以上弧顶点), 扫角的绝对值即圆心角, 与绘制方向无关
+      只有两个弧顶点时 (弧线未细分), 增量只给出弦的一侧, 按整张饼图的绘制方向取 增量 或 360 - 增量:
+        有细分的扇形时沿用它们的方向, 否则取各扇形之和最接近 360° 的方向
+        (只有一个这样的扇形或两个方向相同时为角度递增, 即 SVG 中的顺时针)
+    弧上顶点不足两个的区域返回 nan
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    area_count = len(offsets) - 1
+    sizes = np.diff(offsets)
+    area_ids = np.repeat(np.arange(area_count), sizes)
+    index = np.arange(len(points))
+    local = index - offsets[:-1][area_ids]
+
+    # 环上前一个顶点是圆心、自身不是圆心的位置为弧的起点, 每个区域取第一个
+    is_center = np.all(points == np.asarray(center, dtype=np.float64), axis=1)
+    previous = np.where(local == 0, offsets[1:][area_ids] - 1, index - 1)
+    arc_starts = np.flatnonzero(~is_center & is_center[previous])
+    shift = np.zeros(area_count, dtype=np.int64)
+    areas, first = np.unique(area_ids[arc_starts], return_index=True)
+    shift[areas] = local[arc_starts[first]]
+    rotated = offsets[:-1][area_ids] + (local + shift[area_ids]) % np.maximum(sizes[area_ids], 1)
+
+    # 去掉圆心本身, 只保留弧上的顶点 (旋转后圆心位于每个区域的末尾)
+    keep = ~is_center[rotated]
+    arc_points, arc_ids = points[rotated[keep]], area_ids[keep]
+    angles = np.degrees(np.arctan2(arc_points[:, 1] - center[1], arc_points[:, 0] - center[0])) % 360
+
+    # 同一区域内相邻顶点的角度增量, 归一化到 (-180, 180]
+    steps = -((180 - np.diff(angles)) % 360) + 180
+    same_area = arc_ids[1:] == arc_ids[:-1]
+    swept = np.bincount(arc_ids[1:][same_area], weights=steps[same_area], minlength=area_count)
+    vertex_counts = np.bincount(arc_ids, minlength=area_count)
+
+    subdivided, chords = vertex_counts >= 3, vertex_counts == 2
+    if subdivided.any():
+        direction = 1 if np.sign(swept[subdivided]).sum() >= 0 else -1
+    elif chords.sum() >= 2:
+        forward, backward = swept[chords] % 360, -swept[chords] % 360
+        direction = -1 if abs(backward.sum() - 360) < abs(forward.sum() - 360) else 1
+    else:
+        direction = 1
+
+    result = np.where(chords, direction * swept % 360, np.abs(swept))
+    result[vertex_counts < 2] = np.nan
+    return result
+
+
+def group_slices(keys: list, angles: np.ndarray) -> dict:
+    """
+    按颜色一次遍历合并同色区域 (同一扇形可能由多个 area 组成), 跳过 nan
+    返回 颜色 → (首次出现的区域下标, 圆心角之和), 保持首次出现的顺序
+    """
+    grouped = {}
+    for i, (key, angle) in enumerate(zip(keys, np.asarray(angles).tolist())):
+        if angle != angle:
+            continue
+        first, total = grouped.get(key, (i, 0.0))
+        grouped[key] = (first, total + angle)
+    return grouped
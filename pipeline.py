@@ -0,0 +1,270 @@
+import argparse
+import cProfile
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import bar_data_extractor
+import build_cache
+import data_formatter
+import instrumentation
+import line_data_extractor
+import pie_data_extractor
+import scatter_data_extractor
+import stackbar_data_extractor
+import vega_lite_emitter
+from simvec_storage import binary_extension
+
+# 各图表类型对应的抽取模块 (模块中提供 process_file)
+extractors = {
+    "bar": bar_data_extractor,
+    "scatter": scatter_data_extractor,
+    "pie": pie_data_extractor,
+    "line": line_data_extractor,
+    "stackbar": stackbar_data_extractor,
+}
+
+# 支持的图表类型 (文件夹名称)
+chart_types = list(extractors)
+
+
+def add_extractor_arguments(parser: argparse.ArgumentParser):
+    """各抽取模块的可选参数 (pipeline、hot_folder 与 sharded_io 共用)"""
+    parser.add_argument("--resample", action="store_true", help="折线图只在 X 轴刻度处插值输出")
+    parser.add_argument("--dedup", action="store_true", help="散点图中同一分类落在同一个网格单元内的点只保留第一个")
+    parser.add_argument("--dedup-cell", type=float, default=scatter_data_extractor.dedup_cell_pixels, metavar="PX",
+                        help="散点图 --dedup 的网格单元边长 (像素)")
+    parser.add_argument("--bins", type=int, default=0, metavar="N", help="散点图输出每个分类的 N x N 二维直方图")
+
+
+def extractor_options_from_args(args: argparse.Namespace) -> dict:
+    """
+    由命令行参数生成 {图表类型: 抽取模块 process_file / process_data 的关键字参数}
+    只包含不是默认值的参数, 默认运行的增量缓存签名不受影响
+    """
+    options = {}
+    if args.resample:
+        options["line"] = {"resample": True}
+    if args.dedup or args.bins:
+        options["scatter"] = {"dedup": args.dedup, "bins": args.bins}
+        if args.dedup_cell != scatter_data_extractor.dedup_cell_pixels:
+            options["scatter"]["dedup_cell"] = args.dedup_cell
+    return options
+
+
+def list_charts(selected_types: list) -> list:
+    """列出所有待处理的图表 (chart_type, chart_name), 取 raw_simvec 与 raw_meta 中文件名的并集"""
+    charts = []
+    for chart_type in selected_types:
+        names = set()
+        simvec_path = os.path.join(data_formatter.input_simvec_directory, chart_type)
+        metadata_path = os.path.join(data_formatter.input_metadata_directory, chart_type)
+        if os.path.isdir(simvec_path):
+            names.update(os.path.splitext(f)[0] for f in os.listdir(simvec_path) if f.endswith(".txt"))
+        if os.path.isdir(metadata_path):
+            names.update(os.path.splitext(f)[0] for f in os.listdir(metadata_path) if f.endswith(".json"))
+        charts.extend((chart_type, name) for name in sorted(names))
+    return charts
+
+
+def process_chart(task: tuple) -> dict:
+    """
+    处理单个图表: 规范化 SimVec 与 Metadata, 再调用对应的抽取模块
+    内存模式 (options["in_memory"]) 下规范化结果直接交给抽取模块, 不读写 cleaned_* 文件
+    任何异常都记录在返回结果中, 不会中断整个批处理
+    """
+    chart_type, chart_name, options, previous = task
+    write_json = options.get("json", False)
+    extractor_kwargs = (options.get("extractor_options") or {}).get(chart_type, {})
+    result = {"chart_type": chart_type, "chart": chart_name, "status": "ok", "error": None, "seconds": 0.0}
+    cache = build_cache.ChartCache(previous, enabled=options.get("incremental", False))
+    profiler = cProfile.Profile() if options.get("profile") else None
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        raw_simvec_path = os.path.join(data_formatter.input_simvec_directory, chart_type, chart_name + ".txt")
+        raw_metadata_path = os.path.join(data_formatter.input_metadata_directory, chart_type, chart_name + ".json")
+        simvec_base_path = os.path.join(data_formatter.output_simvec_directory, chart_type, chart_name)
+        metadata_path = os.path.join(data_formatter.output_metadata_directory, chart_type, chart_name + ".json")
+        formatter_version = build_cache.code_version(data_formatter)
+
+        in_memory = options.get("in_memory", False)
+        keep_intermediates = options.get("keep_intermediates", False)
+        metadata = None
+
+        # 1. 规范化 SimVec (raw_simvec → cleaned_simvec)
+        if os.path.exists(raw_simvec_path) and not in_memory:
+            outputs = [simvec_base_path + binary_extension] + ([simvec_base_path + ".json"] if write_json else [])
+            if not cache.is_fresh("simvec", [raw_simvec_path], outputs, formatter_version, {"json": write_json}):
+                os.makedirs(os.path.dirname(simvec_base_path), exist_ok=True)
+                data_formatter.format_simvec_file(raw_simvec_path, simvec_base_path, write_json)
+
+        # 2. 规范化 Metadata (raw_meta → cleaned_meta)
+        if os.path.exists(raw_metadata_path) and not in_memory:
+            if not cache.is_fresh("metadata", [raw_metadata_path], [metadata_path], formatter_version):
+                os.makedirs(os.path.dirname(metadata_path), exist_ok=True)
+                data_formatter.format_metadata_file(raw_metadata_path, metadata_path)
+
+        # 3. 抽取数据 (缺少任意一半时跳过)
+        if not os.path.exists(raw_simvec_path):
+            result["status"] = "skipped"
+            result["error"] = "缺少 raw_simvec 文件"
+        elif not os.path.exists(raw_metadata_path):
+            result["status"] = "skipped"
+            result["error"] = "缺少 raw_meta 文件"
+        else:
+            extractor = extractors[chart_type]
+            outputs = [os.path.join(extractor.output_dir, chart_name + ".txt")]
+            if in_memory:
+                # 3. 内存模式 (raw_simvec + raw_meta → extracted_data), 只在调试时写出 cleaned_* 文件
+                inputs = [raw_simvec_path, raw_metadata_path]
+                intermediates = [simvec_base_path + binary_extension, metadata_path] if keep_intermediates else []
+                if write_json and keep_intermediates:
+                    intermediates.append(simvec_base_path + ".json")
+                version = formatter_version + build_cache.code_version(extractor)
+                stage_options = {"json": write_json, "keep_intermediates": keep_intermediates}
+                if extractor_kwargs:
+                    stage_options["extractor"] = extractor_kwargs
+                if not cache.is_fresh("in_memory", inputs, outputs + intermediates, version, stage_options):
+                    metadata, columns = data_formatter.load_raw_chart(raw_simvec_path, raw_metadata_path, chart_type, chart_name)
+                    if keep_intermediates:
+                        data_formatter.save_intermediates(metadata, columns, simvec_base_path, metadata_path, write_json)
+                    extractor.process_data(chart_name + ".json", metadata, columns, **extractor_kwargs)
+            else:
+                # 3. 抽取数据 (cleaned_simvec + cleaned_meta → extracted_data)
+                inputs = [simvec_base_path + binary_extension, metadata_path]
+                if not cache.is_fresh("extract", inputs, outputs, build_cache.code_version(extractor), extractor_kwargs):
+                    extractor.process_file(chart_name + ".json", **extractor_kwargs)
+
+            # 4. 生成 Vega-Lite 规范 (extracted_data + cleaned_meta → vega_lite)
+            if options.get("vega_lite"):
+                vega_lite_path = os.path.join(vega_lite_emitter.output_dir, chart_type, chart_name + ".json")
+                inputs = outputs + [raw_metadata_path if in_memory else metadata_path]
+                if not cache.is_fresh("vega_lite", inputs, [vega_lite_path], build_cache.code_version(vega_lite_emitter)):
+                    if in_memory and metadata is None:
+                        with open(raw_metadata_path, "r", encoding="utf-8") as f:
+                            metadata = data_formatter.normalize_metadata(json.load(f))
+                    with instrumentation.stage(chart_type, chart_name, "vega_lite"):
+                        vega_lite_emitter.emit_chart(chart_type, chart_name, metadata)
+                result["vega_lite"] = vega_lite_path
+        result["cache"] = cache.entries
+        result["cached_stages"] = cache.skipped
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["traceback"] = traceback.format_exc()
+    result["seconds"] = round(time.perf_counter() - start, 4)
+
+    # 各阶段的指标随结果返回主进程; 开启 profile 时保存本图表的 cProfile 统计
+    result["metrics"] = instrumentation.take_records()
+    if profiler:
+        profiler.disable()
+        os.makedirs(instrumentation.profile_directory, exist_ok=True)
+        result["profile"] = os.path.join(instrumentation.profile_directory, f"{chart_type}__{chart_name}.prof")
+        profiler.dump_stats(result["profile"])
+    return result
+
+
+def run_pipeline(selected_types: list = None, workers: int = None, write_json: bool = False, incremental: bool = False,
+                 vega_lite: bool = False, ndjson_path: str = None, profile_slowest: int = 0,
+                 in_memory: bool = False, keep_intermediates: bool = False, extractor_options: dict = None) -> list:
+    """
+    以进程池并行运行 规范化 → 抽取 的完整流程, 每个图表是一个独立任务
+    incremental 为 True 时, 输入内容与代码版本均未变化的阶段会被跳过
+    vega_lite 为 True 时为每个图表生成 Vega-Lite 规范; 给出 ndjson_path 时再合并为一个 NDJSON 文件
+    in_memory 为 True 时每个图表在一个进程内完成 解析 → 规范化 → 抽取, 不写 cleaned_* 文件
+    (keep_intermediates 为 True 时仍写出, 便于调试)
+    extractor_options 为 {图表类型: 关键字参数}, 传给对应抽取模块的 process_file / process_data (例如折线图的 resample)
+    profile_slowest 大于 0 时对每个图表运行 cProfile, 只保留最慢的若干个图表的统计文件
+    各阶段耗时、图元数量、回退分类与坐标轴校准失败写入 intermediate_data/logs
+    返回每个图表的处理结果列表
+    """
+    selected_types = selected_types or chart_types
+    workers = workers or os.cpu_count() or 1
+    manifest = build_cache.load_manifest()
+    options = {
+        "json": write_json,
+        "incremental": incremental,
+        "vega_lite": vega_lite or bool(ndjson_path),
+        "profile": profile_slowest > 0,
+        "in_memory": in_memory,
+        "keep_intermediates": keep_intermediates,
+        "extractor_options": extractor_options or {},
+    }
+    tasks = [
+        (chart_type, chart_name, options, manifest["charts"].get(f"{chart_type}/{chart_name}"))
+        for chart_type, chart_name in list_charts(selected_types)
+    ]
+    if not tasks:
+        print("没有找到需要处理的图表。")
+        return []
+
+    start = time.perf_counter()
+    # 每个工作进程一次领取一批任务, 减少大语料下的进程间通信开销
+    chunksize = max(1, len(tasks) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(process_chart, tasks, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+
+    # 只记录成功的图表, 失败的图表下次会完整重跑
+    for r in results:
+        if r["status"] != "failed":
+            manifest["charts"][f"{r['chart_type']}/{r['chart']}"] = r.pop("cache")
+    build_cache.save_manifest(manifest)
+    instrumentation.flush("pipeline", [record for r in results for record in r.pop("metrics")])
+
+    # 只保留最慢的图表的 cProfile 统计
+    profiled = sorted((r for r in results if r.get("profile")), key=lambda r: r["seconds"], reverse=True)
+    for r in profiled[profile_slowest:]:
+        os.remove(r.pop("profile"))
+
+    # 各图表的规范已是单行 JSON, 直接拼接为 NDJSON
+    if ndjson_path:
+        serialized = []
+        for r in results:
+            if r.get("vega_lite"):
+                with open(r["vega_lite"], "r", encoding="utf-8") as f:
+                    serialized.append(f.read())
+        vega_lite_emitter.write_ndjson(ndjson_path, serialized)
+        print(f"NDJSON 已保存: {ndjson_path} ({len(serialized)} 个规范)")
+
+    # 汇总报告
+    failed = [r for r in results if r["status"] == "failed"]
+    skipped = [r for r in results if r["status"] == "skipped"]
+    print(f"\n处理完成: {len(results)} 个图表, 成功 {len(results) - len(failed) - len(skipped)}, "
+          f"跳过 {len(skipped)}, 失败 {len(failed)}, 用时 {elapsed:.2f}s ({workers} 个进程)")
+    if incremental:
+        cached = sum(1 for r in results if r.get("cached_stages"))
+        print(f"增量模式: {cached} 个图表命中缓存, 共跳过 {sum(len(r.get('cached_stages', [])) for r in results)} 个阶段")
+    for r in skipped:
+        print(f"  跳过 {r['chart_type']}/{r['chart']}: {r['error']}")
+    for r in failed:
+        print(f"  失败 {r['chart_type']}/{r['chart']}: {r['error']}")
+    for r in profiled[:profile_slowest]:
+        print(f"  cProfile {r['chart_type']}/{r['chart']} ({r['seconds']}s): {r['profile']}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="运行 SimVec → 抽取数据 的完整流程")
+    parser.add_argument("--types", nargs="+", choices=chart_types, default=chart_types, help="要处理的图表类型")
+    parser.add_argument("--workers", type=int, default=None, help="进程数, 默认为 CPU 核数")
+    parser.add_argument("--json", action="store_true", help="同时输出 cleaned_simvec_data 的 JSON 便于调试")
+    parser.add_argument("--incremental", action="store_true", help="跳过输入与代码均未变化的阶段")
+    parser.add_argument("--vega-lite", action="store_true", help="为每个图表生成 Vega-Lite 规范")
+    parser.add_argument("--ndjson", default=None, help="将所有 Vega-Lite 规范合并写入该 NDJSON 文件")
+    parser.add_argument("--in-memory", action="store_true", help="不经过 cleaned_* 文件, 在内存中完成规范化与抽取")
+    parser.add_argument("--keep-intermediates", action="store_true", help="内存模式下仍写出 cleaned_* 文件以便调试")
+    parser.add_argument("--profile", type=int, default=0, metavar="N", help="用 cProfile 记录最慢的 N 个图表")
+    add_extractor_arguments(parser)
+    args = parser.parse_args()
+
+    results = run_pipeline(
+        args.types, args.workers, args.json, args.incremental, args.vega_lite, args.ndjson, args.profile,
+        args.in_memory, args.keep_intermediates, extractor_options_from_args(args),
+    )
+    sys.exit(1 if any(r["status"] == "failed" for r in results) else 0)
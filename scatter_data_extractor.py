@@ -1,139 +1,176 @@
+import argparse
 import json
-import math
 import os
 
-# 目录路径
+import numpy as np
+
+import instrumentation
+from color_palette import palette_for
+from simvec_model import SimVecChart
+from simvec_storage import load_simvec
+from spatial_index import classify_primitives
+from text_index import TextIndex
+
+# 图表类型与目录路径
+chart_type = 'scatter'
 meta_data_dir = 'intermediate_data/cleaned_meta_data/scatter'
 simvec_data_dir = 'intermediate_data/cleaned_simvec_data/scatter'
 output_dir = 'intermediate_data/extracted_data/scatter'
 
-# 确保输出目录存在
-os.makedirs(output_dir, exist_ok=True)
+# dedup 去重时默认的网格单元边长 (像素): 同一分类中圆心落在同一个单元内的点只保留第一个
+dedup_cell_pixels = 1.0
 
-# 颜色相关的辅助函数
-def hex_to_rgb(hex_color: str) -> tuple:
-    """将十六进制颜色转换为 (R,G,B) 元组格式"""
-    hex_color = hex_color.lstrip('#')
-    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
 
-def color_distance(rgb1: tuple, rgb2: tuple) -> float:
-    """计算两个 RGB 颜色之间的欧氏距离"""
-    return math.sqrt(sum((c1 - c2) ** 2 for c1, c2 in zip(rgb1, rgb2)))
+def extract_scatter_points(metadata: dict, simvec_data: SimVecChart) -> tuple:
+    """
+    一次换算全部圆心, 返回 (圆心像素坐标 (N,2) float64, X 数据值, Y 数据值, 分类列表)
+    """
+    # 每张图表构建一次文本索引
+    text_index = TextIndex(simvec_data.text)
 
-# 允许的颜色容差范围
-tolerance = 60
+    # 用 X 轴和 Y 轴 (定量数据) 的所有匹配刻度一次拟合像素比例 (scale)
+    x_axis = text_index.fit_axis(metadata['xAxis']['ticks'], 'x')
+    y_axis = text_index.fit_axis(metadata['yAxis']['ticks'], 'y')
 
-# 遍历元数据文件夹中的每一个 JSON 文件
-for file_name in os.listdir(meta_data_dir):
-    if not file_name.endswith('.json'):
-        continue
-    
+    # 由图例 (legend) 构建一次调色板 (使用 RGB 格式)
+    palette = palette_for(metadata)
+    if palette.color_to_category is None:
+        print("没有找到 legend 数据，默认直接根据 RGB 颜色进行分类。")
+
+    # 由空间索引排除图例色块与绘图区外的圆, 批量确定其余圆的分类 (category), 未匹配图例时使用自身颜色表示
+    marks = classify_primitives(simvec_data, metadata, text_index).marks('circle')
+    categories = palette.classify(simvec_data.circle.rgb[marks], unmatched_label=None)
+
+    # 圆心像素坐标取整后, 以一次仿射变换换算为数据值; 去重使用未取整的坐标
+    centers = simvec_data.circle.position[marks, :2].astype(np.float64)
+    pixels = centers.astype(np.int64)
+    return centers, x_axis.value(pixels[:, 0]), y_axis.value(pixels[:, 1]), categories
+
+
+def grid_unique(centers: np.ndarray, codes: np.ndarray, cell: float = dedup_cell_pixels) -> np.ndarray:
+    """网格哈希去重: 按浮点圆心坐标划分边长为 cell 的网格, 返回每个 (分类, 网格单元) 中第一个点的下标, 保持原有顺序"""
+    if not cell > 0:
+        raise ValueError(f"dedup_cell 必须大于 0: {cell}")
+    if len(centers) == 0:
+        return np.zeros(0, dtype=np.int64)
+    # 分类与网格行列压缩成一个 int64 键, 一维 unique 比按行 unique 快得多
+    cells = np.floor(np.asarray(centers, dtype=np.float64) / cell).astype(np.int64)
+    cells -= cells.min(axis=0)
+    columns, rows = cells.max(axis=0) + 1
+    keys = (codes.astype(np.int64) * rows + cells[:, 1]) * columns + cells[:, 0]
+    _, first = np.unique(keys, return_index=True)
+    return np.sort(first)
+
+
+def histogram_rows(xs: np.ndarray, ys: np.ndarray, codes: np.ndarray, labels: list, bins: int) -> list:
+    """
+    每个分类在数据范围上的 bins x bins 二维直方图, 一次 bincount 完成
+    输出非空单元: x / y 为单元中心, count 为点数
+    """
+    if len(xs) == 0:
+        return []
+    x_min, y_min = xs.min(), ys.min()
+    x_width = (xs.max() - x_min) / bins or 1.0
+    y_width = (ys.max() - y_min) / bins or 1.0
+    x_bins = np.minimum(((xs - x_min) / x_width).astype(np.int64), bins - 1)
+    y_bins = np.minimum(((ys - y_min) / y_width).astype(np.int64), bins - 1)
+    counts = np.bincount((codes * bins + x_bins) * bins + y_bins, minlength=len(labels) * bins * bins)
+
+    rows = []
+    for cell in np.flatnonzero(counts).tolist():
+        code, rest = divmod(cell, bins * bins)
+        x_bin, y_bin = divmod(rest, bins)
+        rows.append({
+            "x": round(float(x_min + (x_bin + 0.5) * x_width), 2),
+            "y": round(float(y_min + (y_bin + 0.5) * y_width), 2),
+            "count": int(counts[cell]),
+            "category": labels[code],
+        })
+    return rows
+
+
+def extract_scatter_data(metadata: dict, simvec_data: SimVecChart, dedup: bool = False, bins: int = 0,
+                         dedup_cell: float = dedup_cell_pixels) -> list:
+    """
+    根据清洗后的 metadata 与 simvec 列式数据计算散点图数据
+      dedup: 同一分类中圆心落在同一个边长为 dedup_cell 像素的网格单元内的点只保留第一个
+      bins:  大于 0 时不再逐点输出, 而是输出每个分类的 bins x bins 二维直方图 (每个非空单元一行, 带 count)
+    """
+    if bins < 0:
+        raise ValueError(f"bins 不能为负数: {bins}")
+    centers, xs, ys, categories = extract_scatter_points(metadata, simvec_data)
+    if dedup or bins:
+        labels, codes = np.unique(np.array(categories, dtype=str), return_inverse=True)
+        labels = labels.tolist()
+        if dedup:
+            keep = grid_unique(centers, codes, dedup_cell)
+            xs, ys, codes = xs[keep], ys[keep], codes[keep]
+            categories = [labels[code] for code in codes.tolist()]
+        if bins:
+            return histogram_rows(xs, ys, codes, labels, bins)
+
+    # 逐点输出 (保留两位小数)
+    return [
+        {"x": round(x_value, 2), "y": round(y_value, 2), "category": category}
+        for x_value, y_value, category in zip(xs.tolist(), ys.tolist(), categories)
+    ]
+
+
+def process_file(file_name: str, dedup: bool = False, bins: int = 0, dedup_cell: float = dedup_cell_pixels):
+    """处理单个图表: 读取 metadata 与 simvec, 计算散点图数据并写出结果 (dedup / bins / dedup_cell 见 extract_scatter_data)"""
     file_base_name = os.path.splitext(file_name)[0]
     
     # 读取 metadata JSON 文件
     meta_file_path = os.path.join(meta_data_dir, file_name)
-    simvec_file_path = os.path.join(simvec_data_dir, file_name)
-    output_file_path = os.path.join(output_dir, f"{file_base_name}.txt")
     
     print(f"\n正在处理文件: {file_name}")
     
-    with open(meta_file_path, 'r', encoding='utf-8') as f:
-        metadata = json.load(f)
+    with instrumentation.stage(chart_type, file_base_name, 'load'):
+        with open(meta_file_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
 
-    # 读取 simvec JSON 文件
-    with open(simvec_file_path, 'r', encoding='utf-8') as f:
-        simvec_data = json.load(f)
+        # 读取 simvec 数据 (优先内存映射二进制格式, 数值列不发生拷贝)
+        simvec_data = load_simvec(os.path.join(simvec_data_dir, file_base_name))
+    instrumentation.record_primitives(chart_type, file_base_name, simvec_data)
+    process_data(file_name, metadata, simvec_data, dedup, bins, dedup_cell)
 
-    # 提取 X 轴和 Y 轴 (定量数据) 刻度
-    x_ticks_labels = metadata['xAxis']['ticks']
-    y_ticks_labels = metadata['yAxis']['ticks']
-    
-    x_ticks_values = [float(t) for t in x_ticks_labels]
-    y_ticks_values = [float(t) for t in y_ticks_labels]
-
-    # 计算 X 和 Y 轴的像素比例 (scale)
-    x_max_value = x_ticks_values[-1]
-    x_min_value = x_ticks_values[0]
-    y_max_value = y_ticks_values[-1]
-    y_min_value = y_ticks_values[0]
-
-    x_max_label = x_ticks_labels[-1]
-    x_min_label = x_ticks_labels[0]
-    y_max_label = y_ticks_labels[-1]
-    y_min_label = y_ticks_labels[0]
-
-    # 获取 X 轴的最大和最小像素坐标
-    x_max_pixel = next(
-        int(text['position'][0]) 
-        for text in simvec_data['text'] 
-        if text['content'] == x_max_label
-    )
-    x_min_pixel = next(
-        int(text['position'][0]) 
-        for text in simvec_data['text'] 
-        if text['content'] == x_min_label
-    )
-
-    # 获取 Y 轴的最大和最小像素坐标
-    y_max_pixel = next(
-        int(text['position'][1]) 
-        for text in simvec_data['text'] 
-        if text['content'] == y_max_label
-    )
-    y_min_pixel = next(
-        int(text['position'][1]) 
-        for text in simvec_data['text'] 
-        if text['content'] == y_min_label
-    )
-
-    # 计算 X 和 Y 轴的 scale
-    x_scale = (x_max_value - x_min_value) / (x_max_pixel - x_min_pixel)
-    y_scale = (y_max_value - y_min_value) / (y_min_pixel - y_max_pixel)
-
-    # 解析图例 (legend) 中颜色到类别的映射关系 (使用 RGB 格式)
-    color_to_category = {}
-    if 'legend' in metadata and isinstance(metadata['legend'], dict) and 'items' in metadata['legend'] and 'colors' in metadata['legend']:
-        legend_items = metadata['legend']['items']
-        legend_colors = [hex_to_rgb(color) for color in metadata['legend']['colors']]
-        color_to_category = dict(zip(legend_colors, legend_items))
-    else:
-        print("没有找到 legend 数据，默认直接根据 RGB 颜色进行分类。")
-        color_to_category = None
-
-    # 解析每一个圆 (散点图) 的数据值
-    scatter_data = []
-    for circle in simvec_data['circle']:
-        x_center = int(circle['position'][0])  # 圆心的 X 坐标
-        y_center = int(circle['position'][1])  # 圆心的 Y 坐标
-        circle_color = eval(circle['color'])   # 颜色转换为 RGB 元组
-
-        # 计算实际的 X 和 Y 轴数据值
-        x_value = x_min_value + (x_center - x_min_pixel) * x_scale
-        y_value = y_max_value - (y_center - y_max_pixel) * y_scale
-        x_value = round(x_value, 2)
-        y_value = round(y_value, 2)
-
-        # 确定圆的分类 (category)
-        if color_to_category:
-            category = f"RGB{circle_color}"  # 默认分类为自身颜色表示
-            min_distance = float('inf')
-            
-            for legend_color, legend_category in color_to_category.items():
-                distance = color_distance(circle_color, legend_color)
-                if distance < min_distance:
-                    min_distance = distance
-                    # 仅在距离小于容差时才更新为图例中的类别
-                    if distance <= tolerance:
-                        category = legend_category
-        else:
-            category = f"RGB{circle_color}"
-
-        scatter_data.append({"x": x_value, "y": y_value, "category": category})
+
+def process_data(file_name: str, metadata: dict, simvec_data: SimVecChart, dedup: bool = False, bins: int = 0,
+                 dedup_cell: float = dedup_cell_pixels):
+    """由已在内存中的 metadata 与 simvec 计算散点图数据并写出结果 (pipeline 的内存模式直接调用)"""
+    # 确保输出目录存在
+    os.makedirs(output_dir, exist_ok=True)
+
+    file_base_name = os.path.splitext(file_name)[0]
+    output_file_path = os.path.join(output_dir, f"{file_base_name}.txt")
+
+    with instrumentation.stage(chart_type, file_base_name, 'extract'):
+        scatter_data = extract_scatter_data(metadata, simvec_data, dedup, bins, dedup_cell)
+    instrumentation.record_categories(chart_type, file_base_name, [point["category"] for point in scatter_data])
 
     # 输出计算结果到文件
-    with open(output_file_path, 'w', encoding='utf-8') as output_file:
-        output_file.write(f"计算出的散点图数据 ({file_name}):\n")
-        for point in scatter_data:
-            output_file.write(json.dumps(point, ensure_ascii=False) + ",\n")
-    
+    with instrumentation.stage(chart_type, file_base_name, 'write'):
+        with open(output_file_path, 'w', encoding='utf-8') as output_file:
+            output_file.write(f"计算出的散点图数据 ({file_name}):\n")
+            for point in scatter_data:
+                output_file.write(json.dumps(point, ensure_ascii=False) + ",\n")
+
     print(f"已保存到: {output_file_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="由 cleaned_* 数据计算散点图数据")
+    parser.add_argument("--dedup", action="store_true", help="同一分类中落在同一个网格单元内的点只保留第一个")
+    parser.add_argument("--dedup-cell", type=float, default=dedup_cell_pixels, metavar="PX",
+                        help=f"--dedup 的网格单元边长 (像素, 默认 {dedup_cell_pixels:g})")
+    parser.add_argument("--bins", type=int, default=0, metavar="N", help="输出每个分类的 N x N 二维直方图, 而不是逐点输出")
+    args = parser.parse_args()
+
+    # 遍历元数据文件夹中的每一个 JSON 文件
+    try:
+        for file_name in os.listdir(meta_data_dir):
+            if file_name.endswith('.json'):
+                process_file(file_name, args.dedup, args.bins, args.dedup_cell)
+    finally:
+        # 写出结构化日志与 Prometheus 快照
+        instrumentation.flush("scatter_data_extractor")
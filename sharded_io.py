@@ -0,0 +1,254 @@
+import argparse
+import gzip
+import json
+import os
+import tarfile
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import extraction_service
+import pipeline
+
+# 默认输出目录与每个分片的图表数
+default_output_directory = "intermediate_data/extracted_shards"
+default_charts_per_shard = 1000
+
+# 预读的分片数 (后台线程顺序读取整个分片, 工作进程无需等待文件系统)
+default_read_ahead = 2
+
+# 每次提交给工作进程的图表数
+batch_size = 32
+
+# tar / zip 分片中的成员路径与 intermediate_data 相同: raw_simvec_data/<type>/<name>.txt, raw_meta_data/<type>/<name>.json
+member_folders = {"raw_simvec_data": ("simvec", ".txt"), "raw_meta_data": ("metadata", ".json")}
+shard_extensions = {"tar": ".tar", "zip": ".zip", "jsonl": ".jsonl"}
+
+
+def _is_jsonl(path: str) -> bool:
+    return path.endswith(".jsonl") or path.endswith(".jsonl.gz")
+
+
+def _parse_member(name: str):
+    """由成员路径得到 (chart_type, chart, 字段名), 不是原始数据文件时返回 None"""
+    parts = name.replace("\\", "/").split("/")
+    if len(parts) < 3 or parts[-3] not in member_folders:
+        return None
+    field, extension = member_folders[parts[-3]]
+    if not parts[-1].endswith(extension):
+        return None
+    return parts[-2], parts[-1][: -len(extension)], field
+
+
+def _iter_members(path: str):
+    """顺序读取 tar / zip 分片, 逐个返回 (成员路径, 内容字节)"""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    yield info.filename, archive.read(info)
+    else:
+        # 流式模式只做一次顺序读取, 不做随机访问
+        with tarfile.open(path, mode="r|*") as archive:
+            for member in archive:
+                if member.isfile():
+                    yield member.name, archive.extractfile(member).read()
+
+
+def read_shard(path: str) -> list:
+    """
+    读取整个分片, 返回图表记录列表: {"chart_type", "chart", "simvec": SimVec 文本, "metadata": 原始 metadata}
+    JSONL 分片每行就是一条记录; tar / zip 分片按成员路径配对, 缺少的一半为 None
+    """
+    if _is_jsonl(path):
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    charts = {}
+    for name, content in _iter_members(path):
+        key = _parse_member(name)
+        if key is None:
+            continue
+        chart_type, chart, field = key
+        record = charts.setdefault((chart_type, chart), {"chart_type": chart_type, "chart": chart, "simvec": None, "metadata": None})
+        text = content.decode("utf-8")
+        record[field] = json.loads(text) if field == "metadata" else text
+    return list(charts.values())
+
+
+def iter_charts(shard_paths: list, read_ahead: int = default_read_ahead):
+    """按顺序逐个返回所有分片中的图表记录, 后台线程提前读取之后的 read_ahead 个分片"""
+    with ThreadPoolExecutor(max_workers=max(1, read_ahead)) as pool:
+        pending = deque(pool.submit(read_shard, path) for path in shard_paths[: max(1, read_ahead)])
+        next_index = len(pending)
+        while pending:
+            charts = pending.popleft().result()
+            if next_index < len(shard_paths):
+                pending.append(pool.submit(read_shard, shard_paths[next_index]))
+                next_index += 1
+            yield from charts
+
+
+def process_record(record: dict) -> dict:
+    """在内存中抽取单个图表, 返回结果记录 (失败与跳过同样记录, 不中断批处理)"""
+    result = {"chart_type": record.get("chart_type"), "chart": record.get("chart"), "status": "ok"}
+    if record.get("simvec") is None:
+        return {**result, "status": "skipped", "error": "缺少 raw_simvec 文件"}
+    if record.get("metadata") is None:
+        return {**result, "status": "skipped", "error": "缺少 raw_meta 文件"}
+    try:
+        result.update(extraction_service.extract_chart(record))
+    except Exception as e:
+        result.update(status="failed", error=f"{type(e).__name__}: {e}")
+    return result
+
+
+def process_batch(records: list, extractor_options: dict = None) -> list:
+    """处理一批记录; extractor_options ({图表类型: 关键字参数}) 用于没有自带 options 的记录"""
+    extractor_options = extractor_options or {}
+    return [
+        process_record({"options": extractor_options[record.get("chart_type")], **record}
+                       if record.get("chart_type") in extractor_options else record)
+        for record in records
+    ]
+
+
+def _batches(records, size: int):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class ShardWriter:
+    """
+    把结果记录按每行一个写入 JSONL 分片 extracted-00000.jsonl, ...
+    每个分片写满 charts_per_shard 条后原子地改名, 中断时不会留下看似完整的分片
+    """
+
+    def __init__(self, output_directory: str = default_output_directory, charts_per_shard: int = default_charts_per_shard):
+        self.output_directory = output_directory
+        self.charts_per_shard = charts_per_shard
+        self.paths = []
+        self._file = None
+        self._count = 0
+        os.makedirs(output_directory, exist_ok=True)
+
+    def write(self, result: dict):
+        if self._file is None:
+            path = os.path.join(self.output_directory, f"extracted-{len(self.paths):05d}.jsonl")
+            self.paths.append(path)
+            self._file = open(path + ".tmp", "w", encoding="utf-8")
+        self._file.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self._count += 1
+        if self._count == self.charts_per_shard:
+            self._finish()
+
+    def _finish(self):
+        self._file.close()
+        os.replace(self._file.name, self.paths[-1])
+        self._file = None
+        self._count = 0
+
+    def close(self):
+        if self._file is not None:
+            self._finish()
+
+
+def run_sharded(shard_paths: list, output_directory: str = default_output_directory, workers: int = None,
+                charts_per_shard: int = default_charts_per_shard, read_ahead: int = default_read_ahead,
+                extractor_options: dict = None) -> dict:
+    """
+    从 tar / zip / JSONL 分片读取原始数据, 以进程池抽取, 结果按输入顺序写入 JSONL 分片
+    同时在途的批次数有上限, 内存占用与语料规模无关
+    extractor_options 见 pipeline.run_pipeline
+    返回各状态的图表数量
+    """
+    workers = workers or os.cpu_count() or 1
+    counts = {"ok": 0, "skipped": 0, "failed": 0}
+    writer = ShardWriter(output_directory, charts_per_shard)
+    with ProcessPoolExecutor(max_workers=workers, initializer=extraction_service._warm_worker) as executor:
+        pending = deque()
+
+        def drain(limit: int):
+            while len(pending) > limit:
+                for result in pending.popleft().result():
+                    counts[result["status"]] += 1
+                    writer.write(result)
+
+        for batch in _batches(iter_charts(shard_paths, read_ahead), batch_size):
+            pending.append(executor.submit(process_batch, batch, extractor_options))
+            drain(workers * 2)
+        drain(0)
+    writer.close()
+    return {**counts, "shards": writer.paths}
+
+
+def pack_corpus(source_directory: str = "intermediate_data", output_directory: str = "intermediate_data/shards",
+                shard_format: str = "tar", charts_per_shard: int = default_charts_per_shard, selected_types: list = None) -> list:
+    """把 raw_simvec_data 与 raw_meta_data 下的逐图表文件打包为分片, 返回分片路径列表"""
+    charts = []
+    for chart_type in selected_types or pipeline.chart_types:
+        names = set()
+        for folder, (_, extension) in member_folders.items():
+            directory = os.path.join(source_directory, folder, chart_type)
+            if os.path.isdir(directory):
+                names.update(f[: -len(extension)] for f in os.listdir(directory) if f.endswith(extension))
+        charts.extend((chart_type, name) for name in sorted(names))
+
+    os.makedirs(output_directory, exist_ok=True)
+    paths = []
+    for start in range(0, len(charts), charts_per_shard):
+        path = os.path.join(output_directory, f"raw-{len(paths):05d}{shard_extensions[shard_format]}")
+        members = [
+            (f"{folder}/{chart_type}/{name}{file_extension}", os.path.join(source_directory, folder, chart_type, name + file_extension))
+            for chart_type, name in charts[start:start + charts_per_shard]
+            for folder, (_, file_extension) in member_folders.items()
+        ]
+        members = [(arcname, file_path) for arcname, file_path in members if os.path.exists(file_path)]
+        if shard_format == "tar":
+            with tarfile.open(path, "w") as archive:
+                for arcname, file_path in members:
+                    archive.add(file_path, arcname)
+        elif shard_format == "zip":
+            with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+                for arcname, file_path in members:
+                    archive.write(file_path, arcname)
+        else:
+            records = {}
+            for arcname, file_path in members:
+                chart_type, chart, field = _parse_member(arcname)
+                with open(file_path, "r", encoding="utf-8") as f:
+                    value = json.load(f) if field == "metadata" else f.read()
+                records.setdefault((chart_type, chart), {"chart_type": chart_type, "chart": chart, "simvec": None, "metadata": None})[field] = value
+            with open(path, "w", encoding="utf-8") as f_out:
+                f_out.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records.values()))
+        paths.append(path)
+        print(f"分片已保存: {path}")
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="从 tar / zip / JSONL 分片批量抽取, 结果写入 JSONL 分片")
+    parser.add_argument("shards", nargs="*", help="输入分片 (.tar / .tar.gz / .zip / .jsonl / .jsonl.gz)")
+    parser.add_argument("--output", default=default_output_directory)
+    parser.add_argument("--workers", type=int, default=None, help="进程数, 默认为 CPU 核数")
+    parser.add_argument("--charts-per-shard", type=int, default=default_charts_per_shard)
+    parser.add_argument("--read-ahead", type=int, default=default_read_ahead, help="后台预读的分片数")
+    parser.add_argument("--pack", default=None, metavar="SOURCE", help="先把 SOURCE 下的 raw_* 目录打包为分片, 写入 --output")
+    parser.add_argument("--format", choices=list(shard_extensions), default="tar", help="--pack 使用的分片格式")
+    pipeline.add_extractor_arguments(parser)
+    args = parser.parse_args()
+
+    if args.pack:
+        pack_corpus(args.pack, args.output, args.format, args.charts_per_shard)
+    else:
+        summary = run_sharded(sorted(args.shards), args.output, args.workers, args.charts_per_shard, args.read_ahead,
+                              pipeline.extractor_options_from_args(args))
+        print(f"处理完成: 成功 {summary['ok']}, 跳过 {summary['skipped']}, 失败 {summary['failed']}, "
+              f"写入 {len(summary['shards'])} 个分片")
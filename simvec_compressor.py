@@ -0,0 +1,280 @@
+import argparse
+import json
+import os
+import re
+
+import data_formatter
+import spatial_index
+from simvec_tokenizer import tokenize_simvec
+
+# 压缩结果与映射文件的输出目录
+output_directory = "intermediate_data/compressed_simvec"
+default_budget = 2000
+
+# 近似的 token 计数: 数字每 3 位一个 token, 单词一个 token, 其余符号各一个 token (与常见 BPE 分词器量级一致)
+token_pattern = re.compile(r"\d{1,3}|[A-Za-z]+|[^\sA-Za-z\d]")
+
+# 依次尝试的量化步长 (像素), None 表示保留原始精度; 超出预算时逐级加大
+quantization_steps = [None, 1, 2, 4, 8]
+
+# 连续同色、同宽、等间距的矩形达到该数量时合并为一条 rects 记录
+min_run_length = 3
+
+box_kinds = ("rect", "text", "circle")
+polyline_kinds = ("line", "area")
+
+
+def count_tokens(text: str) -> int:
+    return len(token_pattern.findall(text))
+
+
+def _number(value: float, quantum) -> str:
+    """按量化步长格式化坐标, 整数不带小数点"""
+    if quantum:
+        value = round(value / quantum) * quantum
+    return str(int(value)) if float(value).is_integer() else repr(round(value, 2))
+
+
+def _size(value: float, quantum) -> str:
+    """宽高的量化: 小于量化步长的尺寸只取整, 细小的图元不会被量化为 0"""
+    return _number(value, quantum if quantum and value >= quantum else (1 if quantum else None))
+
+
+def _axis_lines(text: str) -> set:
+    """
+    由 spatial_index.classify_primitives 判断的坐标轴 / 刻度线 / 网格线 (与抽取模块排除的图元相同), 返回其行号集合
+    列式数据中每种图元的行号与文件中出现的顺序一致 (无填充色的矩形不计入); 文本无法解析时不删除任何图元
+    """
+    try:
+        layout = spatial_index.classify_primitives(tokenize_simvec(text), {})
+    except ValueError:
+        return set()
+    rows = {kind: 0 for kind in spatial_index.classified_types}
+    result = set()
+    for index, line in enumerate(text.splitlines()):
+        kind, _, rest = line.strip().partition(" ")
+        if kind not in rows or not rest or (kind == "rect" and rest.partition(" ")[0] == "None"):
+            continue
+        if layout.roles[kind][rows[kind]] == spatial_index.axis:
+            result.add(index)
+        rows[kind] += 1
+    return result
+
+
+def parse_primitives(text: str) -> list:
+    """
+    逐行解析 SimVec, 每个图元记录其在原文件中的行号 (从 0 开始), 无法识别的行原样保留
+    坐标轴与网格线标记为 axis (见 _axis_lines)
+    """
+    axis_lines = _axis_lines(text)
+    primitives = []
+    for index, line in enumerate(text.splitlines()):
+        line = line.strip()
+        if not line:
+            continue
+        kind, _, rest = line.partition(" ")
+        head, _, payload = rest.partition(" ")
+        primitive = {"kind": kind, "head": head, "lines": [index], "raw": line, "axis": index in axis_lines}
+        try:
+            if kind in box_kinds:
+                primitive["box"] = [float(v) for v in payload.strip("[]").split(",")]
+            elif kind in polyline_kinds:
+                primitive["points"] = [tuple(float(v) for v in p.split(",")) for p in payload.split(";") if p]
+        except ValueError:
+            pass
+        primitives.append(primitive)
+    return primitives
+
+
+def _is_degenerate(primitive: dict) -> bool:
+    """不可见或无法绘制的图元: 无填充色的矩形、宽高为 0 的矩形 / 圆、少于 2 个不同顶点的折线"""
+    kind = primitive["kind"]
+    if kind == "rect" and primitive["head"] == "None":
+        return True
+    if kind in ("rect", "circle") and "box" in primitive:
+        return len(primitive["box"]) < 4 or primitive["box"][2] <= 0 or primitive["box"][3] <= 0
+    if kind in polyline_kinds and "points" in primitive:
+        return len(set(primitive["points"])) < 2
+    return False
+
+
+def _format(primitive: dict, quantum) -> str:
+    """把单个图元格式化为一行 SimVec"""
+    kind, head = primitive["kind"], primitive["head"]
+    if "box" in primitive:
+        box = primitive["box"]
+        values = [_number(v, quantum) for v in box[:2]] + [_size(v, quantum) for v in box[2:]]
+        return f"{kind} {head} [{','.join(values)}]"
+    if "points" in primitive:
+        points, previous = [], None
+        for x, y in primitive["points"]:
+            point = f"{_number(x, quantum)},{_number(y, quantum)}"
+            if point != previous:
+                # 量化后重合的相邻顶点只保留一个
+                points.append(point)
+            previous = point
+        return f"{kind} {head} {';'.join(points)}"
+    return primitive["raw"]
+
+
+def _rect_runs(primitives: list, quantum) -> list:
+    """
+    把同色、同宽、等间距的矩形合并为一条记录:
+      rects (r,g,b) [x0,dx,w] y,h;y,h;...
+    第 i 个矩形为 rect (r,g,b) [x0 + i*dx, y_i, w, h_i]
+    间距以前两个矩形的 dx 为准, 之后的矩形与 x0 + i*dx 的误差不超过 min(量化步长, dx / 2);
+    dx 不做量化 (保留两位小数), 否则误差会随 i 累积
+    各颜色的矩形先按 x 排序, 交错排列的分组柱状图也能合并; 记录输出在该颜色第一个矩形的位置
+    """
+    step = quantum or 0.5
+    groups = {}
+    for primitive in primitives:
+        if primitive["kind"] == "rect" and len(primitive.get("box", ())) == 4:
+            groups.setdefault(primitive["head"], []).append(primitive)
+
+    def runs(rects: list) -> list:
+        rects = sorted(rects, key=lambda p: p["box"][0])
+        records, run = [], []
+
+        def flush():
+            if len(run) >= min_run_length:
+                x0, dx, width = run[0]["box"][0], run[1]["box"][0] - run[0]["box"][0], run[0]["box"][2]
+                heights = ";".join(f"{_number(p['box'][1], quantum)},{_size(p['box'][3], quantum)}" for p in run)
+                records.append({
+                    "text": f"rects {run[0]['head']} [{_number(x0, quantum)},{_number(dx, None)},{_size(width, quantum)}] {heights}",
+                    "lines": [index for p in run for index in p["lines"]],
+                })
+            else:
+                records.extend({"text": _format(p, quantum), "lines": p["lines"]} for p in run)
+            run.clear()
+
+        for rect in rects:
+            if run:
+                box, first = rect["box"], run[0]["box"]
+                joinable = abs(box[2] - first[2]) <= step and box[0] > run[-1]["box"][0]
+                if joinable and len(run) >= 2:
+                    dx = run[1]["box"][0] - first[0]
+                    joinable = abs(box[0] - (first[0] + dx * len(run))) <= min(step, dx / 2)
+                if not joinable:
+                    flush()
+            run.append(rect)
+        flush()
+        return records
+
+    records, emitted = [], set()
+    for primitive in primitives:
+        head = primitive["head"]
+        if primitive["kind"] == "rect" and len(primitive.get("box", ())) == 4:
+            if head not in emitted:
+                emitted.add(head)
+                records.extend(runs(groups[head]))
+        else:
+            records.append({"text": _format(primitive, quantum), "lines": primitive["lines"]})
+    return records
+
+
+def _compress_level(primitives: list, quantum, drop_axes: bool, run_length: bool) -> tuple:
+    """按给定的量化步长与选项压缩一次, 返回 (记录列表, 被删除图元的行号 {原因: [行号]})"""
+    dropped = {"degenerate": [], "axis_grid": []}
+    kept = []
+    for primitive in primitives:
+        if _is_degenerate(primitive):
+            dropped["degenerate"].extend(primitive["lines"])
+        elif drop_axes and primitive["axis"]:
+            dropped["axis_grid"].extend(primitive["lines"])
+        else:
+            kept.append(primitive)
+
+    if run_length:
+        records = _rect_runs(kept, quantum)
+    else:
+        records = [{"text": _format(p, quantum), "lines": p["lines"]} for p in kept]
+
+    # 完全相同的记录 (包括量化后才重合的) 只保留第一条, 行号并入该记录
+    merged, seen = [], {}
+    for record in records:
+        if record["text"] in seen:
+            seen[record["text"]]["lines"].extend(record["lines"])
+        else:
+            # 复制行号列表: 记录可能直接引用图元的行号, 合并时不能修改图元本身 (各级别共用同一组图元)
+            seen[record["text"]] = record = {"text": record["text"], "lines": list(record["lines"])}
+            merged.append(record)
+    return merged, dropped
+
+
+def compress_simvec(text: str, budget: int = default_budget) -> tuple:
+    """
+    在 token 预算内压缩 SimVec, 损失从小到大逐级尝试:
+      1. 删除重复与退化图元, 保留原始精度
+      2. 坐标取整, 合并同色等间距的矩形
+      3. 删除坐标轴与网格线
+      4. 逐级加大量化步长 (2, 4, 8 像素)
+    所有级别都超出预算时, 返回 token 最少的一级
+    返回 (压缩后的文本, 映射); 映射中 records[i] 为第 i 行压缩记录对应的原始行号, 原始文件 + 映射可以无损还原每个图元
+    """
+    primitives = parse_primitives(text)
+    original_tokens = count_tokens(text)
+    levels = [(None, False, False), (1, False, True), (1, True, True)] + [(q, True, True) for q in quantization_steps[2:]]
+
+    best = None
+    for level, (quantum, drop_axes, run_length) in enumerate(levels):
+        records, dropped = _compress_level(primitives, quantum, drop_axes, run_length)
+        compressed = "\n".join(record["text"] for record in records)
+        tokens = count_tokens(compressed)
+        if best is None or tokens < best[0]:
+            best = (tokens, level, quantum, records, dropped, compressed)
+        if tokens <= budget:
+            break
+    tokens, level, quantum, records, dropped, compressed = best
+
+    mapping = {
+        "budget": budget,
+        "within_budget": tokens <= budget,
+        "level": level,
+        "quantum": quantum,
+        "original_tokens": original_tokens,
+        "tokens": tokens,
+        "records": [record["lines"] for record in records],
+        "dropped": dropped,
+    }
+    return compressed, mapping
+
+
+def original_primitives(original_text: str, mapping: dict, record_index: int) -> list:
+    """由原始文本与映射取回某条压缩记录对应的全部原始 SimVec 行"""
+    lines = original_text.splitlines()
+    return [lines[index] for index in mapping["records"][record_index]]
+
+
+def compress_file(input_path: str, output_base_path: str, budget: int = default_budget) -> dict:
+    """压缩一个 raw_simvec .txt, 写出 <base>.txt 与 <base>.map.json, 返回映射"""
+    with open(input_path, "r", encoding="utf-8") as f:
+        compressed, mapping = compress_simvec(f.read(), budget)
+    os.makedirs(os.path.dirname(output_base_path), exist_ok=True)
+    with open(output_base_path + ".txt", "w", encoding="utf-8") as f_out:
+        f_out.write(compressed)
+    with open(output_base_path + ".map.json", "w", encoding="utf-8") as f_out:
+        json.dump({"source": input_path, **mapping}, f_out)
+    return mapping
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="在 token 预算内压缩 raw_simvec_data, 并输出到原始图元的映射")
+    parser.add_argument("--budget", type=int, default=default_budget, help="每个图表的 token 上限")
+    parser.add_argument("--types", nargs="+", choices=data_formatter.chart_types, default=data_formatter.chart_types)
+    parser.add_argument("--output", default=output_directory)
+    args = parser.parse_args()
+
+    for chart_type in args.types:
+        input_chart_path = os.path.join(data_formatter.input_simvec_directory, chart_type)
+        if not os.path.isdir(input_chart_path):
+            continue
+        for file_name in sorted(os.listdir(input_chart_path)):
+            if file_name.endswith(".txt"):
+                name = os.path.splitext(file_name)[0]
+                mapping = compress_file(
+                    os.path.join(input_chart_path, file_name), os.path.join(args.output, chart_type, name), args.budget
+                )
+                note = "" if mapping["within_budget"] else " (超出预算)"
+                print(f"{chart_type}/{name}: {mapping['original_tokens']} → {mapping['tokens']} tokens, "
+                      f"级别 {mapping['level']}{note}")
@@ -0,0 +1,130 @@
+import numpy as np
+
+# SimVec 中的图元类型
+box_types = ("rect", "text", "circle")      # 以 [x, y, width, height] 描述位置的图元
+polyline_types = ("line", "area")           # 以 "x,y;x,y;..." 描述点序列的图元
+simvec_types = ("rect", "text", "circle", "line", "area")
+
+# 无法解析的颜色 (SimVec 中的 None) 在打包颜色列中的取值
+invalid_rgb = -1
+
+
+def unpack_rgb(rgb: np.ndarray) -> np.ndarray:
+    """将 0xRRGGBB 打包颜色数组还原为 (N,3) uint8 数组, 无效颜色还原为 (0,0,0)"""
+    rgb = np.maximum(np.asarray(rgb, dtype=np.int64).reshape(-1), 0)
+    return np.stack([(rgb >> 16) & 0xFF, (rgb >> 8) & 0xFF, rgb & 0xFF], axis=1).astype(np.uint8)
+
+
+class BoxColumn:
+    """
+    同类框状图元 (rect / circle) 的列式数组:
+      position (N,4) float64  [x, y, width, height]
+      rgb      (N,)  int32    0xRRGGBB, 无效颜色为 -1 (解析时只打包一次, 各抽取模块直接使用)
+    """
+
+    __slots__ = ("position", "rgb")
+
+    def __init__(self, position: np.ndarray, rgb: np.ndarray):
+        self.position = position
+        self.rgb = rgb
+
+    def __len__(self) -> int:
+        return len(self.position)
+
+    @property
+    def valid(self) -> np.ndarray:
+        return self.rgb != invalid_rgb
+
+    @property
+    def nbytes(self) -> int:
+        return self.position.nbytes + self.rgb.nbytes
+
+
+class RectColumn(BoxColumn):
+    __slots__ = ()
+
+
+class CircleColumn(BoxColumn):
+    __slots__ = ()
+
+
+class TextColumn:
+    """
+    文本图元的列式数组:
+      position (N,4) float64  [x, y, width, height]
+      content  规范化后的文本内容列表
+    """
+
+    __slots__ = ("position", "content")
+
+    def __init__(self, position: np.ndarray, content: list):
+        self.position = position
+        self.content = content
+
+    def __len__(self) -> int:
+        return len(self.position)
+
+    @property
+    def nbytes(self) -> int:
+        return self.position.nbytes + sum(len(c.encode("utf-8")) for c in self.content)
+
+
+class PolylineColumn:
+    """
+    折线图元的列式数组:
+      points  (M,2)   int32  全部顶点的扁平缓冲区
+      offsets (K+1,)  int64  第 i 条折线的顶点为 points[offsets[i]:offsets[i+1]]
+      rgb     (K,)    int32  0xRRGGBB, 无效颜色为 -1
+    """
+
+    __slots__ = ("points", "offsets", "rgb")
+
+    def __init__(self, points: np.ndarray, offsets: np.ndarray, rgb: np.ndarray):
+        self.points = points
+        self.offsets = offsets
+        self.rgb = rgb
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def polyline(self, i: int) -> np.ndarray:
+        return self.points[self.offsets[i]:self.offsets[i + 1]]
+
+    @property
+    def valid(self) -> np.ndarray:
+        return self.rgb != invalid_rgb
+
+    @property
+    def nbytes(self) -> int:
+        return self.points.nbytes + self.offsets.nbytes + self.rgb.nbytes
+
+
+class AreaColumn(PolylineColumn):
+    """区域 (饼图扇区等), 存储方式与折线相同"""
+    __slots__ = ()
+
+
+class SimVecChart:
+    """
+    一张图表的全部图元, 每种类型一列: chart.rect, chart.text, chart.circle, chart.line, chart.area
+    tokenizer、二进制存储与各抽取模块共用这一结构; 遍历类型时可用 chart[kind]
+    """
+
+    __slots__ = simvec_types
+
+    def __init__(self, rect: RectColumn, text: TextColumn, circle: CircleColumn, line: PolylineColumn, area: AreaColumn):
+        self.rect = rect
+        self.text = text
+        self.circle = circle
+        self.line = line
+        self.area = area
+
+    def __getitem__(self, kind: str):
+        if kind not in simvec_types:
+            raise KeyError(kind)
+        return getattr(self, kind)
+
+    @property
+    def nbytes(self) -> int:
+        """全部列占用的字节数 (文本按 UTF-8 长度计)"""
+        return sum(self[kind].nbytes for kind in simvec_types)
@@ -0,0 +1,130 @@
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from simvec_model import SimVecChart, TextColumn, box_types, polyline_types
+from simvec_tokenizer import column_classes, json_to_columns, tokenize_simvec_file
+
+# 二进制文件的扩展名与格式标识
+binary_extension = ".simvec"
+magic = b"SIMVEC2\0"
+
+# 每个数组在文件中的起始位置按 8 字节对齐, 便于直接内存映射为任意数值类型
+alignment = 8
+
+
+def _align(offset: int) -> int:
+    """向上取整到 alignment 的整数倍"""
+    return -(-offset // alignment) * alignment
+
+
+def _flatten_columns(columns: SimVecChart) -> dict:
+    """将列式数组展开为 "类型/列名" -> ndarray 的映射, 文本内容编码为 UTF-8 缓冲区加偏移"""
+    arrays = {}
+    for kind in box_types:
+        column = columns[kind]
+        arrays[f"{kind}/position"] = np.ascontiguousarray(column.position, dtype=np.float64)
+        if kind == "text":
+            encoded = [content.encode("utf-8") for content in column.content]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(e) for e in encoded], out=offsets[1:])
+            arrays["text/content_bytes"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+            arrays["text/content_offsets"] = offsets
+        else:
+            arrays[f"{kind}/rgb"] = np.ascontiguousarray(column.rgb, dtype=np.int32)
+    for kind in polyline_types:
+        column = columns[kind]
+        arrays[f"{kind}/points"] = np.ascontiguousarray(column.points, dtype=np.int32)
+        arrays[f"{kind}/offsets"] = np.ascontiguousarray(column.offsets, dtype=np.int64)
+        arrays[f"{kind}/rgb"] = np.ascontiguousarray(column.rgb, dtype=np.int32)
+    return arrays
+
+
+def save_simvec_binary(path: str, columns: SimVecChart):
+    """
+    将列式数组写为紧凑的二进制文件:
+      8 字节标识 | 4 字节头部长度 (小端) | JSON 头部 | 按 alignment (8 字节) 对齐的各数组原始数据
+    头部记录每个数组的 dtype, shape 以及相对数据区起点的偏移
+    """
+    arrays = _flatten_columns(columns)
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+    header = json.dumps({"arrays": layout}, separators=(',', ':')).encode("utf-8")
+    data_start = _align(len(magic) + 4 + len(header))
+
+    with open(path, "wb") as f_out:
+        f_out.write(magic)
+        f_out.write(struct.pack("<I", len(header)))
+        f_out.write(header)
+        for name, array in arrays.items():
+            f_out.write(b"\0" * (data_start + layout[name]["offset"] - f_out.tell()))
+            f_out.write(array.tobytes())
+
+
+def load_simvec_binary(path: str) -> SimVecChart:
+    """内存映射读取二进制 SimVec 文件, 返回只读的列式数组视图 (数值列不发生拷贝)"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError(f"空的 SimVec 二进制文件: {path}")
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if buffer[:len(magic)] != magic:
+        raise ValueError(f"不是 SimVec 二进制文件: {path}")
+    (header_length,) = struct.unpack_from("<I", buffer, len(magic))
+    header_start = len(magic) + 4
+    header = json.loads(bytes(buffer[header_start:header_start + header_length]).decode("utf-8"))
+    data_start = _align(header_start + header_length)
+
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        count = int(np.prod(shape))
+        if count == 0:
+            arrays[name] = np.empty(shape, dtype=dtype)
+        else:
+            arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + entry["offset"]).reshape(shape)
+
+    columns = {}
+    for kind in box_types:
+        if kind == "text":
+            content_bytes = arrays["text/content_bytes"]
+            offsets = arrays["text/content_offsets"].tolist()
+            columns[kind] = TextColumn(arrays["text/position"], [
+                content_bytes[offsets[i]:offsets[i + 1]].tobytes().decode("utf-8") for i in range(len(offsets) - 1)
+            ])
+        else:
+            columns[kind] = column_classes[kind](arrays[f"{kind}/position"], arrays[f"{kind}/rgb"])
+    for kind in polyline_types:
+        columns[kind] = column_classes[kind](*(arrays[f"{kind}/{name}"] for name in ("points", "offsets", "rgb")))
+    return SimVecChart(**columns)
+
+
+def load_cleaned_simvec(base_path: str) -> SimVecChart:
+    """
+    读取 cleaned_simvec_data 中的一张图表 (base_path 不含扩展名):
+    优先内存映射二进制文件, 不存在时回退到 JSON 文件
+    """
+    binary_path = base_path + binary_extension
+    if os.path.exists(binary_path):
+        return load_simvec_binary(binary_path)
+    with open(base_path + ".json", "r", encoding="utf-8") as f:
+        return json_to_columns(json.load(f))
+
+
+def load_simvec(path: str) -> SimVecChart:
+    """
+    读取一张图表的 SimVec, data_formatter 与各抽取模块共用:
+      raw_simvec .txt 文件直接解析, 其他路径视为 cleaned_simvec_data 中不含扩展名的图表
+    """
+    if path.endswith(".txt"):
+        return tokenize_simvec_file(path)
+    return load_cleaned_simvec(path)
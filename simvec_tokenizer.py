@@ -0,0 +1,175 @@
+import numpy as np
+
+from simvec_model import (
+    AreaColumn, CircleColumn, PolylineColumn, RectColumn, SimVecChart, TextColumn,
+    box_types, invalid_rgb, polyline_types, simvec_types,
+)
+
+# 每种图元类型对应的列
+column_classes = {"rect": RectColumn, "circle": CircleColumn, "line": PolylineColumn, "area": AreaColumn}
+
+
+# 规范化文本内容的函数
+def normalize_text_content(text: str) -> str:
+    """规范化文本内容"""
+    return text.replace(' ', '_').replace('\u2212', '-').replace(',', '')
+
+
+def parse_color_string(color: str):
+    """将 "(R,G,B)" 字符串解析为整数元组, 无法解析时返回 None (不使用 eval)"""
+    parts = color.strip().strip('()').split(',')
+    if len(parts) != 3:
+        return None
+    try:
+        return tuple(int(float(p)) for p in parts)
+    except ValueError:
+        return None
+
+
+def _rgb_column(color_strings: list) -> np.ndarray:
+    """批量解析颜色, 返回 0xRRGGBB 打包的 int32 数组 (无法解析时为 -1); 相同颜色只解析一次"""
+    memo = {}
+    rgb = np.empty(len(color_strings), dtype=np.int32)
+    for i, color in enumerate(color_strings):
+        packed = memo.get(color)
+        if packed is None:
+            parsed = parse_color_string(color)
+            r, g, b = (c & 0xFF for c in parsed or (0, 0, 0))
+            packed = memo[color] = invalid_rgb if parsed is None else (r << 16) | (g << 8) | b
+        rgb[i] = packed
+    return rgb
+
+
+def _parse_numbers(flat: str, expected: int, what: str) -> np.ndarray:
+    """
+    解析逗号分隔的数字, 返回 float64 数组
+    数字格式错误或个数与 expected 不符时抛出 ValueError, 不会返回错位的数据
+    """
+    try:
+        values = np.array(flat.split(','), dtype=np.float64)
+    except ValueError as e:
+        raise ValueError(f"无法解析 SimVec {what}: {e}") from None
+    if values.size != expected:
+        raise ValueError(f"无法解析 SimVec {what}: 应有 {expected} 个数字, 实际为 {values.size} 个")
+    return values
+
+
+def _position_column(position_strings: list) -> np.ndarray:
+    """一次性解析全部 "[x,y,w,h]" 字符串, 返回 float64 (N,4) 数组"""
+    if not position_strings:
+        return np.zeros((0, 4), dtype=np.float64)
+    flat = ','.join(s.strip()[1:-1] for s in position_strings)
+    return _parse_numbers(flat, 4 * len(position_strings), "坐标").reshape(-1, 4)
+
+
+def _point_columns(point_strings: list) -> tuple:
+    """一次性解析全部点序列, 返回 int32 (M,2) 扁平点缓冲区与 (K+1,) 偏移数组"""
+    counts = np.fromiter((s.count(';') + 1 for s in point_strings), dtype=np.int64, count=len(point_strings))
+    offsets = np.zeros(len(point_strings) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    if not point_strings:
+        return np.zeros((0, 2), dtype=np.int32), offsets
+    flat = ','.join(point_strings).replace(';', ',')
+    points = _parse_numbers(flat, 2 * int(offsets[-1]), "点序列").astype(np.int32).reshape(-1, 2)
+    return points, offsets
+
+
+def tokenize_simvec(text: str) -> SimVecChart:
+    """一次性解析整个 SimVec 文本, 返回按图元类型组织的列式数组 (见 simvec_model)"""
+    colors = {kind: [] for kind in simvec_types if kind != "text"}
+    payloads = {kind: [] for kind in simvec_types}
+    contents = []
+
+    for line in text.splitlines():
+        line = line.strip()
+        kind, _, rest = line.partition(' ')
+        if kind not in payloads or not rest:
+            continue
+        head, _, payload = rest.partition(' ')
+        if kind == "text":
+            contents.append(normalize_text_content(head))
+        elif kind == "rect" and head == "None":
+            # 无填充色的矩形不参与后续计算
+            continue
+        else:
+            colors[kind].append(head)
+        payloads[kind].append(payload)
+
+    columns = {"text": TextColumn(_position_column(payloads["text"]), contents)}
+    for kind in ("rect", "circle"):
+        columns[kind] = column_classes[kind](_position_column(payloads[kind]), _rgb_column(colors[kind]))
+    for kind in polyline_types:
+        points, offsets = _point_columns(payloads[kind])
+        columns[kind] = column_classes[kind](points, offsets, _rgb_column(colors[kind]))
+    return SimVecChart(**columns)
+
+
+def tokenize_simvec_file(path: str) -> SimVecChart:
+    """读取并解析一个 raw_simvec .txt 文件"""
+    with open(path, "r", encoding="utf-8") as f:
+        return tokenize_simvec(f.read())
+
+
+def color_to_string(rgb: int) -> str:
+    """将打包颜色转换回 SimVec 的 "(R,G,B)" 字符串"""
+    if rgb == invalid_rgb:
+        return "None"
+    return "(%d,%d,%d)" % ((rgb >> 16) & 0xFF, (rgb >> 8) & 0xFF, rgb & 0xFF)
+
+
+def _position_values(row, float_columns: tuple) -> list:
+    """还原 json.loads 的结果: 整数坐标保持为 int, 文本中心坐标保持为 float"""
+    values = []
+    for i, value in enumerate(row.tolist()):
+        if i not in float_columns and value.is_integer():
+            value = int(value)
+        values.append(value)
+    return values
+
+
+def columns_to_json(columns: SimVecChart) -> dict:
+    """由列式数组生成 cleaned_simvec_data 的 JSON 结构"""
+    data = {kind: [] for kind in simvec_types}
+
+    for kind in ("rect", "circle"):
+        column = columns[kind]
+        for position, rgb in zip(column.position, column.rgb.tolist()):
+            data[kind].append({
+                "color": color_to_string(rgb),
+                "position": _position_values(position, ())
+            })
+
+    for content, position in zip(columns.text.content, columns.text.position):
+        data["text"].append({
+            "content": content,
+            "position": _position_values(position, (0, 1))
+        })
+
+    for kind in polyline_types:
+        column = columns[kind]
+        for i, rgb in enumerate(column.rgb.tolist()):
+            data[kind].append({
+                "color": color_to_string(rgb),
+                "points": column.polyline(i).tolist()
+            })
+    return data
+
+
+def json_to_columns(data: dict) -> SimVecChart:
+    """将 cleaned_simvec_data 的 JSON 结构转换回列式数组 (columns_to_json 的逆过程)"""
+    columns = {}
+    for kind in box_types:
+        items = data.get(kind, [])
+        position = np.array([item["position"] for item in items], dtype=np.float64).reshape(-1, 4)
+        if kind == "text":
+            columns[kind] = TextColumn(position, [item["content"] for item in items])
+        else:
+            columns[kind] = column_classes[kind](position, _rgb_column([item["color"] for item in items]))
+    for kind in polyline_types:
+        items = data.get(kind, [])
+        counts = [len(item["points"]) for item in items]
+        offsets = np.zeros(len(items) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        points = np.array([p for item in items for p in item["points"]], dtype=np.int32).reshape(-1, 2)
+        columns[kind] = column_classes[kind](points, offsets, _rgb_column([item["color"] for item in items]))
+    return SimVecChart(**columns)
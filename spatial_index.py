@@ -0,0 +1,244 @@
+import numpy as np
+
+from simvec_model import SimVecChart, invalid_rgb, simvec_types, unpack_rgb
+from text_index import TextIndex
+
+# 网格单元边长的下限 (像素); 默认按图表范围与图元数量取单元大小, 平均每个单元约一个图元
+min_cell_size = 8
+
+# 图例色块: 边长在 swatch_min_size 与 max(swatch_max_size, 2 倍文本高度) 之间, 与图例文本的水平间距不超过 legend_gap 像素
+# (色块通常在文本左侧; 右对齐的图例文本, 例如 d3 的 text-anchor: end, 色块在文本右侧)
+# metadata_inference 推断图例时使用相同的尺寸条件
+swatch_min_size = 4
+swatch_max_size = 14
+legend_gap = 25
+
+# 颜色各分量之差不超过该值时视为灰色 / 黑色 (坐标轴、刻度线与网格线通常如此)
+gray_spread = 16
+
+# 坐标轴 / 刻度线 / 网格线: 顶点数不超过 axis_max_points 且全部为水平或垂直线段的灰色折线,
+# 或宽 / 高不超过 thin_rect_size、长度至少为图表宽 / 高 grid_span 倍的灰色细矩形 (较短的黑色细矩形可能是数据)
+# metadata_inference 与 simvec_compressor 由 classify_primitives 的 axis 角色排除这些图元
+axis_max_points = 4
+thin_rect_size = 3
+grid_span = 0.5
+
+# 图元的角色; 抽取模块只处理 mark
+roles = ("mark", "legend", "axis", "outside")
+mark, legend, axis, outside = range(len(roles))
+
+# 需要分类的图元类型 (文本由 TextIndex 处理)
+classified_types = ("rect", "circle", "line", "area")
+
+
+def bounding_boxes(chart: SimVecChart) -> dict:
+    """
+    每种图元的包围盒 (N,4) float64 [x0, y0, x1, y1]:
+      矩形的 x 为中点、y 为顶边; 圆的 x, y 为圆心; 文本的 x 为右边缘、y 为垂直中点; 折线与区域取顶点范围
+    """
+    boxes = {}
+    x, y, w, h = chart.rect.position.T
+    boxes["rect"] = np.stack([x - w / 2, y, x + w / 2, y + h], axis=1)
+    x, y, w, h = chart.circle.position.T
+    boxes["circle"] = np.stack([x - w / 2, y - h / 2, x + w / 2, y + h / 2], axis=1)
+    x, y, w, h = chart.text.position.T
+    boxes["text"] = np.stack([x - w, y - h / 2, x, y + h / 2], axis=1)
+    for kind in ("line", "area"):
+        column = chart[kind]
+        box = np.zeros((len(column), 4), dtype=np.float64)
+        counts = np.diff(column.offsets)
+        starts = column.offsets[:-1][counts > 0]
+        if len(starts):
+            points = column.points.astype(np.float64)
+            box[counts > 0, :2] = np.minimum.reduceat(points, starts, axis=0)
+            box[counts > 0, 2:] = np.maximum.reduceat(points, starts, axis=0)
+        boxes[kind] = box
+    return boxes
+
+
+class SpatialIndex:
+    """
+    每张图表构建一次的均匀网格索引, 覆盖全部图元的包围盒
+    只占一个单元的图元按单元编号排序后二分查找; 跨多个单元的图元 (坐标轴、长折线等) 数量很少, 逐个检查
+    """
+
+    def __init__(self, chart: SimVecChart, cell_size: float = None):
+        self.boxes = bounding_boxes(chart)
+        boxes = np.concatenate([self.boxes[kind] for kind in simvec_types]).reshape(-1, 4)
+        self._kinds = np.repeat(np.arange(len(simvec_types)), [len(self.boxes[kind]) for kind in simvec_types])
+        self._rows = np.concatenate([np.arange(len(self.boxes[kind])) for kind in simvec_types]).astype(np.int64)
+        self._all = boxes
+
+        self.origin = boxes[:, :2].min(axis=0) if len(boxes) else np.zeros(2)
+        self.extent = extent = boxes[:, 2:].max(axis=0) - self.origin if len(boxes) else np.ones(2)
+        if cell_size is None:
+            cell_size = np.sqrt(max(float(extent[0] * extent[1]), 1.0) / max(len(boxes), 1))
+        self.cell_size = max(float(cell_size), min_cell_size)
+        self.columns = int(extent[0] // self.cell_size) + 1
+
+        cells = self._cells(boxes)
+        single = (cells[:, 0] == cells[:, 2]) & (cells[:, 1] == cells[:, 3])
+        keys = cells[single, 1] * self.columns + cells[single, 0]
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._single = np.flatnonzero(single)[order]
+        self._large = np.flatnonzero(~single)
+
+    def _cells(self, boxes: np.ndarray) -> np.ndarray:
+        """包围盒覆盖的单元范围 [cx0, cy0, cx1, cy1]"""
+        cells = np.floor((boxes - np.tile(self.origin, 2)) / self.cell_size).astype(np.int64)
+        cells[:, [0, 2]] = np.clip(cells[:, [0, 2]], 0, self.columns - 1)
+        return np.maximum(cells, 0)
+
+    def query(self, box: tuple, kinds: tuple = simvec_types) -> dict:
+        """返回包围盒与 box [x0, y0, x1, y1] 相交的图元, {类型: 行号数组}"""
+        cx0, cy0, cx1, cy1 = self._cells(np.array([box], dtype=np.float64))[0].tolist()
+        candidates = [self._large]
+        for cy in range(cy0, cy1 + 1):
+            # 同一行中相邻单元的编号连续, 一次二分查找取出整段
+            low = np.searchsorted(self._keys, cy * self.columns + cx0, side="left")
+            high = np.searchsorted(self._keys, cy * self.columns + cx1, side="right")
+            candidates.append(self._single[low:high])
+        candidates = np.concatenate(candidates)
+        found = self._all[candidates]
+        hit = (found[:, 0] <= box[2]) & (found[:, 2] >= box[0]) & (found[:, 1] <= box[3]) & (found[:, 3] >= box[1])
+        candidates = candidates[hit]
+        return {
+            kind: np.sort(self._rows[candidates[self._kinds[candidates] == simvec_types.index(kind)]])
+            for kind in kinds
+        }
+
+
+class ChartLayout:
+    """
+    classify_primitives 的结果: 每个图元的角色 (roles 中的下标) 与由刻度确定的绘图区
+    plot_area 为 (left, right, bottom): Y 轴在左侧时 left 为其刻度文本的右边缘, 在右侧时 right 为其刻度文本的左边缘,
+    bottom 为 X 轴刻度文本的顶边; 没有边界的一侧为 None
+    """
+
+    __slots__ = ("roles", "plot_area")
+
+    def __init__(self, roles: dict, plot_area: tuple):
+        self.roles = roles
+        self.plot_area = plot_area
+
+    def marks(self, kind: str) -> np.ndarray:
+        """真正的数据图元的行号"""
+        return np.flatnonzero(self.roles[kind] == mark)
+
+    def pruned(self) -> dict:
+        """各角色被排除的图元数量 (不含 mark)"""
+        counts = {}
+        for kind_roles in self.roles.values():
+            for role in range(1, len(roles)):
+                counts[roles[role]] = counts.get(roles[role], 0) + int(np.count_nonzero(kind_roles == role))
+        return counts
+
+
+def is_gray(rgb: np.ndarray) -> np.ndarray:
+    """灰色 / 黑色 (各分量之差不超过 gray_spread) 或没有颜色的图元"""
+    colors = unpack_rgb(rgb).astype(np.int64)
+    return (rgb == invalid_rgb) | (colors.max(axis=1) - colors.min(axis=1) <= gray_spread)
+
+
+def _plot_area(metadata: dict, text_index: TextIndex, index: SpatialIndex) -> tuple:
+    """由刻度文本确定绘图区的左 / 右边界与下边界; 刻度文本位于图表右半边时 Y 轴在右侧"""
+    left = right = bottom = None
+    for axis_name, axis_key in (("x", "xAxis"), ("y", "yAxis")):
+        ticks = (metadata.get(axis_key) or {}).get("ticks") or []
+        rows = list(text_index.tick_rows(ticks, axis_name).values())
+        if len(rows) < 2:
+            continue
+        position = text_index.positions[rows]
+        if axis_name == "x":
+            bottom = float((position[:, 1] - position[:, 3] / 2).min())
+        elif (position[:, 0] - position[:, 2] / 2).mean() > index.origin[0] + index.extent[0] / 2:
+            right = float((position[:, 0] - position[:, 2]).min())
+        else:
+            left = float(position[:, 0].max())
+    return left, right, bottom
+
+
+def _axis_lines(column, boxes: np.ndarray) -> np.ndarray:
+    """灰色、顶点不多且只有水平 / 垂直线段的折线 (坐标轴、带刻度的坐标轴折角、刻度线与网格线)"""
+    counts = np.diff(column.offsets)
+    result = is_gray(column.rgb) & (counts >= 2) & (counts <= axis_max_points)
+    for i in np.flatnonzero(result).tolist():
+        steps = np.diff(column.polyline(i), axis=0)
+        result[i] = bool(np.all((steps[:, 0] == 0) | (steps[:, 1] == 0)))
+    return result
+
+
+def swatch_shaped(boxes: np.ndarray, kind: str, size: float = swatch_max_size) -> np.ndarray:
+    """
+    尺寸上可能是图例色块的图元 (包围盒 [x0, y0, x1, y1]):
+      矩形 / 圆的宽高在 [swatch_min_size, size] 以内; 折线 (图例中的线段样例) 宽在 [swatch_min_size, 3 * size] 以内、高不超过 size
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    w, h = boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]
+    if kind == "line":
+        return (w >= swatch_min_size) & (w <= 3 * size) & (h <= size)
+    return (np.minimum(w, h) >= swatch_min_size) & (np.maximum(w, h) <= size)
+
+
+def _legend_swatches(metadata: dict, text_index: TextIndex, index: SpatialIndex) -> dict:
+    """图例色块: 每个图例文本左侧 (左侧没有时取右侧) 最近的小矩形 / 圆 / 短折线, 返回 {类型: 行号集合}"""
+    swatches = {kind: set() for kind in classified_types}
+    legend_metadata = metadata.get("legend")
+    items = legend_metadata.get("items") if isinstance(legend_metadata, dict) else None
+    for item in dict.fromkeys(items or []):
+        for row in text_index.rows(item):
+            tx, ty, tw, th = text_index.positions[row].tolist()
+            size = max(swatch_max_size, 2 * th)
+            text_left = tx - tw
+            found = index.query((text_left - legend_gap - size, ty - th, tx + legend_gap + size, ty + th), ("rect", "circle", "line"))
+            best = None
+            for kind, rows in found.items():
+                for candidate in rows.tolist():
+                    box = index.boxes[kind][candidate]
+                    x0, y0, x1, y1 = box.tolist()
+                    if not swatch_shaped(box, kind, size)[0] or abs((y0 + y1) / 2 - ty) > max(th, y1 - y0) / 2 + 1:
+                        continue
+                    for side, gap in enumerate((text_left - x1, x0 - tx)):
+                        if -2 <= gap <= legend_gap and (best is None or (side, gap) < best[:2]):
+                            best = (side, gap, kind, candidate)
+            if best is not None:
+                swatches[best[2]].add(best[3])
+    return swatches
+
+
+def classify_primitives(chart: SimVecChart, metadata: dict, text_index: TextIndex = None,
+                        index: SpatialIndex = None) -> ChartLayout:
+    """
+    一次遍历确定每个图元的角色:
+      legend:  图例文本旁的色块
+      axis:    灰色的坐标轴、刻度线与网格线
+      outside: 中心位于绘图区之外 (Y 轴刻度外侧或 X 轴刻度下方) 的图元
+      mark:    其余图元, 即需要抽取的数据
+    """
+    text_index = text_index or TextIndex(chart.text)
+    index = index or SpatialIndex(chart)
+    left, right, bottom = _plot_area(metadata, text_index, index)
+    swatches = _legend_swatches(metadata, text_index, index)
+
+    layout = {}
+    for kind in classified_types:
+        boxes = index.boxes[kind]
+        kind_roles = np.full(len(boxes), mark, dtype=np.int8)
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+        if left is not None:
+            kind_roles[centers[:, 0] < left] = outside
+        if right is not None:
+            kind_roles[centers[:, 0] > right] = outside
+        if bottom is not None:
+            kind_roles[centers[:, 1] > bottom] = outside
+        if kind == "line":
+            kind_roles[_axis_lines(chart.line, boxes)] = axis
+        elif kind == "rect":
+            sizes = boxes[:, 2:] - boxes[:, :2]
+            thin = sizes.min(axis=1) <= thin_rect_size
+            long = np.any(sizes >= grid_span * index.extent, axis=1)
+            kind_roles[is_gray(chart.rect.rgb) & thin & long] = axis
+        kind_roles[sorted(swatches.get(kind, ()))] = legend
+        layout[kind] = kind_roles
+    return ChartLayout(layout, (left, right, bottom))
@@ -0,0 +1,127 @@
+import json
+import os
+
+import numpy as np
+
+import instrumentation
+from color_palette import palette_for
+from simvec_model import SimVecChart
+from simvec_storage import load_simvec
+from spatial_index import classify_primitives
+from text_index import TextIndex
+
+# 图表类型与目录路径
+chart_type = 'stackbar'
+meta_data_dir = 'intermediate_data/cleaned_meta_data/stackbar'
+simvec_data_dir = 'intermediate_data/cleaned_simvec_data/stackbar'
+output_dir = 'intermediate_data/extracted_data/stackbar'
+
+
+def group_columns(x_centers: np.ndarray, widths: np.ndarray) -> list:
+    """
+    按 X 中点排序一次, 线性扫描把矩形分组为堆叠柱:
+    中点与当前柱的中点相差不超过半个柱宽的矩形属于同一根柱子
+    返回每根柱子的矩形下标列表 (按 X 从左到右)
+    """
+    order = np.argsort(x_centers, kind='stable').tolist()
+    columns = []
+    column_x = None
+    for i in order:
+        if column_x is None or abs(x_centers[i] - column_x) > max(widths[i] / 2, 1):
+            columns.append([])
+            column_x = x_centers[i]
+        columns[-1].append(i)
+    return columns
+
+
+def extract_stackbar_data(metadata: dict, simvec_data: SimVecChart) -> list:
+    """根据清洗后的 metadata 与 simvec 列式数据计算堆叠柱状图数据"""
+    # 1. 每张图表构建一次文本索引, 拟合 Y 轴比例
+    text_index = TextIndex(simvec_data.text)
+    y_axis = text_index.fit_axis(metadata['yAxis']['ticks'], 'y')
+
+    # 2. 由图例 (legend) 构建一次调色板, 与柱状图使用相同的颜色匹配规则
+    palette = palette_for(metadata)
+    if palette.color_to_category is None:
+        print("没有找到 legend 数据，默认直接根据 RGB 颜色进行分类。")
+
+    # 由空间索引排除图例色块与坐标轴 / 网格线, 只处理数据矩形
+    marks = classify_primitives(simvec_data, metadata, text_index).marks('rect')
+    rect_positions = np.asarray(simvec_data.rect.position[marks], dtype=np.float64).reshape(-1, 4)
+    categories = palette.classify(simvec_data.rect.rgb[marks])
+
+    # 3. 按 X 中点分组为堆叠柱, 每根柱子归到最近的 X 轴刻度 (SimVec 中矩形的 x 已是中点坐标;
+    #    刻度文本居中或右对齐, 取与柱子对齐的一种)
+    columns = group_columns(rect_positions[:, 0], rect_positions[:, 2])
+    column_centers = np.array([np.mean(rect_positions[rows, 0]) for rows in columns], dtype=np.float64)
+    x_axis = text_index.category_axis(metadata['xAxis']['ticks'], column_centers)
+    x_labels, x_distances = x_axis.assign(column_centers)
+    ambiguous = np.flatnonzero(x_axis.ambiguous(x_distances)).tolist()
+    if ambiguous:
+        print(f"⚠️ {len(ambiguous)} 根堆叠柱距离最近的 X 轴刻度较远, 分类可能不准确: {ambiguous}")
+
+    # 4. 每一段的数值由自身高度计算 (而不是顶部边缘), 同一根柱子内自下而上输出
+    segment_values = np.abs(y_axis.slope) * rect_positions[:, 3]
+    stackbar_data = []
+    for rows, closest_x in zip(columns, x_labels):
+        rows = sorted(rows, key=lambda row: -(rect_positions[row, 1] + rect_positions[row, 3]))
+        for row in rows:
+            stackbar_data.append({
+                "x": closest_x,
+                "y": round(float(segment_values[row]), 1),
+                "category": categories[row],
+            })
+
+    return stackbar_data
+
+
+def process_file(file_name: str):
+    """处理单个图表: 读取 metadata 与 simvec, 计算堆叠柱状图数据并写出结果"""
+    file_base_name = os.path.splitext(file_name)[0]
+
+    # 读取 metadata JSON 文件
+    meta_file_path = os.path.join(meta_data_dir, file_name)
+
+    print(f"\n正在处理文件: {file_name}")
+
+    with instrumentation.stage(chart_type, file_base_name, 'load'):
+        with open(meta_file_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+
+        # 读取 simvec 数据 (优先内存映射二进制格式, 数值列不发生拷贝)
+        simvec_data = load_simvec(os.path.join(simvec_data_dir, file_base_name))
+    instrumentation.record_primitives(chart_type, file_base_name, simvec_data)
+    process_data(file_name, metadata, simvec_data)
+
+
+def process_data(file_name: str, metadata: dict, simvec_data: SimVecChart):
+    """由已在内存中的 metadata 与 simvec 计算堆叠柱状图数据并写出结果 (pipeline 的内存模式直接调用)"""
+    # 确保输出目录存在
+    os.makedirs(output_dir, exist_ok=True)
+
+    file_base_name = os.path.splitext(file_name)[0]
+    output_file_path = os.path.join(output_dir, f"{file_base_name}.txt")
+
+    with instrumentation.stage(chart_type, file_base_name, 'extract'):
+        stackbar_data = extract_stackbar_data(metadata, simvec_data)
+    instrumentation.record_categories(chart_type, file_base_name, [segment["category"] for segment in stackbar_data])
+
+    # 输出计算结果到文件
+    with instrumentation.stage(chart_type, file_base_name, 'write'):
+        with open(output_file_path, 'w', encoding='utf-8') as output_file:
+            output_file.write(f"计算出的堆叠柱状图数据 ({file_name}):\n")
+            for segment in stackbar_data:
+                output_file.write(json.dumps(segment, ensure_ascii=False) + ",\n")
+
+    print(f"已保存到: {output_file_path}")
+
+
+if __name__ == "__main__":
+    # 遍历元数据文件夹中的每一个 JSON 文件
+    try:
+        for file_name in os.listdir(meta_data_dir):
+            if file_name.endswith('.json'):
+                process_file(file_name)
+    finally:
+        # 写出结构化日志与 Prometheus 快照
+        instrumentation.flush("stackbar_data_extractor")
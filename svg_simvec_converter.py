@@ -0,0 +1,503 @@
+import math
+import os
+import re
+import struct
+import xml.etree.ElementTree as ET
+
+from simvec_tokenizer import normalize_text_content
+
+# 目录路径 (与 parse_svg_x.js 保持一致)
+input_svg_directory = "input_data"
+output_simvec_directory = "intermediate_data/raw_simvec_data"
+
+# 支持的图表类型 (文件夹名称)
+chart_types = ["bar", "scatter", "pie", "line", "stackbar"]
+
+# 坐标归一化的粒度 (与 parse_svg_x.js 中的 granularity 相同)
+granularity = 500
+
+# 输出排序时的类型顺序 (与 parse_svg_x.js 中的 type_list 相同)
+type_order = ['rect', 'circle', 'path', 'line', 'text', 'area']
+
+# puppeteer 默认视口大小
+viewport_size = (800.0, 600.0)
+
+# 浏览器中 SVG 的默认字号以及文本包围盒的估算系数
+default_font_size = 16.0
+text_char_width = 0.556  # 表中没有的半角字符的宽度 (相对字号)
+
+# 字体度量: (相对 Helvetica 字宽的比例, 基线以上的高度, 基线以下的高度, 高度是否取整到像素), 高度均相对字号
+# font-family 中列出 Arial / Helvetica 时使用与之等宽的字体, 浏览器把它的上下高度分别取整;
+# 其余 (包括 sans-serif) 使用浏览器默认的无衬线字体, 它比 Helvetica 略宽、行高更大
+# 两组数值均按 input_data 与 raw_simvec_data 中的文本包围盒校准
+font_metrics = {
+    "arial": (1.0, 0.905, 0.212, True),
+    "default": (1.04, 1.06, 0.26, False),
+}
+
+
+def _width_table(groups: dict) -> dict:
+    """{千分之一字号的宽度: 字符} → {字符: 相对字号的宽度}"""
+    return {ch: width / 1000 for width, chars in groups.items() for ch in chars}
+
+
+# 常见字符的宽度 (Helvetica 的字宽, 单位为千分之一字号), 常规与粗体各一份, 用于估算文本包围盒的宽度
+char_width_table = _width_table({
+    191: "'", 222: "ijl", 260: "|", 278: " !,./:;[\\]ft", 333: "()-`r", 334: "{}", 355: '"', 389: "*", 469: "^",
+    500: "Jckszvxy", 556: "0123456789#$?_abdeghnopqu", 584: "+<=>~\u2212", 611: "FTZ", 667: "&ABEKPSVXY",
+    722: "CDHNRUw", 778: "GOQ", 833: "Mm", 889: "%", 944: "W", 1015: "@",
+})
+bold_char_width_table = _width_table({
+    238: "'", 278: " ,./[\\]Iijl", 280: "|", 333: "!:;()-`ft", 389: "*r", 474: '"', 500: "z", 584: "^+<=>~\u2212",
+    556: "0123456789#$Jacesvxy_", 611: "?FLTZbdghnopqu", 667: "EPSVXY", 722: "&ABCDHKNRU", 778: "GOQw", 833: "M",
+    889: "%m", 944: "W", 975: "@",
+})
+bold_font_weights = {"bold", "bolder", "600", "700", "800", "900"}
+
+# 不会被渲染的容器元素, 其内部的图元全部跳过
+non_rendered_tags = {"defs", "clippath", "mask", "pattern", "symbol", "marker", "lineargradient", "radialgradient", "title", "desc", "metadata", "style", "script"}
+
+# 其中的 rect / circle 仍会被 parse_svg_x.js 收集的容器 (区分大小写, 大小写不符的是未知元素, 内部不渲染)
+detached_containers = {"defs", "clipPath", "mask", "pattern", "symbol", "marker"}
+
+# 会沿 DOM 继承的样式属性
+inherited_properties = ("fill", "stroke", "color", "font-family", "font-size", "font-weight", "text-anchor")
+
+# 常用的 CSS 颜色名
+named_colors = {
+    "black": (0, 0, 0), "white": (255, 255, 255), "red": (255, 0, 0), "green": (0, 128, 0),
+    "blue": (0, 0, 255), "yellow": (255, 255, 0), "orange": (255, 165, 0), "purple": (128, 0, 128),
+    "gray": (128, 128, 128), "grey": (128, 128, 128), "silver": (192, 192, 192), "maroon": (128, 0, 0),
+    "navy": (0, 0, 128), "teal": (0, 128, 128), "olive": (128, 128, 0), "lime": (0, 255, 0),
+    "aqua": (0, 255, 255), "cyan": (0, 255, 255), "fuchsia": (255, 0, 255), "magenta": (255, 0, 255),
+    "steelblue": (70, 130, 180), "lightgray": (211, 211, 211), "lightgrey": (211, 211, 211),
+    "darkgray": (169, 169, 169), "darkgrey": (169, 169, 169), "dimgray": (105, 105, 105),
+    "lightblue": (173, 216, 230), "skyblue": (135, 206, 235), "tomato": (255, 99, 71),
+    "orangered": (255, 69, 0), "gold": (255, 215, 0), "brown": (165, 42, 42), "pink": (255, 192, 203),
+    "crimson": (220, 20, 60), "coral": (255, 127, 80), "salmon": (250, 128, 114),
+    "darkblue": (0, 0, 139), "darkgreen": (0, 100, 0), "darkred": (139, 0, 0),
+    "darkorange": (255, 140, 0), "indianred": (205, 92, 92), "seagreen": (46, 139, 87),
+    "slategray": (112, 128, 144), "whitesmoke": (245, 245, 245), "gainsboro": (220, 220, 220),
+}
+
+path_command_pattern = re.compile(r'[a-zA-Z][^a-zA-Z]*')
+number_pattern = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+transform_pattern = re.compile(r'(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)')
+
+identity_matrix = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+
+def parse_numbers(text: str) -> list:
+    """提取字符串中的全部数字"""
+    return [float(n) for n in number_pattern.findall(text)]
+
+
+def multiply_matrix(m1: tuple, m2: tuple) -> tuple:
+    """仿射矩阵相乘 m1 * m2, 矩阵以 (a, b, c, d, e, f) 表示"""
+    a1, b1, c1, d1, e1, f1 = m1
+    a2, b2, c2, d2, e2, f2 = m2
+    return (
+        a1 * a2 + c1 * b2,
+        b1 * a2 + d1 * b2,
+        a1 * c2 + c1 * d2,
+        b1 * c2 + d1 * d2,
+        a1 * e2 + c1 * f2 + e1,
+        b1 * e2 + d1 * f2 + f1,
+    )
+
+
+def parse_transform(transform: str) -> tuple:
+    """将 SVG transform 属性解析为仿射矩阵"""
+    matrix = identity_matrix
+    for name, args_str in transform_pattern.findall(transform):
+        args = parse_numbers(args_str)
+        if name == "matrix" and len(args) == 6:
+            step = tuple(args)
+        elif name == "translate" and args:
+            step = (1.0, 0.0, 0.0, 1.0, args[0], args[1] if len(args) > 1 else 0.0)
+        elif name == "scale" and args:
+            step = (args[0], 0.0, 0.0, args[1] if len(args) > 1 else args[0], 0.0, 0.0)
+        elif name == "rotate" and args:
+            rad = math.radians(args[0])
+            cos_a, sin_a = math.cos(rad), math.sin(rad)
+            step = (cos_a, sin_a, -sin_a, cos_a, 0.0, 0.0)
+            if len(args) == 3:
+                cx, cy = args[1], args[2]
+                step = multiply_matrix((1.0, 0.0, 0.0, 1.0, cx, cy), multiply_matrix(step, (1.0, 0.0, 0.0, 1.0, -cx, -cy)))
+        elif name == "skewX" and args:
+            step = (1.0, 0.0, math.tan(math.radians(args[0])), 1.0, 0.0, 0.0)
+        elif name == "skewY" and args:
+            step = (1.0, math.tan(math.radians(args[0])), 0.0, 1.0, 0.0, 0.0)
+        else:
+            continue
+        matrix = multiply_matrix(matrix, step)
+    return matrix
+
+
+def apply_matrix(matrix: tuple, x: float, y: float) -> tuple:
+    """对单个点应用仿射变换"""
+    a, b, c, d, e, f = matrix
+    return a * x + c * y + e, b * x + d * y + f
+
+
+def transformed_bbox(matrix: tuple, x: float, y: float, width: float, height: float) -> tuple:
+    """计算局部矩形经变换后的轴对齐包围盒 (x, y, width, height)"""
+    corners = [apply_matrix(matrix, px, py) for px, py in ((x, y), (x + width, y), (x, y + height), (x + width, y + height))]
+    xs = [p[0] for p in corners]
+    ys = [p[1] for p in corners]
+    return min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)
+
+
+def parse_style(element_attrib: dict) -> dict:
+    """合并元素的展示属性与 style 属性 (style 优先)"""
+    style = {}
+    for key in inherited_properties + ("display", "opacity"):
+        if key in element_attrib:
+            style[key] = element_attrib[key].strip()
+    for declaration in element_attrib.get("style", "").split(';'):
+        if ':' in declaration:
+            key, value = declaration.split(':', 1)
+            style[key.strip().lower()] = value.strip()
+    return style
+
+
+def parse_length(value: str, font_size: float) -> float:
+    """解析长度值, 支持 em 单位"""
+    numbers = number_pattern.findall(value or "")
+    if not numbers:
+        return 0.0
+    number = float(numbers[0])
+    return number * font_size if value.strip().endswith("em") else number
+
+
+def color_to_simvec(value: str, current_color: str = "black") -> str:
+    """将 CSS 颜色转换为 SimVec 中的 (R,G,B) 字符串, 无法解析时返回 None"""
+    if value is None:
+        return "None"
+    value = value.strip().lower()
+    if value == "currentcolor":
+        value = (current_color or "black").strip().lower()
+    if value in named_colors:
+        return "(%d,%d,%d)" % named_colors[value]
+    if value.startswith('#'):
+        hex_color = value[1:]
+        if len(hex_color) == 3:
+            hex_color = ''.join(ch * 2 for ch in hex_color)
+        if len(hex_color) == 6 and all(ch in "0123456789abcdef" for ch in hex_color):
+            return "(%d,%d,%d)" % tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+        return "None"
+    if value.startswith("rgb"):
+        channels = number_pattern.findall(value)
+        # 与浏览器一致: 不透明度为 1 的 rgba 会被规范化为 rgb
+        if len(channels) == 4 and float(channels[3]) == 1:
+            channels = channels[:3]
+        if len(channels) == 3:
+            return "(%d,%d,%d)" % tuple(int(float(c)) for c in channels)
+    return "None"
+
+
+def parse_path_points(d: str, matrix: tuple) -> list:
+    """解析 path 的 d 属性, 返回变换后的端点列表 (与 parse_svg_x.js 中的 parsePath 一致)"""
+    x = y = start_x = start_y = 0.0
+    points = []
+    for command in path_command_pattern.findall(d):
+        kind = command[0]
+        args = parse_numbers(command[1:])
+        try:
+            if kind in "Mm":
+                x, y = (args[0], args[1]) if kind == "M" else (x + args[0], y + args[1])
+                start_x, start_y = x, y
+            elif kind == "L" or kind == "T":
+                x, y = args[0], args[1]
+            elif kind == "l" or kind == "t":
+                x, y = x + args[0], y + args[1]
+            elif kind == "H":
+                x = args[0]
+            elif kind == "h":
+                x += args[0]
+            elif kind == "V":
+                y = args[0]
+            elif kind == "v":
+                y += args[0]
+            elif kind == "C":
+                x, y = args[4], args[5]
+            elif kind == "c":
+                x, y = x + args[4], y + args[5]
+            elif kind in "SQ":
+                x, y = args[2], args[3]
+            elif kind in "sq":
+                x, y = x + args[2], y + args[3]
+            elif kind == "A":
+                x, y = args[5], args[6]
+            elif kind == "a":
+                x, y = x + args[5], y + args[6]
+            elif kind in "Zz":
+                x, y = start_x, start_y
+            else:
+                continue
+        except IndexError:
+            continue
+        points.append((x, y))
+    return [apply_matrix(matrix, px, py) for px, py in points]
+
+
+def circle_path_radius(d: str):
+    """判断 path 是否为 M, A, A 构成的圆 (与 isCirclePathData 一致), 是则返回半径"""
+    commands = path_command_pattern.findall(d)
+    if len(commands) != 3 or [c[0] for c in commands] != ['M', 'A', 'A']:
+        return None
+    move, arc1, arc2 = (parse_numbers(c[1:]) for c in commands)
+    if len(move) < 2 or len(arc1) < 7 or len(arc2) < 7:
+        return None
+    mx, my = move[0], move[1]
+    if arc1[:5] != arc2[:5]:
+        return None
+    if not (arc1[5] == -mx and arc1[6] == my and arc2[5] == mx and arc2[6] == my):
+        return None
+    return arc1[0]
+
+
+def is_axis_aligned_rectangle(points: list, tolerance: float = 1) -> bool:
+    """检查四个点是否构成轴对齐矩形 (与 isAxisAlignedRectangle 一致)"""
+    if len(points) != 4:
+        return False
+    p1, p2, p3, p4 = points
+    return (abs(p1[1] - p2[1]) <= tolerance and abs(p2[0] - p3[0]) <= tolerance
+            and abs(p3[1] - p4[1]) <= tolerance and abs(p4[0] - p1[0]) <= tolerance)
+
+
+def points_bbox(points: list) -> tuple:
+    """计算点集的轴对齐包围盒"""
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)
+
+
+def js_round(value: float) -> int:
+    """与 JavaScript Math.round 一致的取整"""
+    return math.floor(value + 0.5)
+
+
+def float32(value: float) -> float:
+    """取整到单精度浮点数: 浏览器以 float 计算图元的位置, 取整后 int() 截断的结果才与 parse_svg_x.js 一致"""
+    return struct.unpack("f", struct.pack("f", value))[0]
+
+
+class SimVecWriter:
+    """将图元按 parse_svg_x.js 的规则归一化、排序并写出为 SimVec 文本"""
+
+    def __init__(self, svg_width: float, svg_height: float):
+        size = max(svg_width, svg_height) or 1.0
+        self.scale = granularity / size
+        # 每种类型只保存 (排序键, 文本行), 不保留任何 XML 节点
+        self.buckets = {kind: [] for kind in type_order}
+
+    def add(self, kind: str, bbox: tuple, color: str = None, content: str = None, points: list = None):
+        """添加一个图元, bbox 为页面坐标下的 (x, y, width, height)"""
+        x, y, width, height = bbox
+        if kind != "text":
+            # 文本的包围盒本身是估算值, 不做单精度取整
+            x, y = float32(x), float32(y)
+        if width == 0 and height == 0:
+            return
+        s = self.scale
+        uniform_x = int((x + width / 2) * s)  # 顶部中点的 x 坐标
+        uniform_y = int(y * s)
+        uniform_width = int(width * s)
+        uniform_height = int(height * s)
+
+        if points is not None:
+            point_string = ';'.join(f"{js_round(px * s)},{js_round(py * s)}" for px, py in points)
+        else:
+            point_string = f"[{uniform_x},{uniform_y},{uniform_width},{uniform_height}]"
+
+        if kind == "text":
+            center_x = uniform_x + uniform_width / 2
+            center_y = uniform_y + uniform_height / 2
+            line = f"text {content} [{center_x:.1f},{center_y:.1f},{uniform_width},{uniform_height}]"
+            # 文本保持文档顺序
+            self.buckets[kind].append(((len(self.buckets[kind]), 0), line))
+        else:
+            self.buckets[kind].append(((x, y), f"{kind} {color} {point_string}"))
+
+    def lines(self):
+        """按类型顺序依次产出排序后的 SimVec 行"""
+        for kind in type_order:
+            bucket = self.buckets[kind]
+            bucket.sort(key=lambda item: item[0])
+            for _, line in bucket:
+                yield line
+
+
+def convert_svg(svg_path: str) -> list:
+    """以流式方式解析 SVG 文件, 返回 SimVec 行列表"""
+    writer = None
+    # 每一层保存 (标签, 累积变换矩阵, 继承样式, 是否隐藏, 是否处于不渲染的容器内)
+    stack = []
+    elements = []
+    text_depth = 0
+
+    for event, element in ET.iterparse(svg_path, events=("start", "end")):
+        local_name = element.tag.rsplit('}', 1)[-1]
+        tag = local_name.lower()
+
+        if event == "start":
+            attrib = element.attrib
+            parent_matrix, parent_style, parent_hidden, parent_detached = stack[-1][1:] if stack else (identity_matrix, {}, False, False)
+            own_style = parse_style(attrib)
+            style = dict(parent_style)
+            style.update({k: v for k, v in own_style.items() if k in inherited_properties})
+            style["display"] = own_style.get("display", "inline")
+            style["opacity"] = own_style.get("opacity", "1")
+            matrix = parent_matrix
+            if "transform" in attrib:
+                matrix = multiply_matrix(matrix, parse_transform(attrib["transform"]))
+            hidden = parent_hidden or style["display"] == "none"
+            detached = parent_detached
+            if tag in non_rendered_tags:
+                hidden = hidden or local_name not in detached_containers
+                detached = True
+                # 不渲染的容器 (例如 clipPath) 内的图元不参与页面布局, 浏览器按其自身坐标给出包围盒
+                matrix = identity_matrix
+
+            if tag == "svg" and writer is None:
+                # 未声明宽高时, 根 svg 会铺满浏览器视口
+                width = parse_length(attrib.get("width"), default_font_size) or viewport_size[0]
+                height = parse_length(attrib.get("height"), default_font_size) or viewport_size[1]
+                # XML 区分大小写, 浏览器只识别 viewBox (小写的 viewbox 会被忽略)
+                view_box = parse_numbers(attrib.get("viewBox", ""))
+                if len(view_box) == 4 and view_box[2] > 0 and view_box[3] > 0:
+                    view_scale = min(width / view_box[2], height / view_box[3])
+                    matrix = multiply_matrix(matrix, (
+                        view_scale, 0.0, 0.0, view_scale,
+                        (width - view_box[2] * view_scale) / 2 - view_box[0] * view_scale,
+                        (height - view_box[3] * view_scale) / 2 - view_box[1] * view_scale,
+                    ))
+                writer = SimVecWriter(width, height)
+
+            stack.append((tag, matrix, style, hidden, detached))
+            elements.append(element)
+            if tag == "text":
+                text_depth += 1
+            continue
+
+        # event == "end"
+        _, matrix, style, hidden, detached = stack.pop()
+        elements.pop()
+        attrib = element.attrib
+
+        if writer is not None and not hidden:
+            # parse_svg_x.js 按标签名收集 rect 与 circle, 不渲染的容器内的也包括在内; 其余图元只取渲染出来的
+            if not detached or tag in ("rect", "circle"):
+                emit_element(writer, tag, element, attrib, matrix, style)
+
+        if tag == "text":
+            text_depth -= 1
+        # 文本内部的 tspan 需要保留到 text 结束时读取内容, 其余节点处理完立即释放
+        if text_depth == 0:
+            element.clear()
+            if elements:
+                del elements[-1][:]
+
+    return list(writer.lines()) if writer is not None else []
+
+
+def emit_element(writer: SimVecWriter, tag: str, element, attrib: dict, matrix: tuple, style: dict):
+    """将单个 SVG 元素转换为 SimVec 图元"""
+    current_color = style.get("color", "black")
+    fill = color_to_simvec(style.get("fill", "black"), current_color)
+    stroke = color_to_simvec(style.get("stroke", "none"), current_color)
+    fill_none = style.get("fill", "black").strip().lower() == "none"
+    stroke_none = style.get("stroke", "none").strip().lower() == "none"
+
+    if tag == "rect":
+        width = parse_length(attrib.get("width"), 0)
+        height = parse_length(attrib.get("height"), 0)
+        bbox = transformed_bbox(matrix, parse_length(attrib.get("x"), 0), parse_length(attrib.get("y"), 0), width, height)
+        writer.add("rect", bbox, color=fill)
+
+    elif tag == "circle":
+        radius = parse_length(attrib.get("r"), 0)
+        cx = parse_length(attrib.get("cx"), 0)
+        cy = parse_length(attrib.get("cy"), 0)
+        writer.add("circle", transformed_bbox(matrix, cx - radius, cy - radius, 2 * radius, 2 * radius), color=fill)
+
+    elif tag == "text":
+        if style["display"] == "none" or style["opacity"] == "0":
+            return
+        raw_content = ''.join(element.itertext())
+        font_size = parse_length(style.get("font-size", ""), default_font_size) or default_font_size
+        x = parse_length((attrib.get("x") or "0").split()[0] if attrib.get("x") else "0", font_size)
+        y = parse_length((attrib.get("y") or "0").split()[0] if attrib.get("y") else "0", font_size)
+        x += parse_length(attrib.get("dx"), font_size)
+        y += parse_length(attrib.get("dy"), font_size)
+        # 空文本在浏览器中的包围盒为 0, 会被过滤
+        if not raw_content:
+            return
+        widths = bold_char_width_table if style.get("font-weight", "").lower() in bold_font_weights else char_width_table
+        families = style.get("font-family", "").lower()
+        width_scale, ascent, descent, hinted = font_metrics["arial" if "arial" in families or "helvetica" in families else "default"]
+        width = font_size * width_scale * sum(
+            1.0 if ord(ch) > 0x2e80 else widths.get(ch, text_char_width) for ch in raw_content
+        )
+        anchor = style.get("text-anchor", "start")
+        if anchor == "middle":
+            x -= width / 2
+        elif anchor == "end":
+            x -= width
+        ascent, descent = font_size * ascent, font_size * descent
+        if hinted:
+            ascent, descent = js_round(ascent), js_round(descent)
+        bbox = transformed_bbox(matrix, x, y - ascent, width, ascent + descent)
+        writer.add("text", bbox, content=normalize_text_content(raw_content))
+
+    elif tag == "path":
+        if fill_none and stroke_none:
+            return
+        d = attrib.get("d")
+        if d is None:
+            return
+        radius = circle_path_radius(d)
+        if radius is not None:
+            writer.add("circle", transformed_bbox(matrix, -radius, -radius, 2 * radius, 2 * radius), color=fill)
+            return
+        points = parse_path_points(d, matrix)
+        if not points:
+            return
+        path_type = "line"
+        if points[0] == points[-1] and not fill_none:
+            points.pop()
+            path_type = "area"
+        if not points:
+            return
+        bbox = points_bbox(points)
+        if is_axis_aligned_rectangle(points):
+            writer.add("rect", bbox, color=fill)
+            return
+        writer.add(path_type, bbox, color=stroke if path_type == "line" else fill, points=points)
+
+
+def convert_file(svg_path: str, output_path: str) -> int:
+    """转换单个 SVG 文件并写出 SimVec 文本, 返回图元数量"""
+    lines = convert_svg(svg_path)
+    with open(output_path, "w", encoding="utf-8") as f_out:
+        f_out.write("\n".join(lines))
+    return len(lines)
+
+
+if __name__ == "__main__":
+    for chart_type in chart_types:
+        input_chart_path = os.path.join(input_svg_directory, chart_type)
+        output_chart_path = os.path.join(output_simvec_directory, chart_type)
+        if not os.path.isdir(input_chart_path):
+            continue
+
+        # 确保输出子目录存在
+        os.makedirs(output_chart_path, exist_ok=True)
+
+        for filename in sorted(os.listdir(input_chart_path)):
+            if filename.endswith(".svg"):
+                input_path = os.path.join(input_chart_path, filename)
+                output_path = os.path.join(output_chart_path, filename.split('.')[0] + ".txt")
+                count = convert_file(input_path, output_path)
+                print(f"SVG 转换完成: {output_path} ({count} 个图元)")
@@ -0,0 +1,231 @@
+import argparse
+import json
+import math
+import os
+
+import numpy as np
+
+# 合成语料的默认输出目录 (目录结构与 intermediate_data 相同, 另有 ground_truth 保存真实数据)
+default_output_directory = "intermediate_data/synthetic"
+
+# 各图表类型的默认规模: bar / stackbar 为柱数, line 为顶点总数, scatter 为圆的个数, pie 为扇形数
+default_sizes = {
+    "bar": 10_000,
+    "stackbar": 2_000,
+    "line": 1_000_000,
+    "scatter": 100_000,
+    "pie": 12,
+}
+
+# 绘图区: Y 轴 0 ~ y_max_value 对应像素 plot_bottom ~ plot_top, 每个像素正好 2.5 个单位
+plot_left = 40
+plot_top = 20
+plot_bottom = 420
+y_max_value = 1000
+y_tick_step = 100
+y_per_pixel = y_max_value / (plot_bottom - plot_top)
+
+# 分类颜色取自 {0, 128, 255}³ 网格, 两两距离至少为 128, 远大于图例匹配的容差
+series_colors = [
+    (r, g, b) for r in (0, 128, 255) for g in (0, 128, 255) for b in (0, 128, 255) if (r, g, b) != (255, 255, 255)
+]
+
+
+def _hex(color: tuple) -> str:
+    return "#{:02x}{:02x}{:02x}".format(*color)
+
+
+def _color(color: tuple) -> str:
+    return "({},{},{})".format(*color)
+
+
+def _legend(count: int) -> tuple:
+    """返回 (分类名称列表, 颜色列表, metadata 中的 legend)"""
+    items = [f"Series_{i}" for i in range(count)]
+    colors = [series_colors[i % len(series_colors)] for i in range(count)]
+    return items, colors, {"items": items, "colors": [_hex(c) for c in colors]}
+
+
+def _y_axis_lines() -> list:
+    """Y 轴刻度文本, 文本的 y 坐标正好是刻度的像素位置"""
+    lines = []
+    for value in range(0, y_max_value + 1, y_tick_step):
+        pixel = plot_bottom - value / y_per_pixel
+        lines.append(f"text {value} [10.0,{pixel:.1f},{len(str(value)) * 4},8]")
+    return lines
+
+
+def _y_axis_metadata(name: str = "Value") -> dict:
+    return {"name": name, "ticks": [str(v) for v in range(0, y_max_value + 1, y_tick_step)], "type": "Quantitative"}
+
+
+def _x_quantitative_axis(width: int, step: int) -> tuple:
+    """X 轴刻度 (1 像素 = 1 个单位), 返回 (SimVec 文本行, metadata 中的 xAxis)"""
+    ticks = list(range(0, width + 1, step))
+    lines = [f"text {t} [{plot_left + t:.1f},{plot_bottom + 12:.1f},{len(str(t)) * 4},8]" for t in ticks]
+    return lines, {"name": "X", "ticks": [str(t) for t in ticks], "type": "Quantitative"}
+
+
+def generate_bar(size: int, rng: np.random.Generator, series: int = 3) -> tuple:
+    """size 根柱子, 每根柱子一个 X 轴分类, 颜色按图例依次循环"""
+    items, colors, legend = _legend(series)
+    spacing = 10
+    heights = rng.integers(1, plot_bottom - plot_top + 1, size=size)
+
+    lines, ticks, truth = [], [], []
+    for i, height in enumerate(heights.tolist()):
+        label, center, top = f"c{i}", plot_left + spacing * i, plot_bottom - height
+        lines.append(f"rect {_color(colors[i % series])} [{center},{top},{spacing - 2},{height}]")
+        lines.append(f"text {label} [{center:.1f},{plot_bottom + 12:.1f},{len(label) * 4},8]")
+        ticks.append(label)
+        truth.append({"x": label, "y": round(height * y_per_pixel, 1), "category": items[i % series]})
+    lines.extend(_y_axis_lines())
+
+    metadata = {
+        "chartType": "Bar Chart", "title": None,
+        "xAxis": {"name": "Category", "ticks": ticks, "type": "Categorical"},
+        "yAxis": _y_axis_metadata(), "legend": legend,
+    }
+    return lines, metadata, truth
+
+
+def generate_stackbar(size: int, rng: np.random.Generator, series: int = 4) -> tuple:
+    """size 根堆叠柱, 每根由 series 段组成, 各段高度之和不超过绘图区高度"""
+    items, colors, legend = _legend(series)
+    spacing = 20
+    max_segment = (plot_bottom - plot_top) // series
+    heights = rng.integers(1, max_segment + 1, size=(size, series))
+
+    lines, ticks, truth = [], [], []
+    for i, column in enumerate(heights.tolist()):
+        label, center, bottom = f"c{i}", plot_left + spacing * i, plot_bottom
+        for s, height in enumerate(column):
+            lines.append(f"rect {_color(colors[s])} [{center},{bottom - height},{spacing - 4},{height}]")
+            truth.append({"x": label, "y": round(height * y_per_pixel, 1), "category": items[s]})
+            bottom -= height
+        lines.append(f"text {label} [{center:.1f},{plot_bottom + 12:.1f},{len(label) * 4},8]")
+        ticks.append(label)
+    lines.extend(_y_axis_lines())
+
+    metadata = {
+        "chartType": "Stacked Bar Chart", "title": None,
+        "xAxis": {"name": "Category", "ticks": ticks, "type": "Categorical"},
+        "yAxis": _y_axis_metadata(), "legend": legend,
+    }
+    return lines, metadata, truth
+
+
+def generate_line(size: int, rng: np.random.Generator, series: int = 4) -> tuple:
+    """series 条折线共 size 个顶点, 每个像素列一个顶点, Y 为有界随机游走"""
+    items, colors, legend = _legend(series)
+    per_series = max(2, size // series)
+    x_lines, x_axis = _x_quantitative_axis(per_series - 1, max(1, (per_series - 1) // 10))
+
+    lines, truth = [], []
+    for s in range(series):
+        steps = rng.integers(-3, 4, size=per_series)
+        y_pixels = np.clip(plot_top + (plot_bottom - plot_top) // 2 + np.cumsum(steps), plot_top, plot_bottom).tolist()
+        x_pixels = range(plot_left, plot_left + per_series)
+        lines.append(f"line {_color(colors[s])} " + ";".join(f"{x},{y}" for x, y in zip(x_pixels, y_pixels)))
+        truth.extend(
+            {"x": float(x - plot_left), "y": round((plot_bottom - y) * y_per_pixel, 2), "category": items[s]}
+            for x, y in zip(x_pixels, y_pixels)
+        )
+    lines.extend(x_lines)
+    lines.extend(_y_axis_lines())
+
+    metadata = {"chartType": "Line Chart", "title": None, "xAxis": x_axis, "yAxis": _y_axis_metadata(), "legend": legend}
+    return lines, metadata, truth
+
+
+def generate_scatter(size: int, rng: np.random.Generator, series: int = 3) -> tuple:
+    """size 个圆随机分布在 1000 x 400 像素的绘图区中"""
+    items, colors, legend = _legend(series)
+    width = 1000
+    xs = rng.integers(0, width + 1, size=size)
+    ys = rng.integers(plot_top, plot_bottom + 1, size=size)
+    x_lines, x_axis = _x_quantitative_axis(width, 100)
+
+    lines, truth = [], []
+    for i, (x, y) in enumerate(zip(xs.tolist(), ys.tolist())):
+        lines.append(f"circle {_color(colors[i % series])} [{plot_left + x},{y},4,4]")
+        truth.append({"x": float(x), "y": round((plot_bottom - y) * y_per_pixel, 2), "category": items[i % series]})
+    lines.extend(x_lines)
+    lines.extend(_y_axis_lines())
+
+    metadata = {"chartType": "Scatter Plot", "title": None, "xAxis": x_axis, "yAxis": _y_axis_metadata(), "legend": legend}
+    return lines, metadata, truth
+
+
+def generate_pie(size: int, rng: np.random.Generator) -> tuple:
+    """size 个扇形, 弧线每 2° 细分一个顶点, 真实占比为生成时的角度 / 360"""
+    items, colors, legend = _legend(size)
+    center, radius = (250, 250), 200
+    weights = rng.uniform(1, 10, size=size)
+    boundaries = np.concatenate([[0], np.cumsum(weights / weights.sum() * 360)])
+
+    lines, truth = [], []
+    for i in range(size):
+        start, end = boundaries[i], boundaries[i + 1]
+        angles = np.radians(np.append(np.arange(start, end, 2.0), end))
+        xs = np.rint(center[0] + radius * np.cos(angles)).astype(int)
+        ys = np.rint(center[1] + radius * np.sin(angles)).astype(int)
+        points = [f"{x},{y}" for x, y in zip(xs.tolist(), ys.tolist())] + [f"{center[0]},{center[1]}"] * 2
+        lines.append(f"area {_color(colors[i % len(colors)])} " + ";".join(points))
+        truth.append({"category": items[i], "percentage": round((end - start) / 360, 4)})
+
+    metadata = {"chartType": "Pie Chart", "title": None, "xAxis": None, "yAxis": None, "legend": legend}
+    return lines, metadata, truth
+
+
+generators = {
+    "bar": generate_bar,
+    "stackbar": generate_stackbar,
+    "line": generate_line,
+    "scatter": generate_scatter,
+    "pie": generate_pie,
+}
+
+
+def generate_corpus(output_directory: str = default_output_directory, sizes: dict = None, count: int = 1, seed: int = 0) -> list:
+    """
+    生成确定性的合成语料 (相同 seed 得到相同文件):
+      raw_simvec_data/<type>/<name>.txt, raw_meta_data/<type>/<name>.json, ground_truth/<type>/<name>.json
+    返回 (chart_type, name) 列表
+    """
+    sizes = sizes or default_sizes
+    charts = []
+    for chart_type, size in sizes.items():
+        for i in range(count):
+            rng = np.random.default_rng([seed, list(generators).index(chart_type), i])
+            lines, metadata, truth = generators[chart_type](size, rng)
+            name = f"synthetic_{size}_{i}"
+            for folder, extension, content in (
+                ("raw_simvec_data", ".txt", "\n".join(lines)),
+                ("raw_meta_data", ".json", json.dumps(metadata, indent=2)),
+                ("ground_truth", ".json", json.dumps(truth, ensure_ascii=False)),
+            ):
+                directory = os.path.join(output_directory, folder, chart_type)
+                os.makedirs(directory, exist_ok=True)
+                with open(os.path.join(directory, name + extension), "w", encoding="utf-8") as f_out:
+                    f_out.write(content)
+            charts.append((chart_type, name))
+            print(f"已生成 {chart_type}/{name}: {len(lines)} 行 SimVec, {len(truth)} 条真实数据")
+    return charts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成带真实数据的合成图表语料")
+    parser.add_argument("--output", default=default_output_directory)
+    parser.add_argument("--types", nargs="+", choices=list(generators), default=list(generators))
+    parser.add_argument("--scale", type=float, default=1.0, help="在默认规模上乘以该系数")
+    parser.add_argument("--count", type=int, default=1, help="每种类型生成的图表数量")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate_corpus(
+        args.output,
+        {t: max(2, math.ceil(default_sizes[t] * args.scale)) for t in args.types},
+        args.count,
+        args.seed,
+    )
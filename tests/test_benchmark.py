@@ -0,0 +1,38 @@
+import pytest
+
+import benchmark
+import synthetic_charts
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp("corpus"))
+    synthetic_charts.generate_corpus(directory, {"bar": 50, "pie": 4})
+    return directory
+
+
+def test_compare_rows():
+    truth = [{"x": "A", "y": 10.0, "category": "s"}, {"x": "B", "y": 20.0, "category": "s"}]
+    rows = [{"x": "A", "y": 10.5, "category": "s"}, {"x": "C", "y": 19.0, "category": "t"}]
+    assert benchmark.compare_rows(rows, truth) == {"rows": 2, "expected_rows": 2, "max_error": 1.0, "category_mismatches": 2}
+    assert benchmark.compare_rows(rows[:1], truth)["max_error"] is None
+
+
+def test_in_process_records_memory_per_stage(corpus):
+    report = benchmark.run_benchmark(corpus, ["bar", "pie"], isolate=False)
+    assert not report["isolated"] and report["peak_rss_mb"] > 0
+    for chart in report["charts"]:
+        assert set(chart["memory"]) == set(benchmark.stages)
+        assert all(numbers["peak_growth_mb"] >= 0 for numbers in chart["memory"].values())
+        assert "peak_rss_mb" not in chart
+        assert chart["accuracy"]["rows"] == chart["accuracy"]["expected_rows"]
+    assert set(report["summary"]["bar"]["stages"]["extract"]) >= {"seconds", "max_rss_delta_mb"}
+
+
+def test_isolated_charts_report_their_own_peak(corpus):
+    # 每个图表在新的子进程中运行, 报告各自的峰值内存
+    report = benchmark.run_benchmark(corpus, ["bar", "pie"])
+    assert report["isolated"]
+    peaks = [chart["peak_rss_mb"] for chart in report["charts"]]
+    assert len(peaks) == 2 and all(peak > 0 for peak in peaks)
+    assert report["peak_rss_mb"] == max(peaks) == max(entry["peak_rss_mb"] for entry in report["summary"].values())
@@ -0,0 +1,133 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+import build_cache
+from build_cache import ChartCache
+
+
+@pytest.fixture
+def files(tmp_path):
+    source, output = tmp_path / "chart.txt", tmp_path / "chart.json"
+    source.write_text("rect (255,0,0) [1,2,3,4]", encoding="utf-8")
+    output.write_text("{}", encoding="utf-8")
+    return str(source), str(output)
+
+
+def _rebuild(previous: dict, files: tuple, code: str = "v1", options: dict = None) -> bool:
+    """以上次构建的记录重新判断一次阶段, 返回能否跳过"""
+    cache = ChartCache(previous)
+    return cache.is_fresh("extract", [files[0]], [files[1]], code, options)
+
+
+def _first_build(files: tuple, options: dict = None) -> dict:
+    cache = ChartCache()
+    assert not cache.is_fresh("extract", [files[0]], [files[1]], "v1", options)
+    return cache.entries
+
+
+def test_unchanged_stage_is_skipped(files):
+    previous = _first_build(files, {"tolerance": 60})
+    cache = ChartCache(previous)
+    assert cache.is_fresh("extract", [files[0]], [files[1]], "v1", {"tolerance": 60})
+    assert cache.skipped == ["extract"]
+    assert cache.entries == previous
+
+
+def test_input_change_invalidates(files):
+    previous = _first_build(files)
+    with open(files[0], "a", encoding="utf-8") as f:
+        f.write("\ntext 2020 [1,2,3,4]")
+    assert not _rebuild(previous, files)
+
+
+def test_deleted_input_invalidates(files, tmp_path):
+    previous = _first_build(files)
+    (tmp_path / "chart.txt").unlink()
+    assert not _rebuild(previous, files)
+
+
+def test_unchanged_stat_skips_hashing(files, monkeypatch):
+    previous = _first_build(files)
+    hashed = []
+    monkeypatch.setattr(build_cache, "file_hash", lambda path: hashed.append(path) or "changed")
+    assert _rebuild(previous, files)
+    assert hashed == []
+
+
+def test_stat_change_rehashes(files):
+    previous = _first_build(files)
+    # 内容不变、只更新修改时间时重新计算哈希, 阶段仍可跳过, 新记录保存新的修改时间
+    stat = os.stat(files[0])
+    os.utime(files[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    cache = ChartCache(previous)
+    assert cache.is_fresh("extract", [files[0]], [files[1]], "v1")
+    assert cache.entries["extract"]["stats"][files[0]][0] == stat.st_mtime_ns + 10 ** 9
+
+    # 大小不变而内容变化时, 修改时间不同即可发现
+    with open(files[0], "w", encoding="utf-8") as f:
+        f.write("rect (0,0,255) [1,2,3,4]")
+    os.utime(files[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10 ** 9))
+    assert not _rebuild(cache.entries, files)
+
+
+def test_code_and_option_changes_invalidate(files):
+    previous = _first_build(files)
+    assert not _rebuild(previous, files, code="v2")
+    assert not _rebuild(previous, files, options={"tolerance": 30})
+
+
+def test_missing_output_or_disabled_cache_rebuilds(files, tmp_path):
+    previous = _first_build(files)
+    assert not ChartCache(previous, enabled=False).is_fresh("extract", [files[0]], [files[1]], "v1")
+    (tmp_path / "chart.json").unlink()
+    assert not _rebuild(previous, files)
+
+
+def _load_module(name: str, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_code_version_follows_local_dependencies(tmp_path, monkeypatch):
+    monkeypatch.setattr(build_cache, "project_directory", str(tmp_path))
+    monkeypatch.setattr(build_cache, "_code_versions", {})
+    helper_path, stage_path = tmp_path / "helper.py", tmp_path / "stage.py"
+    helper_path.write_text("def scale(v):\n    return v * 2\n", encoding="utf-8")
+    stage_path.write_text("value = 1\n", encoding="utf-8")
+
+    helper = _load_module("helper", helper_path)
+    stage = _load_module("stage", stage_path)
+    stage.helper = helper
+    first = build_cache.code_version(stage)
+    # 同一进程内缓存代码版本
+    assert build_cache.code_version(stage) == first
+
+    # 依赖的项目内模块源码变化后, 版本随之改变
+    helper_path.write_text("def scale(v):\n    return v * 3\n", encoding="utf-8")
+    build_cache._code_versions.clear()
+    assert build_cache.code_version(stage) != first
+
+    # 项目目录以外的模块 (标准库) 不计入版本
+    second = build_cache.code_version(stage)
+    build_cache._code_versions.clear()
+    stage.json = json
+    assert build_cache.code_version(stage) == second
+
+
+def test_manifest_round_trip_and_version_mismatch(tmp_path):
+    path = str(tmp_path / "build" / "manifest.json")
+    assert build_cache.load_manifest(path) == {"version": build_cache.manifest_version, "charts": {}}
+    manifest = {"version": build_cache.manifest_version, "charts": {"bar/1": {"extract": {"code": "v1"}}}}
+    build_cache.save_manifest(manifest, path)
+    assert build_cache.load_manifest(path) == manifest
+
+    build_cache.save_manifest({"version": build_cache.manifest_version + 1, "charts": {"bar/1": {}}}, path)
+    assert build_cache.load_manifest(path)["charts"] == {}
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{")
+    assert build_cache.load_manifest(path)["charts"] == {}
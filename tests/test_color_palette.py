@@ -0,0 +1,55 @@
+import numpy as np
+
+from color_palette import ColorPalette, pack_rgb, palette_for
+
+metadata = {"legend": {"items": ["A", "B"], "colors": ["#ff0000", "#0000ff"]}}
+
+
+def test_classify_within_tolerance():
+    palette = ColorPalette(metadata, tolerance=10)
+    rgb = pack_rgb([[255, 0, 0], [250, 5, 3], [0, 0, 255], [0, 6, 248]])
+    assert palette.classify(rgb) == ["A", "A", "B", "B"]
+
+
+def test_classify_tolerance_boundary():
+    # 距离恰好等于容差时仍匹配, 超出一点则不匹配
+    palette = ColorPalette(metadata, tolerance=5)
+    rgb = pack_rgb([[252, 4, 0], [252, 4, 1]])
+    assert palette.classify(rgb) == ["A", "Unknown"]
+
+
+def test_classify_unmatched_labels():
+    palette = ColorPalette(metadata, tolerance=10)
+    rgb = np.array([pack_rgb([[0, 255, 0]])[0], -1], dtype=np.int64)
+    assert palette.classify(rgb) == ["Unknown", "Unknown"]
+    assert palette.classify(rgb, unmatched_label="其他") == ["其他", "其他"]
+    # unmatched_label 为 None 时使用 RGB(...) 名称, 无效颜色为 RGBNone
+    assert palette.classify(rgb, unmatched_label=None) == ["RGB(0, 255, 0)", "RGBNone"]
+
+
+def test_classify_without_legend():
+    palette = ColorPalette({})
+    assert not palette.has_legend
+    rgb = np.array([pack_rgb([[1, 2, 3]])[0], -1], dtype=np.int64)
+    assert palette.classify(rgb) == ["RGB(1, 2, 3)", "RGBNone"]
+    assert palette.classify(np.array([], dtype=np.int64)) == []
+
+
+def test_classify_repeated_colors_use_memo():
+    palette = ColorPalette(metadata, tolerance=10)
+    rgb = pack_rgb([[255, 0, 0]] * 3 + [[0, 0, 255]])
+    assert palette.classify(rgb) == ["A", "A", "A", "B"]
+    assert len(palette._memo) == 2
+    assert palette.classify(rgb[:1]) == ["A"]
+
+
+def test_later_legend_item_wins_for_duplicate_color():
+    palette = ColorPalette({"legend": {"items": ["A", "B"], "colors": ["#ff0000", "#FF0000"]}})
+    assert palette.classify(pack_rgb([[255, 0, 0]])) == ["B"]
+
+
+def test_palette_for_shares_instances():
+    first = palette_for({"legend": {"items": ["A", "B"], "colors": ["#ff0000", "#0000ff"]}})
+    assert palette_for(metadata) is first
+    assert palette_for(metadata, tolerance=5) is not first
+    assert palette_for({}) is not palette_for({})
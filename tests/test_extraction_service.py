@@ -0,0 +1,101 @@
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import extraction_service
+from extraction_service import ExtractionService, extract_chart, serve_stdin
+
+simvec = "\n".join([
+    "line (0,0,0) 50,10;50,210",
+    "line (0,0,0) 50,210;450,210",
+    "rect (255,0,0) [100,160,30,50]",
+    "rect (255,0,0) [200,110,30,100]",
+    "text 0 [40,210,6,10]",
+    "text 100 [40,110,18,10]",
+    "text A [103,220,6,10]",
+    "text B [203,220,6,10]",
+])
+request = {"chart_type": "bar", "simvec": simvec,
+           "metadata": {"xAxis": {"ticks": ["A", "B"]}, "yAxis": {"ticks": ["0", "100"]}, "legend": None}}
+rows = [{"x": "A", "y": 50.0, "category": "RGB(255, 0, 0)"}, {"x": "B", "y": 100.0, "category": "RGB(255, 0, 0)"}]
+
+
+def test_extract_chart_rows_and_spec():
+    assert extract_chart(request) == {"data": rows}
+    spec = extract_chart({**request, "format": "vega_lite", "name": "bar/A"})["spec"]
+    assert spec["name"] == "bar/A" and spec["data"]["values"] == rows
+    # 原始 metadata 先规范化, 但调用方的字典不被修改
+    assert request["metadata"]["legend"] is None
+
+
+@pytest.mark.parametrize("broken, message", [
+    ({"chart_type": "area"}, "不支持的图表类型"),
+    ({"chart_type": "bar", "simvec": ""}, "缺少 metadata"),
+    ({"chart_type": "bar", "metadata": {}}, "缺少 svg 或 simvec"),
+])
+def test_extract_chart_rejects_bad_requests(broken, message):
+    with pytest.raises(ValueError, match=message):
+        extract_chart(broken)
+
+
+@pytest.fixture(scope="module")
+def service():
+    # 1 个工作进程且不排队: 同时只能处理一个请求
+    service = ExtractionService(workers=1, queue_size=0)
+    yield service
+    service.close()
+
+
+def _post(url: str, body: bytes) -> tuple:
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=body, method="POST")) as response:
+            return response.status, dict(response.headers), json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), json.load(e)
+
+
+def test_http_backpressure_and_status_codes(service):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), extraction_service._make_handler(service))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(url + "/health") as response:
+            assert json.load(response) == {"status": "ok", "workers": 1}
+
+        # 唯一的位置被占用时立即拒绝, 不排队等待
+        service.slots.acquire()
+        try:
+            status, headers, body = _post(url + "/extract", json.dumps(request).encode())
+        finally:
+            service.slots.release()
+        assert status == 503 and headers["Retry-After"] == "1" and body["status"] == "failed"
+
+        status, _, body = _post(url + "/extract", json.dumps({**request, "id": 7}).encode())
+        assert status == 200 and body["data"] == rows and body["id"] == 7 and body["milliseconds"] >= 0
+        status, _, body = _post(url + "/extract", json.dumps({**request, "chart_type": "area"}).encode())
+        assert status == 422 and body["error"].startswith("ValueError")
+        assert _post(url + "/extract", b"{")[0] == 400
+        assert _post(url + "/other", b"{}")[0] == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_stdin_protocol_answers_every_line(service):
+    lines = [json.dumps({**request, "id": 1}), "", "not json", json.dumps({"id": 2, "chart_type": "area"})]
+    output = io.StringIO()
+    serve_stdin(service, io.StringIO("\n".join(lines) + "\n"), output)
+    responses = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert len(responses) == 3
+    by_id = {response.get("id"): response for response in responses}
+    assert by_id[1]["data"] == rows
+    assert by_id[2]["status"] == "failed"
+    assert by_id[None]["error"].startswith("请求不是合法的 JSON")
+    # 所有位置在处理完成后均已归还
+    assert service.slots.acquire(blocking=False)
+    service.slots.release()
@@ -0,0 +1,129 @@
+import io
+
+import numpy as np
+import pytest
+
+import golden_set
+from golden_set import compare_to_reference, find_regressions, parse_path, svg_reference_rows
+
+
+def _svg(markup: str) -> io.BytesIO:
+    return io.BytesIO(f'<svg xmlns="http://www.w3.org/2000/svg" width="400" height="300">{markup}</svg>'.encode())
+
+
+def test_parse_path_relative_commands_and_arcs():
+    rect, line = parse_path("m10,20h30v40h-30zM0 0L5 5 10 0")
+    assert rect["closed"] and rect["points"] == [(10, 20), (40, 20), (40, 60), (10, 60)]
+    # moveto 之后的坐标对按 lineto 处理
+    assert not line["closed"] and line["points"] == [(0, 0), (5, 5), (10, 0)]
+
+    slice_, = parse_path("M 100 50 A 50 50 0 0 1 150 100 L 100 100 Z")
+    assert slice_["arcs"] == [(0, False, True)] and slice_["points"][1] == (150, 100)
+    assert parse_path("M0,0C1,1 2,2 3,3")[0]["curved"]
+
+
+def test_transform_matrix():
+    matrix = golden_set._transform_matrix("translate(10,59) scale(2 1)")
+    np.testing.assert_allclose(golden_set._apply(matrix, [(1, 1)]), [[12, 60]])
+    # 绕锚点旋转的文本位置不变
+    matrix = golden_set._transform_matrix("rotate(-30 128 245)")
+    np.testing.assert_allclose(golden_set._apply(matrix, [(128, 245)]), [[128, 245]])
+
+
+def test_bars_from_text_labels_snapped_to_gridlines():
+    # Highcharts 式: 刻度文本画在网格线上方 4 像素, 柱子在 translate + scale 的组中, 白色背景不是柱子
+    rows = svg_reference_rows("bar", _svg(
+        '<rect x="0" y="0" width="400" height="300" fill="#FFFFFF"/>'
+        '<path d="M 40 50.5 L 390 50.5" fill="none" stroke="#ccc"/><path d="M 40 250.5 L 390 250.5" fill="none" stroke="#ccc"/>'
+        '<text x="30" y="246.5" text-anchor="end">0k</text><text x="30" y="46.5" text-anchor="end">20k</text>'
+        '<text x="100" y="270" text-anchor="middle">A</text><text x="200" y="270" text-anchor="middle">B</text>'
+        '<g transform="translate(40,51) scale(1 1)">'
+        '<rect x="40" y="100" width="40" height="100" fill="#009EE4"/><rect x="140" y="150" width="40" height="50" fill="#009EE4"/>'
+        '</g>'
+    ))
+    assert rows == [{"x": "A", "y": 10000.0, "category": "RGB(0, 158, 228)"},
+                    {"x": "B", "y": 5000.0, "category": "RGB(0, 158, 228)"}]
+
+
+def test_stacked_bars_without_assignable_ticks():
+    # 柱子的列数多于刻度文本: X 为 None; 堆叠在其他矩形上的矩形取高度, 分类来自图例
+    rows = svg_reference_rows("bar", _svg(
+        '<g><rect x="300" y="10" width="10" height="10" fill="#ff0000"/><text x="315" y="20">Top</text></g>'
+        '<g transform="translate(0,200)"><g class="tick"><line x2="-6"/><text>0</text></g>'
+        '<g class="tick" transform="translate(0,-100)"><line x2="-6"/><text>100</text></g></g>'
+        '<rect x="10" y="150" width="10" height="50" fill="#0000ff"/><rect x="10" y="120" width="10" height="30" fill="#ff0000"/>'
+        '<rect x="30" y="160" width="10" height="40" fill="#0000ff"/>'
+        '<text x="15" y="220">2020</text>'
+    ))
+    assert all(row["x"] is None for row in rows)
+    assert sorted((row["category"], row["y"]) for row in rows) == [("RGB(0, 0, 255)", 40.0), ("RGB(0, 0, 255)", 50.0),
+                                                                  ("Top", 30.0)]
+
+
+def test_pie_slices_and_legend():
+    rows = svg_reference_rows("pie", _svg(
+        '<path d="M 100 50 A 50 50 0 0 1 150 100 L 100 100 A 0 0 0 0 0 100 100 Z" fill="#ff0000"/>'
+        '<path d="M 150 100 A 50 50 0 1 1 100 50 L 100 100 Z" fill="#0000ff"/>'
+        '<g><text x="321" y="15">Red</text><rect x="300" y="4" width="12" height="12" fill="#ff0000"/></g>'
+    ))
+    assert rows == [{"category": "Red", "percentage": 0.25}, {"category": "RGB(0, 0, 255)", "percentage": 0.75}]
+
+
+def test_line_vertices_and_scatter_centers():
+    axes = (
+        '<g transform="translate(0,200)"><g transform="translate(50,0)"><line class="tick"/><text>0</text></g>'
+        '<g transform="translate(250,0)"><line class="tick"/><text>10</text></g></g>'
+        '<g class="y"><g class="tick" transform="translate(50,200)"><text>0</text></g>'
+        '<g class="tick" transform="translate(50,100)"><text>1</text></g></g>'
+        '<path class="domain" d="M50,6V0H250V6" stroke="#000"/>'
+    )
+    rows = svg_reference_rows("line", _svg(axes + '<path d="M50,200L150,100L250,150" fill="none" stroke="blue"/>'))
+    assert [(row["x"], row["y"]) for row in rows] == [(0, 0), (5, 1), (10, 0.5)]
+    assert {row["category"] for row in rows} == {"RGB(0, 0, 255)"}
+
+    rows = svg_reference_rows("scatter", _svg(axes + '<circle cx="150" cy="150" r="3"/>'))
+    assert rows == [{"x": 5.0, "y": 0.5, "category": "RGB(0, 0, 0)"}]
+    with pytest.raises(ValueError):
+        svg_reference_rows("scatter", _svg(axes))
+
+
+def test_compare_line_by_interpolation():
+    reference = [{"x": 0, "y": 0, "category": "a"}, {"x": 10, "y": 10, "category": "a"},
+                 {"x": 0, "y": 20, "category": "b"}, {"x": 10, "y": 20, "category": "b"}]
+    # 重采样得到的点数不同也可比较; 分类错误的点按同色折线计算误差
+    rows = [{"x": 5, "y": 5.2, "category": "a"}, {"x": 2.5, "y": 20, "category": "b"}, {"x": 7.5, "y": 19, "category": "a"}]
+    result = compare_to_reference("line", rows, reference)
+    assert result["rows"] == 3 and result["expected_rows"] == 4
+    assert result["value_error"] == pytest.approx(11.5 / 20)
+    assert result["category_accuracy"] == pytest.approx(2 / 3)
+
+
+def test_compare_without_x_omits_category_accuracy():
+    reference = [{"x": None, "y": 10.0, "category": "a"}, {"x": None, "y": 20.0, "category": "a"}]
+    rows = [{"x": "2020", "y": 19.0, "category": "a"}, {"x": "2020", "y": 10.0, "category": "a"}]
+    result = compare_to_reference("bar", rows, reference)
+    assert result == {"rows": 2, "expected_rows": 2, "value_error": 0.05}
+
+
+def _report(relative: dict, charts: dict) -> dict:
+    return {"charts": charts, "relative": relative, "calibration": 0.05}
+
+
+def test_known_failures_and_latency_floor():
+    baseline = _report({"convert": 1.0, "extract": 0.5, "store": 0.02},
+                       {"line/a": {"error": "AxisCalibrationError: x"}, "bar/b": {"value_error": 0.01}})
+    report = _report({"convert": 1.0, "extract": 0.5, "store": 0.06},
+                     {"line/a": {"error": "AxisCalibrationError: x"}, "bar/b": {"value_error": 0.01}})
+    # 基线中已失败的图表不算回归; 很小的阶段变慢数倍, 但不到全部阶段总耗时的 5%, 视为噪声
+    assert find_regressions(report, baseline) == []
+
+    report["relative"]["extract"] = 0.8
+    report["charts"]["bar/b"] = {"error": "ValueError: boom"}
+    regressions = find_regressions(report, baseline)
+    assert regressions[0].startswith("bar/b: 处理失败")
+    assert regressions[1].startswith("阶段 extract")
+
+
+def test_repeat_must_discard_warm_up():
+    with pytest.raises(ValueError):
+        golden_set.run_golden_set(repeat=1)
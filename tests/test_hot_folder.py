@@ -0,0 +1,74 @@
+import os
+import shutil
+
+import pytest
+
+import hot_folder
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def inbox(tmp_path, monkeypatch):
+    """临时工作目录: 只有 1351_0_pc 与 1355_0_pc 的 SVG, metadata 尚未到达"""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("input_data/bar")
+    os.makedirs("intermediate_data/raw_meta_data/bar")
+    for name in ["1351_0_pc", "1355_0_pc"]:
+        shutil.copy(os.path.join(root, "input_data", "bar", name + ".svg"), "input_data/bar")
+    return tmp_path
+
+
+def _metadata_arrives():
+    shutil.copy(os.path.join(root, "intermediate_data/raw_meta_data/bar/1351_0_pc.json"), "intermediate_data/raw_meta_data/bar")
+
+
+def test_chart_version_needs_both_halves_and_prefers_svg():
+    svg, simvec, metadata = ("a.svg", (1, 10)), ("a.txt", (2, 20)), ("a.json", (3, 30))
+    assert hot_folder.chart_version({"svg": svg}) is None
+    assert hot_folder.chart_version({"metadata": metadata}) is None
+    assert hot_folder.chart_version({"simvec": simvec, "metadata": metadata}) == ((2, 20), (3, 30))
+    # 由 SVG 生成的 raw_simvec 不改变版本
+    assert hot_folder.chart_version({"svg": svg, "simvec": simvec, "metadata": metadata}) == ((1, 10), (3, 30))
+
+
+def test_once_processes_only_complete_pairs(inbox):
+    # 只有一半的图表不处理, 也不转换 SVG
+    assert hot_folder.watch(["bar"], workers=1, interval=0.01, once=True) == []
+    assert not os.path.exists("intermediate_data/raw_simvec_data")
+
+    _metadata_arrives()
+    results = hot_folder.watch(["bar"], workers=1, interval=0.01, once=True)
+    assert [(r["chart"], r["status"]) for r in results] == [("1351_0_pc", "ok")]
+    assert os.path.exists("intermediate_data/raw_simvec_data/bar/1351_0_pc.txt")
+    assert os.path.exists("intermediate_data/extracted_data/bar/1351_0_pc.txt")
+    assert not os.path.exists("intermediate_data/raw_simvec_data/bar/1355_0_pc.txt")
+
+    # 再次运行时各阶段命中缓存; skip_existing 时已存在的图表不再处理
+    results = hot_folder.watch(["bar"], workers=1, interval=0.01, once=True)
+    assert results[0]["cached_stages"] == ["simvec", "metadata", "extract"]
+    assert hot_folder.watch(["bar"], workers=1, interval=0.01, skip_existing=True, once=True) == []
+
+
+def test_waits_until_metadata_settles(inbox, monkeypatch):
+    # 模拟第一次轮询时 metadata 正在写入 (签名与之后不同)
+    _metadata_arrives()
+    real_scan = hot_folder.scan_inputs
+    scans = []
+
+    def scan_inputs(selected_types: list) -> dict:
+        charts = real_scan(selected_types)
+        files = charts[("bar", "1351_0_pc")]
+        if not scans:
+            files["metadata"] = (files["metadata"][0], (0, 1))
+        # 记录轮询时是否已开始处理 (处理的第一步是把 SVG 转换为 raw_simvec)
+        scans.append((hot_folder.chart_version(files), os.path.exists("intermediate_data/raw_simvec_data/bar/1351_0_pc.txt")))
+        return charts
+
+    monkeypatch.setattr(hot_folder, "scan_inputs", scan_inputs)
+    results = hot_folder.watch(["bar"], workers=1, interval=0.01, once=True)
+    assert [(r["chart"], r["status"]) for r in results] == [("1351_0_pc", "ok")]
+    # 第 2 次轮询时签名刚变化, 第 3 次不变才进入队列
+    versions, started = zip(*scans)
+    assert versions[0] != versions[1] == versions[2] == versions[-1]
+    assert started[:3] == (False, False, False) and started[-1]
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+import instrumentation
+from simvec_tokenizer import tokenize_simvec
+from text_index import AxisCalibrationError
+
+
+@pytest.fixture(autouse=True)
+def clean_records():
+    instrumentation.take_records()
+    yield
+    instrumentation.take_records()
+
+
+def test_stage_accumulates_time_and_records_failures():
+    with instrumentation.stage("bar", "1", "extract"):
+        pass
+    with instrumentation.stage("bar", "1", "extract"):
+        pass
+    with pytest.raises(AxisCalibrationError):
+        with instrumentation.stage("bar", "1", "fit"):
+            raise AxisCalibrationError("y", "刻度不足")
+    with pytest.raises(KeyError):
+        with instrumentation.stage("bar", "1", "write"):
+            raise KeyError("x")
+
+    record, = instrumentation.take_records()
+    assert set(record["stages"]) == {"extract", "fit", "write"}
+    assert all(seconds >= 0 for seconds in record["stages"].values())
+    assert record["calibration_failures"] == [{"stage": "fit", "axis": "y", "error": "刻度不足"}]
+    assert record["errors"] == [{"stage": "write", "error": "KeyError: 'x'"}]
+    assert instrumentation.take_records() == []
+
+
+def test_primitive_and_fallback_category_counts():
+    columns = tokenize_simvec("rect (255,0,0) [1,2,3,4]\nrect (0,0,255) [5,6,3,4]\nline (0,0,0) 1,1;2,2;3,3\ntext a [1,1,1,1]")
+    instrumentation.record_primitives("line", "2", columns)
+    instrumentation.record_categories("line", "2", ["Sales", "Unknown", "RGB(1, 2, 3)", "RGBNone"], [5, 2, 1, 1])
+    record, = instrumentation.take_records()
+    assert record["primitives"]["rect"] == 2 and record["primitives"]["text"] == 1
+    assert record["primitives"]["line"] == 1 and record["primitives"]["line_points"] == 3
+    assert record["categories"] == 9 and record["fallback_categories"] == 4
+
+
+def test_prometheus_snapshot_sums_per_chart_type():
+    records = [
+        {"chart_type": "bar", "chart": "a\"b", "stages": {"extract": 0.5}, "primitives": {"rect": 3},
+         "categories": 2, "fallback_categories": 1, "calibration_failures": [], "errors": []},
+        {"chart_type": "bar", "chart": "c", "stages": {"extract": 0.25}, "primitives": {"rect": 4}, "categories": 0,
+         "fallback_categories": 0, "calibration_failures": [{"stage": "fit", "axis": "x", "error": ""}], "errors": []},
+    ]
+    lines = instrumentation.prometheus_snapshot(records, "pipeline").splitlines()
+    assert 'simvec_stage_seconds_total{source="pipeline",chart_type="bar",stage="extract"} 0.75' in lines
+    assert 'simvec_stage_runs_total{source="pipeline",chart_type="bar",stage="extract"} 2' in lines
+    assert 'simvec_primitives_total{source="pipeline",chart_type="bar",kind="rect"} 7' in lines
+    assert 'simvec_charts_total{source="pipeline",chart_type="bar",status="failed"} 1' in lines
+    assert 'simvec_axis_calibration_failures_total{source="pipeline",chart_type="bar",axis="x"} 1' in lines
+    # 每个指标都带有 HELP 与 TYPE
+    assert sum(line.startswith("# TYPE ") for line in lines) == 7
+    assert instrumentation._labels(chart='a"b\\c') == '{chart="a\\"b\\\\c"}'
+
+
+def test_flush_appends_log_and_replaces_snapshot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for chart in ["1", "2"]:
+        with instrumentation.stage("pie", chart, "extract"):
+            pass
+        instrumentation.flush("pie_data_extractor")
+    assert instrumentation.flush("pie_data_extractor") == []
+
+    with open(instrumentation.json_log_path, encoding="utf-8") as f:
+        logged = [json.loads(line) for line in f]
+    assert [(r["source"], r["chart"]) for r in logged] == [("pie_data_extractor", "1"), ("pie_data_extractor", "2")]
+    # 快照只反映最近一次写出的记录, 临时文件已被替换
+    with open(tmp_path / instrumentation.log_directory / "pie_data_extractor.prom", encoding="utf-8") as f:
+        assert 'simvec_stage_runs_total{source="pie_data_extractor",chart_type="pie",stage="extract"} 1' in f.read()
+    assert not list((tmp_path / instrumentation.log_directory).glob("*.tmp"))
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from line_data_extractor import extract_line_data, extract_line_series
+from simvec_tokenizer import tokenize_simvec
+
+# X 轴刻度 0..40 在 x = 50..450 (每 10 像素为 1), Y 轴刻度 0..200 在 y = 210..10
+axes = [
+    "line (0,0,0) 50,10;50,210",
+    "line (0,0,0) 50,210;450,210",
+] + [f"text {value} [{50 + 10 * value},225,10,10]" for value in (0, 10, 20, 30, 40)] \
+  + [f"text {value} [40,{210 - value},18,10]" for value in (0, 100, 200)]
+metadata = {"xAxis": {"ticks": ["0", "10", "20", "30", "40"]}, "yAxis": {"ticks": ["0", "100", "200"]}}
+
+# 顶点 (0.5, 5), (7.5, 75), (22.5, 125), (27.5, 25), 按 X 从大到小绘制
+chart = tokenize_simvec("\n".join(axes + ["line (255,0,0) 325,185;275,85;125,135;55,205"]))
+
+
+def test_vertices_mapped_through_fitted_axes():
+    (category, xs, ys), = extract_line_series(metadata, chart)
+    assert category == "RGB(255, 0, 0)"
+    np.testing.assert_allclose(xs, [27.5, 22.5, 7.5, 0.5])
+    np.testing.assert_allclose(ys, [25, 125, 75, 5])
+
+
+def test_resample_interpolates_at_ticks_within_the_line():
+    # 只取折线 X 范围 [0.5, 27.5] 内的刻度 10 / 20, 顶点先按 X 排序再插值
+    (_, xs, ys), = extract_line_series(metadata, chart, resample=True)
+    np.testing.assert_allclose(xs, [10, 20])
+    np.testing.assert_allclose(ys, [75 + 50 * 2.5 / 15, 75 + 50 * 12.5 / 15])
+    rows = extract_line_data(metadata, chart, resample=True)
+    assert rows[0] == {"x": 10.0, "y": pytest.approx(83.33), "category": "RGB(255, 0, 0)"}
+
+
+def test_resample_without_ticks_in_range():
+    short = tokenize_simvec("\n".join(axes + ["line (255,0,0) 60,200;90,170"]))
+    (_, xs, ys), = extract_line_series(metadata, short, resample=True)
+    assert len(xs) == 0 and len(ys) == 0
+    assert len(extract_line_data(metadata, short)) == 2
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from metadata_inference import infer_metadata, uncalibrated_score, write_inferred
+from simvec_tokenizer import tokenize_simvec
+
+# 堆叠柱状图: 标题在最上方, 右侧图例, Y 轴名称为竖排文本
+stacked = [
+    "text Quarterly_sales [260,10,120,12]",
+    "line (0,0,0) 50,30;50,210",
+    "line (0,0,0) 50,210;350,210",
+    "rect (255,0,0) [100,160,30,50]",
+    "rect (0,0,255) [100,130,30,30]",
+    "rect (255,0,0) [200,190,30,20]",
+    "rect (0,0,255) [200,150,30,40]",
+    "rect (255,0,0) [300,170,30,40]",
+    "rect (0,0,255) [300,120,30,50]",
+    "rect (255,0,0) [405,60,10,10]",
+    "rect (0,0,255) [405,80,10,10]",
+    "text North [440,60,30,10]",
+    "text South [440,80,30,10]",
+    "text 0 [40,210,6,10]",
+    "text 100 [40,120,18,10]",
+    "text 200 [40,30,18,10]",
+    "text Q1 [106,225,12,10]",
+    "text Q2 [206,225,12,10]",
+    "text Q3 [306,225,12,10]",
+    "text Quarter [220,245,40,10]",
+    "text USD [15,110,10,30]",
+]
+
+
+def test_stacked_bar_with_legend_title_and_axis_names():
+    metadata, confidence = infer_metadata(tokenize_simvec("\n".join(stacked)))
+    assert metadata == {
+        "chartType": "Stacked Bar Chart",
+        "title": "Quarterly sales",
+        "xAxis": {"name": "Quarter", "ticks": ["Q1", "Q2", "Q3"], "type": "Categorical"},
+        "yAxis": {"name": "USD", "ticks": ["0", "100", "200"], "type": "Quantitative"},
+        "legend": {"items": ["North", "South"], "colors": ["#FF0000", "#0000FF"]},
+    }
+    assert confidence >= 0.8
+
+
+def test_line_chart_axes_are_quantitative():
+    lines = [
+        "line (0,0,0) 50,10;50,210",
+        "line (0,0,0) 50,210;350,210",
+        "line (255,0,0) 50,200;150,120;250,150;350,40",
+        "text 0 [40,210,6,10]", "text 50 [40,110,12,10]", "text 100 [40,10,18,10]",
+        "text 0 [53,225,6,10]", "text 10 [156,225,12,10]", "text 20 [256,225,12,10]", "text 30 [356,225,12,10]",
+    ]
+    metadata, confidence = infer_metadata(tokenize_simvec("\n".join(lines)))
+    assert metadata["chartType"] == "Line Chart" and metadata["legend"] is None
+    assert metadata["xAxis"]["ticks"] == ["0", "10", "20", "30"] and metadata["xAxis"]["type"] == "Quantitative"
+    assert metadata["yAxis"]["ticks"] == ["0", "50", "100"]
+    assert confidence == pytest.approx(1.0)
+
+
+def test_ticks_that_cannot_calibrate_lower_confidence():
+    # Y 轴刻度不是数值时, 抽取模块无法拟合比例, 交给模型处理
+    lines = [line for line in stacked if not line.startswith("text 0 ") and not line.startswith("text 100 ")
+             and not line.startswith("text 200 ")]
+    lines += ["text low [40,210,18,10]", "text mid [40,120,18,10]", "text high [40,30,24,10]"]
+    metadata, confidence = infer_metadata(tokenize_simvec("\n".join(lines)))
+    assert metadata["yAxis"]["type"] == "Categorical"
+    assert confidence <= uncalibrated_score
+
+
+def test_single_swatch_is_not_a_legend_for_several_colors():
+    lines = [line for line in stacked if "North" not in line and "[405,60," not in line]
+    metadata, confidence = infer_metadata(tokenize_simvec("\n".join(lines)))
+    assert metadata["legend"] is None
+    assert confidence <= 0.5
+
+
+def test_write_inferred_adds_confidence(tmp_path):
+    path = tmp_path / "bar" / "1.json"
+    write_inferred({"chartType": "Bar Chart"}, 0.9, str(path))
+    assert json.loads(path.read_text(encoding="utf-8")) == {"chartType": "Bar Chart", "confidence": 0.9}
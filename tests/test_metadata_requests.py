@@ -0,0 +1,157 @@
+import io
+import json
+import os
+import threading
+import urllib.error
+
+import pytest
+
+import metadata_requests
+from metadata_requests import check_metadata, request_key
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+metadata = {
+    "chartType": "Bar Chart",
+    "title": None,
+    "xAxis": {"name": None, "ticks": ["A", "B"], "type": "Categorical"},
+    "yAxis": {"name": "Sales", "ticks": ["0", "100"], "type": "Quantitative"},
+    "legend": None,
+}
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """在临时目录中运行: 一张带 SimVec 的柱状图, 请求、索引与缓存都写在临时目录下"""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("prompt")
+    with open(metadata_requests.prompt_path, "w", encoding="utf-8") as f:
+        f.write("output the chart metadata as JSON")
+    os.makedirs("intermediate_data/raw_simvec_data/bar")
+    with open("intermediate_data/raw_simvec_data/bar/chart.txt", "w", encoding="utf-8") as f:
+        f.write("rect (255,0,0) [100,60,30,150]\ntext A [103,220,6,10]")
+    return tmp_path
+
+
+def _output(value) -> str:
+    return "json\n" + json.dumps(value, indent=2)
+
+
+def test_request_key_follows_prompt_model_and_budget():
+    key = request_key("abc", "prompt")
+    assert key == request_key("abc", "prompt", None, None)
+    assert len({key, request_key("abc", "prompt v2"), request_key("abc", "prompt", "model-b"),
+                request_key("abc", "prompt", None, 1500), request_key("abd", "prompt")}) == 5
+
+
+def test_check_metadata():
+    for path in ("bar/34_0_pc.json", "pie/customer-service-satisfa.json"):
+        with open(os.path.join(root, "intermediate_data", "raw_meta_data", path), "r", encoding="utf-8") as f:
+            check_metadata(json.load(f))
+    assert check_metadata(metadata) is metadata
+    for broken in (
+        [],
+        {field: None for field in metadata_requests.metadata_fields},
+        {key: value for key, value in metadata.items() if key != "legend"},
+        {**metadata, "xAxis": {"ticks": ["A"]}},
+        {**metadata, "legend": {"items": "A", "colors": ["#FF0000"]}},
+    ):
+        with pytest.raises(ValueError):
+            check_metadata(broken)
+
+
+def test_build_keys_requests_on_prompt_and_budget(workspace):
+    first = metadata_requests.build_requests(["bar"])
+    assert list(first.values()) == [[["bar", "chart"]]]
+    # 预算与模型变化后生成新的请求 id, 旧的缓存不会被复用
+    assert metadata_requests.build_requests(["bar"], simvec_budget=50).keys() != first.keys()
+    assert metadata_requests.build_requests(["bar"], model="model-b").keys() != first.keys()
+    with open(os.path.join(metadata_requests.request_directory, "batch-00000.jsonl"), "r", encoding="utf-8") as f:
+        request = json.loads(f.readline())
+    assert request["model"] == "model-b" and request["id"] in metadata_requests.build_requests(["bar"], model="model-b")
+
+
+def test_send_skips_error_and_partial_responses(workspace, monkeypatch):
+    index = metadata_requests.build_requests(["bar"])
+    key = next(iter(index))
+    responses = [
+        {"id": key, "error": "rate limited"},
+        {"id": key, "output": "sorry, I cannot see the image"},
+        {"id": key, "output": _output({field: None for field in metadata_requests.metadata_fields})},
+        {"id": key, "output": _output(metadata)},
+    ]
+
+    def fake_urlopen(request):
+        return io.BytesIO((json.dumps(responses.pop(0)) + "\n").encode("utf-8"))
+
+    monkeypatch.setattr(metadata_requests.urllib.request, "urlopen", fake_urlopen)
+    cache_path = os.path.join(metadata_requests.cache_directory, key + ".json")
+    for _ in range(3):
+        assert metadata_requests.send_batches() == 0
+        assert not os.path.exists(cache_path)
+    assert metadata_requests.send_batches() == 1
+    # 已缓存的请求不再发送
+    assert metadata_requests.send_batches() == 0
+
+    def failing_urlopen(request):
+        raise urllib.error.HTTPError(request.full_url, 503, "busy", {}, None)
+
+    os.remove(cache_path)
+    monkeypatch.setattr(metadata_requests.urllib.request, "urlopen", failing_urlopen)
+    assert metadata_requests.send_batches() == 0 and not os.path.exists(cache_path)
+
+
+def test_split_skips_incomplete_responses(workspace):
+    index = metadata_requests.build_requests(["bar"])
+    key = next(iter(index))
+    output_path = os.path.join("intermediate_data", "raw_meta_data", "bar", "chart.json")
+    os.makedirs(os.path.dirname(output_path))
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f)
+
+    # 旧版本缓存中的空结果不会覆盖已有的 metadata
+    os.makedirs(metadata_requests.cache_directory)
+    cache_path = os.path.join(metadata_requests.cache_directory, key + ".json")
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump({"id": key, "output": _output({**metadata, "chartType": None})}, f)
+    assert metadata_requests.split_responses(overwrite=True) == 0
+    with open(output_path, "r", encoding="utf-8") as f:
+        assert json.load(f) == metadata
+
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump({"id": key, "output": _output({**metadata, "title": "Sales"})}, f)
+    assert metadata_requests.split_responses(overwrite=True) == 1
+    with open(output_path, "r", encoding="utf-8") as f:
+        assert json.load(f)["title"] == "Sales"
+
+
+def test_budgeted_requests_round_trip_through_mock(workspace):
+    # 已知图表: 压缩后的请求经替身服务与 split 写回完整、相同的 metadata
+    output_path = os.path.join("intermediate_data", "raw_meta_data", "bar", "chart.json")
+    os.makedirs(os.path.dirname(output_path))
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f)
+    with open("intermediate_data/raw_simvec_data/bar/chart.txt", "a", encoding="utf-8") as f:
+        f.write("\nline (0,0,0) 50,10;50,210\nrect (255,0,0) [100,60,30,150]")
+
+    index = metadata_requests.build_requests(["bar"], overwrite=True, simvec_budget=20)
+    with open(os.path.join(metadata_requests.request_directory, "batch-00000.jsonl"), "r", encoding="utf-8") as f:
+        request = json.loads(f.readline())
+    with open("intermediate_data/raw_simvec_data/bar/chart.txt", "r", encoding="utf-8") as f:
+        assert request["content"] != f.read()
+
+    server = metadata_requests.mock_server(port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        endpoint = f"http://127.0.0.1:{server.server_address[1]}/v1/batch"
+        assert metadata_requests.send_batches(endpoint) == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    os.remove(output_path)
+    assert metadata_requests.split_responses() == 1
+    with open(output_path, "r", encoding="utf-8") as f:
+        assert check_metadata(json.load(f)) == metadata
+    assert list(index) == [request["id"]]
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from pie_geometry import find_center, group_slices, swept_angles
+
+center = (100.0, 100.0)
+
+
+def _arc(degrees: list, radius: float = 50.0) -> list:
+    radians = np.radians(degrees)
+    return [[center[0] + radius * np.cos(a), center[1] + radius * np.sin(a)] for a in radians]
+
+
+def _areas(*areas) -> tuple:
+    points = [point for area in areas for point in area]
+    offsets = np.cumsum([0] + [len(area) for area in areas])
+    return np.array(points), offsets
+
+
+def test_two_vertex_arcs_follow_drawing_direction():
+    # 弧线未细分时按 (终点角 - 起点角) mod 360, 大于 180° 的扇形同样正确
+    points, offsets = _areas(
+        [list(center)] + _arc([0, 90]),
+        [list(center)] + _arc([90, 0]),
+        [list(center)] + _arc([350, 20]),
+    )
+    np.testing.assert_allclose(swept_angles(points, offsets, center), [90, 270, 30])
+
+
+def test_subdivided_arcs_accumulate_steps():
+    points, offsets = _areas(
+        [list(center)] + _arc(range(0, 301, 60)),
+        [list(center)] + _arc([300, 330, 0, 30]) + [list(center)],
+    )
+    np.testing.assert_allclose(swept_angles(points, offsets, center), [300, 90])
+
+
+def test_ring_order_does_not_matter():
+    # 环从弧中间开始时, 先旋转到圆心之后, 弧上顶点依次为圆心的两个邻点之间
+    arc = _arc(range(0, 181, 30))
+    points, offsets = _areas(
+        arc[3:] + [list(center)] + arc[:3],
+        arc[5:] + [list(center), list(center)] + arc[:5],
+        # 浏览器导出的饼图: 弧起点, 弧终点, 圆心, 圆心
+        _arc([0, 90]) + [list(center), list(center)],
+    )
+    np.testing.assert_allclose(swept_angles(points, offsets, center), [180, 180, 90])
+
+
+def test_counter_clockwise_winding():
+    # 细分的弧按增量绝对值计算, 并决定未细分扇形的方向
+    points, offsets = _areas(
+        [list(center)] + _arc([90, 60, 30, 0]),
+        [list(center)] + _arc([0, 270]),
+    )
+    np.testing.assert_allclose(swept_angles(points, offsets, center), [90, 90])
+
+    # 全部未细分时取各扇形之和最接近 360° 的方向
+    points, offsets = _areas(
+        [list(center)] + _arc([0, 300]),
+        [list(center)] + _arc([300, 180]),
+        [list(center)] + _arc([180, 0]),
+    )
+    np.testing.assert_allclose(swept_angles(points, offsets, center), [60, 120, 180])
+
+
+def test_areas_without_two_arc_vertices_are_nan():
+    points, offsets = _areas(
+        [list(center)] + _arc([10]),
+        [list(center)] + _arc([0, 45]),
+        [list(center)],
+    )
+    angles = swept_angles(points, offsets, center)
+    assert np.isnan(angles[0]) and np.isnan(angles[2])
+    assert angles[1] == pytest.approx(45)
+
+
+def test_find_center_and_group_slices():
+    points, _ = _areas([list(center)] + _arc([0, 90]), [list(center)] + _arc([90, 180]))
+    assert find_center(points) == center
+    with pytest.raises(ValueError):
+        find_center(np.empty((0, 2)))
+    grouped = group_slices(["red", "blue", "red", "blue"], np.array([90.0, np.nan, 45.0, 10.0]))
+    assert grouped == {"red": (0, 135.0), "blue": (3, 10.0)}
@@ -0,0 +1,99 @@
+import argparse
+import json
+import os
+import shutil
+
+import pytest
+
+import build_cache
+import data_formatter
+import pipeline
+from bar_data_extractor import extract_bar_data
+from simvec_storage import binary_extension
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    """在临时目录中放入一对完整的柱状图, 各缺一半的两个图表, 以及一个无法抽取的图表"""
+    monkeypatch.chdir(tmp_path)
+    raw = os.path.join(root, "intermediate_data")
+    for kind, name, extension in [("raw_simvec_data", "1351_0_pc", ".txt"), ("raw_meta_data", "1351_0_pc", ".json"),
+                                  ("raw_simvec_data", "1355_0_pc", ".txt"), ("raw_meta_data", "34_0_pc", ".json"),
+                                  ("raw_meta_data", "1351_0_pc", ".json")]:
+        os.makedirs(os.path.join("intermediate_data", kind, "bar"), exist_ok=True)
+        shutil.copy(os.path.join(raw, kind, "bar", name + extension), os.path.join("intermediate_data", kind, "bar"))
+    shutil.copy(os.path.join(raw, "raw_meta_data", "bar", "1351_0_pc.json"), "intermediate_data/raw_meta_data/bar/broken.json")
+    with open("intermediate_data/raw_simvec_data/bar/broken.txt", "w", encoding="utf-8") as f:
+        f.write("rect (255,0,0) [10,10,5,5]")
+    return tmp_path
+
+
+def _statuses(results: list) -> dict:
+    return {r["chart"]: r["status"] for r in results}
+
+
+def test_list_charts_takes_union_of_both_halves(corpus):
+    assert pipeline.list_charts(["bar", "pie"]) == [
+        ("bar", "1351_0_pc"), ("bar", "1355_0_pc"), ("bar", "34_0_pc"), ("bar", "broken"),
+    ]
+
+
+def test_run_reports_each_chart_and_matches_direct_extraction(corpus):
+    results = pipeline.run_pipeline(["bar"], workers=2)
+    assert _statuses(results) == {"1351_0_pc": "ok", "1355_0_pc": "skipped", "34_0_pc": "skipped", "broken": "failed"}
+    errors = {r["chart"]: r["error"] for r in results}
+    assert errors["1355_0_pc"] == "缺少 raw_meta 文件" and errors["34_0_pc"] == "缺少 raw_simvec 文件"
+    assert "traceback" in next(r for r in results if r["chart"] == "broken")
+
+    # 进程池中的结果与在本进程内直接抽取的一致
+    metadata, columns = data_formatter.load_raw_chart("intermediate_data/raw_simvec_data/bar/1351_0_pc.txt",
+                                                      "intermediate_data/raw_meta_data/bar/1351_0_pc.json", "bar", "1351_0_pc")
+    with open("intermediate_data/extracted_data/bar/1351_0_pc.txt", encoding="utf-8") as f:
+        rows = [json.loads(line.rstrip(",")) for line in f.read().splitlines()[1:]]
+    assert rows == extract_bar_data(metadata, columns)
+
+    # 失败的图表不写入清单, 下次完整重跑
+    charts = build_cache.load_manifest()["charts"]
+    assert "bar/1351_0_pc" in charts and "bar/broken" not in charts
+
+
+def test_incremental_run_skips_unchanged_stages(corpus):
+    pipeline.run_pipeline(["bar"], workers=1, incremental=True)
+    results = pipeline.run_pipeline(["bar"], workers=1, incremental=True)
+    cached = {r["chart"]: r["cached_stages"] for r in results if r["status"] == "ok"}
+    assert cached == {"1351_0_pc": ["simvec", "metadata", "extract"]}
+
+
+def test_in_memory_mode_matches_disk_mode_without_cleaned_files(corpus):
+    pipeline.run_pipeline(["bar"], workers=1, vega_lite=True)
+    with open("intermediate_data/extracted_data/bar/1351_0_pc.txt", encoding="utf-8") as f:
+        disk_rows = f.read()
+    with open("intermediate_data/vega_lite/bar/1351_0_pc.json", encoding="utf-8") as f:
+        disk_spec = f.read()
+    shutil.rmtree("intermediate_data/cleaned_simvec_data")
+    shutil.rmtree("intermediate_data/cleaned_meta_data")
+    shutil.rmtree("intermediate_data/extracted_data")
+    os.remove("intermediate_data/vega_lite/bar/1351_0_pc.json")
+
+    results = pipeline.run_pipeline(["bar"], workers=1, vega_lite=True, in_memory=True)
+    assert _statuses(results) == {"1351_0_pc": "ok", "1355_0_pc": "skipped", "34_0_pc": "skipped", "broken": "failed"}
+    assert not any(name.startswith("cleaned_") for name in os.listdir("intermediate_data"))
+    with open("intermediate_data/extracted_data/bar/1351_0_pc.txt", encoding="utf-8") as f:
+        assert f.read() == disk_rows
+    with open("intermediate_data/vega_lite/bar/1351_0_pc.json", encoding="utf-8") as f:
+        assert f.read() == disk_spec
+
+    # 调试时仍可写出中间文件; 增量模式下以 in_memory 阶段整体跳过
+    pipeline.run_pipeline(["bar"], workers=1, in_memory=True, keep_intermediates=True, incremental=True)
+    assert os.path.exists("intermediate_data/cleaned_simvec_data/bar/1351_0_pc" + binary_extension)
+    assert os.path.exists("intermediate_data/cleaned_meta_data/bar/1351_0_pc.json")
+    results = pipeline.run_pipeline(["bar"], workers=1, in_memory=True, keep_intermediates=True, incremental=True)
+    assert next(r for r in results if r["chart"] == "1351_0_pc")["cached_stages"] == ["in_memory"]
+
+def test_resample_option_reaches_only_line_charts():
+    # 散点图的选项见 test_scatter_data_extractor.py
+    parser = argparse.ArgumentParser()
+    pipeline.add_extractor_arguments(parser)
+    assert pipeline.extractor_options_from_args(parser.parse_args(["--resample"])) == {"line": {"resample": True}}
@@ -0,0 +1,83 @@
+import argparse
+
+import numpy as np
+import pytest
+
+import pipeline
+from scatter_data_extractor import extract_scatter_data, grid_unique, histogram_rows
+from simvec_tokenizer import tokenize_simvec
+
+
+def test_grid_unique_uses_float_centers():
+    centers = np.array([[10.2, 5.0], [10.8, 5.4], [10.9, 5.0], [11.1, 5.0], [10.5, 5.5]])
+    codes = np.array([0, 0, 0, 0, 1])
+    # 同一像素单元内的亚像素点合并, 跨单元边界的点保留, 不同分类互不影响
+    assert grid_unique(centers, codes).tolist() == [0, 3, 4]
+    # 更大的单元合并更多的点, 保持原有顺序
+    assert grid_unique(centers, codes, cell=4.0).tolist() == [0, 4]
+    assert grid_unique(centers, codes, cell=0.5).tolist() == [0, 1, 3, 4]
+
+
+def test_grid_unique_empty_and_invalid_cell():
+    assert grid_unique(np.empty((0, 2)), np.empty(0, dtype=np.int64)).tolist() == []
+    with pytest.raises(ValueError):
+        grid_unique(np.zeros((1, 2)), np.zeros(1, dtype=np.int64), cell=0)
+
+
+def test_histogram_rows_counts_per_category():
+    xs = np.array([0.0, 1.0, 9.0, 10.0, 10.0])
+    ys = np.array([0.0, 0.0, 10.0, 10.0, 0.0])
+    codes = np.array([0, 0, 0, 0, 1])
+    rows = histogram_rows(xs, ys, codes, ["a", "b"], bins=2)
+    assert rows == [
+        {"x": 2.5, "y": 2.5, "count": 2, "category": "a"},
+        {"x": 7.5, "y": 7.5, "count": 2, "category": "a"},
+        {"x": 7.5, "y": 2.5, "count": 1, "category": "b"},
+    ]
+    assert histogram_rows(np.empty(0), np.empty(0), np.empty(0, dtype=np.int64), [], bins=4) == []
+
+
+def test_extract_dedup_and_bins():
+    # 两个轴都是 1 像素 = 1 个单位; 第二个红点与第一个在同一个像素单元内, 蓝点与红点重合但分类不同
+    chart = tokenize_simvec("\n".join([
+        "line (0,0,0) 50,10;50,210",
+        "line (0,0,0) 50,210;250,210",
+        "circle (255,0,0) [60,200,4,4]",
+        "circle (255,0,0) [60.4,200.3,4,4]",
+        "circle (255,0,0) [140,120,4,4]",
+        "circle (0,0,255) [60,200,4,4]",
+        "circle (0,0,255) [110,170,4,4]",
+        "text 0 [40,210,6,10]",
+        "text 100 [40,110,18,10]",
+        "text 0 [50,225,6,10]",
+        "text 100 [150,225,18,10]",
+    ]))
+    metadata = {"xAxis": {"ticks": ["0", "100"]}, "yAxis": {"ticks": ["0", "100"]},
+                "legend": {"items": ["Red", "Blue"], "colors": ["#FF0000", "#0000FF"]}}
+    points = [(row["x"], row["y"], row["category"]) for row in extract_scatter_data(metadata, chart)]
+    assert points == [(10, 10, "Red"), (10, 10, "Red"), (90, 90, "Red"), (10, 10, "Blue"), (60, 40, "Blue")]
+    deduplicated = extract_scatter_data(metadata, chart, dedup=True)
+    assert [(row["x"], row["y"], row["category"]) for row in deduplicated] == [points[0]] + points[2:]
+
+    # 数据范围 10 ~ 90 分成 2 x 2 个单元, 单元中心为 30 / 70
+    assert extract_scatter_data(metadata, chart, bins=2) == [
+        {"x": 30.0, "y": 30.0, "count": 1, "category": "Blue"},
+        {"x": 70.0, "y": 30.0, "count": 1, "category": "Blue"},
+        {"x": 30.0, "y": 30.0, "count": 2, "category": "Red"},
+        {"x": 70.0, "y": 70.0, "count": 1, "category": "Red"},
+    ]
+    assert extract_scatter_data(metadata, chart, dedup=True, bins=2)[2]["count"] == 1
+    with pytest.raises(ValueError):
+        extract_scatter_data(metadata, chart, bins=-1)
+
+
+def test_pipeline_scatter_options():
+    parser = argparse.ArgumentParser()
+    pipeline.add_extractor_arguments(parser)
+    assert pipeline.extractor_options_from_args(parser.parse_args([])) == {}
+    assert pipeline.extractor_options_from_args(parser.parse_args(["--dedup"])) == {
+        "scatter": {"dedup": True, "bins": 0},
+    }
+    assert pipeline.extractor_options_from_args(parser.parse_args(["--dedup", "--dedup-cell", "4"])) == {
+        "scatter": {"dedup": True, "bins": 0, "dedup_cell": 4.0},
+    }
@@ -0,0 +1,90 @@
+import json
+import os
+import shutil
+import threading
+
+import pytest
+
+import sharded_io
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def source(tmp_path):
+    """一对完整的柱状图、只有 SimVec 的图表与只有 metadata 的图表"""
+    raw = os.path.join(root, "intermediate_data")
+    for folder, name, extension in [("raw_simvec_data", "1351_0_pc", ".txt"), ("raw_meta_data", "1351_0_pc", ".json"),
+                                    ("raw_simvec_data", "1355_0_pc", ".txt"), ("raw_meta_data", "34_0_pc", ".json")]:
+        directory = tmp_path / "source" / folder / "bar"
+        directory.mkdir(parents=True, exist_ok=True)
+        shutil.copy(os.path.join(raw, folder, "bar", name + extension), directory)
+    return str(tmp_path / "source")
+
+
+def test_parse_member_paths():
+    assert sharded_io._parse_member("shard/raw_simvec_data/bar/1.txt") == ("bar", "1", "simvec")
+    assert sharded_io._parse_member("raw_meta_data\\pie\\2.json") == ("pie", "2", "metadata")
+    assert sharded_io._parse_member("raw_meta_data/pie/2.txt") is None
+    assert sharded_io._parse_member("cleaned_meta_data/pie/2.json") is None
+
+
+@pytest.mark.parametrize("shard_format", ["tar", "zip", "jsonl"])
+def test_pack_and_read_every_format(source, tmp_path, shard_format):
+    paths = sharded_io.pack_corpus(source, str(tmp_path / "shards"), shard_format, charts_per_shard=2, selected_types=["bar"])
+    assert [os.path.basename(path) for path in paths] == [f"raw-00000.{shard_format}", f"raw-00001.{shard_format}"]
+    records = [record for path in paths for record in sharded_io.read_shard(path)]
+    assert [record["chart"] for record in records] == ["1351_0_pc", "1355_0_pc", "34_0_pc"]
+    # 缺少的一半为 None, 其余与原始文件一致
+    with open(os.path.join(source, "raw_simvec_data", "bar", "1351_0_pc.txt"), encoding="utf-8") as f:
+        assert records[0]["simvec"] == f.read()
+    assert records[0]["metadata"]["chartType"] == "Bar Chart"
+    assert records[1]["metadata"] is None and records[2]["simvec"] is None
+
+
+def test_read_ahead_stays_bounded(monkeypatch):
+    # 消费第一个分片时最多已提交 read_ahead + 1 个读取, 输出顺序与分片顺序一致
+    started, lock = [], threading.Lock()
+
+    def fake_read_shard(path: str) -> list:
+        with lock:
+            started.append(path)
+        return [{"chart": f"{path}-{i}"} for i in range(2)]
+
+    monkeypatch.setattr(sharded_io, "read_shard", fake_read_shard)
+    charts = sharded_io.iter_charts([f"s{i}" for i in range(6)], read_ahead=2)
+    assert next(charts) == {"chart": "s0-0"}
+    assert len(started) <= 3
+    assert [chart["chart"] for chart in charts] == ["s0-1"] + [f"s{i}-{j}" for i in range(1, 6) for j in range(2)]
+    assert sorted(started) == [f"s{i}" for i in range(6)]
+
+
+def test_run_sharded_counts_and_ordered_output_shards(source, tmp_path):
+    paths = sharded_io.pack_corpus(source, str(tmp_path / "shards"), "jsonl", charts_per_shard=1, selected_types=["bar"])
+    with open(paths[-1], "a", encoding="utf-8") as f:
+        f.write(json.dumps({"chart_type": "bar", "chart": "broken", "simvec": "rect (255,0,0) [1,1,1,1]",
+                            "metadata": {"xAxis": {"ticks": []}, "yAxis": {"ticks": []}}}) + "\n")
+
+    output = str(tmp_path / "extracted")
+    summary = sharded_io.run_sharded(paths, output, workers=1, charts_per_shard=3, read_ahead=1)
+    assert {key: summary[key] for key in ["ok", "skipped", "failed"]} == {"ok": 1, "skipped": 2, "failed": 1}
+    assert [os.path.basename(path) for path in summary["shards"]] == ["extracted-00000.jsonl", "extracted-00001.jsonl"]
+    assert not [name for name in os.listdir(output) if name.endswith(".tmp")]
+
+    results = []
+    for path in summary["shards"]:
+        with open(path, encoding="utf-8") as f:
+            results.extend(json.loads(line) for line in f)
+    assert [(r["chart"], r["status"]) for r in results] == [
+        ("1351_0_pc", "ok"), ("1355_0_pc", "skipped"), ("34_0_pc", "skipped"), ("broken", "failed"),
+    ]
+    assert results[1]["error"] == "缺少 raw_meta 文件" and results[2]["error"] == "缺少 raw_simvec 文件"
+    assert results[0]["data"][0]["x"] == "2005"
+
+
+def test_extractor_options_fill_only_records_without_their_own(monkeypatch):
+    records = [{"chart_type": "line", "options": {"resample": False}}, {"chart_type": "line"}, {"chart_type": "bar"}]
+    seen = []
+    monkeypatch.setattr(sharded_io, "process_record", lambda record: seen.append(record.get("options")) or {})
+    sharded_io.process_batch(records, {"line": {"resample": True}})
+    assert seen == [{"resample": False}, {"resample": True}, None]
@@ -0,0 +1,90 @@
+import pytest
+
+from simvec_compressor import (
+    _compress_level, compress_simvec, count_tokens, original_primitives, parse_primitives, quantization_steps,
+)
+
+sample = "\n".join([
+    "line (0,0,0) 50,10;50,210",
+    "line (0,0,0) 50,210;450,210",
+    "line (200,200,200) 50,110;450,110",
+    "rect (255,0,0) [80.4,60.2,20,150]",
+    "rect (255,0,0) [120.6,100.1,20,110]",
+    "",
+    "rect (255,0,0) [160.2,30.7,20,180]",
+    "rect (255,0,0) [200.5,90.3,20,120]",
+    "rect (0,0,255) [300,50,20,160]",
+    "rect (0,0,255) [300,50,20,160]",
+    "rect None [0,0,500,300]",
+    "rect (0,255,0) [10,10,0,5]",
+    "line (255,0,0) 5,5;5,5",
+    "text 2020 [90.4,220.0,20,8]",
+    "text 2021 [130.6,220.0,20,8]",
+    "text Sales [260,5,30,8]",
+    "circle (0,0,255) [400,40,3,3]",
+])
+
+
+def _covered_lines(mapping: dict) -> list:
+    lines = [index for record in mapping["records"] for index in record]
+    return lines + [index for indices in mapping["dropped"].values() for index in indices]
+
+
+def _level_tokens(text: str) -> list:
+    """各压缩级别的 token 数, 与 compress_simvec 的级别顺序一致"""
+    primitives = parse_primitives(text)
+    levels = [(None, False, False), (1, False, True), (1, True, True)] + [(q, True, True) for q in quantization_steps[2:]]
+    tokens = []
+    for quantum, drop_axes, run_length in levels:
+        records, _ = _compress_level(primitives, quantum, drop_axes, run_length)
+        tokens.append(count_tokens("\n".join(record["text"] for record in records)))
+    return tokens
+
+
+@pytest.mark.parametrize("budget", [10 ** 6, 150, 120, 1])
+def test_mapping_covers_every_line_once(budget):
+    compressed, mapping = compress_simvec(sample, budget)
+    expected = [index for index, line in enumerate(sample.splitlines()) if line.strip()]
+    assert sorted(_covered_lines(mapping)) == expected
+    assert len(mapping["records"]) == len(compressed.splitlines())
+    assert mapping["tokens"] == count_tokens(compressed)
+
+
+def test_lossless_level_within_budget():
+    compressed, mapping = compress_simvec(sample, 10 ** 6)
+    assert mapping["within_budget"] and mapping["level"] == 0
+    # 重复与退化图元被删除, 其余行原样保留
+    assert mapping["dropped"]["degenerate"] == [10, 11, 12]
+    assert mapping["dropped"]["axis_grid"] == []
+    duplicate = mapping["records"].index([8, 9])
+    assert original_primitives(sample, mapping, duplicate) == ["rect (0,0,255) [300,50,20,160]"] * 2
+    assert compressed.splitlines()[duplicate] == "rect (0,0,255) [300,50,20,160]"
+
+
+def test_rect_runs_map_back_to_each_bar():
+    compressed, mapping = compress_simvec(sample, 150)
+    assert mapping["level"] == 1 and mapping["dropped"]["axis_grid"] == []
+    run = next(i for i, line in enumerate(compressed.splitlines()) if line.startswith("rects (255,0,0)"))
+    assert mapping["records"][run] == [3, 4, 6, 7]
+
+
+def test_axis_and_grid_lines_dropped_at_later_levels():
+    _, mapping = compress_simvec(sample, 120)
+    assert mapping["level"] == 2
+    assert sorted(mapping["dropped"]["axis_grid"]) == [0, 1, 2]
+
+
+def test_fewest_token_fallback_when_over_budget():
+    _, mapping = compress_simvec(sample, 1)
+    tokens = _level_tokens(sample)
+    assert not mapping["within_budget"]
+    assert mapping["tokens"] == min(tokens)
+    # token 数相同时取损失最小 (最早) 的一级
+    assert mapping["level"] == tokens.index(min(tokens))
+    assert mapping["original_tokens"] == count_tokens(sample)
+
+
+def test_empty_input():
+    compressed, mapping = compress_simvec("", 10)
+    assert compressed == ""
+    assert mapping["records"] == [] and mapping["within_budget"]
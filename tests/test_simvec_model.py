@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from simvec_model import SimVecChart, invalid_rgb, unpack_rgb
+from simvec_storage import load_simvec_binary, save_simvec_binary
+from simvec_tokenizer import tokenize_simvec
+
+
+def test_colors_are_packed_once_and_none_is_invalid():
+    # 无填充色的矩形直接丢弃, 其余图元的 None 颜色打包为 invalid_rgb
+    chart = tokenize_simvec("rect (255,128,1) [0,0,1,1]\nrect None [0,0,2,2]\ncircle (0,0,255) [1,1,2,2]\ncircle None [3,3,2,2]")
+    assert chart.rect.rgb.dtype == np.int32 and chart.rect.rgb.tolist() == [0xFF8001]
+    assert chart.circle.rgb.tolist() == [0x0000FF, invalid_rgb]
+    assert chart.circle.valid.tolist() == [True, False]
+    assert unpack_rgb(chart.circle.rgb).tolist() == [[0, 0, 255], [0, 0, 0]]
+    assert unpack_rgb(chart.rect.rgb[0]).tolist() == [[255, 128, 1]]
+
+
+def test_polylines_share_one_point_buffer():
+    chart = tokenize_simvec("line (1,2,3) 0,0;10,5;20,0\nline None 1,1;2,2\narea (4,5,6) 0,0;5,0;0,5")
+    assert len(chart.line) == 2 and len(chart.area) == 1
+    assert chart.line.offsets.tolist() == [0, 3, 5]
+    assert chart.line.polyline(1).tolist() == [[1, 1], [2, 2]]
+    assert chart.line.valid.tolist() == [True, False]
+    assert chart["area"] is chart.area
+    with pytest.raises(KeyError):
+        chart["path"]
+
+
+def test_columns_are_slotted():
+    chart = tokenize_simvec("rect (1,1,1) [0,0,1,1]")
+    for obj in (chart, chart.rect, chart.text, chart.line):
+        assert not hasattr(obj, "__dict__")
+    with pytest.raises(AttributeError):
+        chart.rect.color_valid = np.ones(1, dtype=bool)
+
+
+def test_nbytes_counts_every_column():
+    chart = tokenize_simvec("rect (1,1,1) [0,0,1,1]\ntext 图例 [1,1,1,1]\nline (0,0,0) 0,0;1,1")
+    # rect: 4 个 float64 + 1 个 int32; text: 4 个 float64 + UTF-8 内容; line: 2 个 int32 顶点 + 偏移 + 颜色
+    assert chart.rect.nbytes == 36
+    assert chart.text.nbytes == 32 + len("图例".encode("utf-8"))
+    assert chart.nbytes == sum(chart[kind].nbytes for kind in ("rect", "text", "circle", "line", "area"))
+
+
+def test_binary_columns_keep_packed_types(tmp_path):
+    chart = tokenize_simvec("rect (9,8,7) [1,2,3,4]\nline None 0,0;1,1")
+    path = str(tmp_path / "chart.simvec")
+    save_simvec_binary(path, chart)
+    loaded = load_simvec_binary(path)
+    assert isinstance(loaded, SimVecChart)
+    assert loaded.rect.rgb.dtype == np.int32 and loaded.line.points.dtype == np.int32
+    assert loaded.rect.rgb.tolist() == [0x090807] and loaded.line.rgb.tolist() == [invalid_rgb]
+    # 数值列直接映射文件内容, 不发生拷贝
+    assert not loaded.rect.position.flags.owndata
+
+
+def test_previous_binary_format_is_rejected(tmp_path):
+    path = tmp_path / "old.simvec"
+    path.write_bytes(b"SIMVEC1\0" + bytes(16))
+    with pytest.raises(ValueError):
+        load_simvec_binary(str(path))
@@ -0,0 +1,83 @@
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from simvec_storage import alignment, load_cleaned_simvec, load_simvec, load_simvec_binary, magic, save_simvec_binary
+from simvec_tokenizer import columns_to_json, tokenize_simvec
+
+sample = "\n".join([
+    "rect (255,0,0) [10,20,4,30]",
+    "rect (0,128,255) [16,35,4,15]",
+    "text 图例 [40.5,5.0,20,6]",
+    "text 2020 [12.0,60.0,8,6]",
+    "circle (1,2,3) [3,4,2,2]",
+    "line (0,0,0) 0,0;10,5;20,0",
+    "line (9,9,9) 1,1;2,2",
+])
+
+
+def assert_same_chart(actual, expected):
+    for kind in ("rect", "circle"):
+        np.testing.assert_array_equal(actual[kind].position, expected[kind].position)
+        np.testing.assert_array_equal(actual[kind].rgb, expected[kind].rgb)
+    np.testing.assert_array_equal(actual.text.position, expected.text.position)
+    assert list(actual.text.content) == list(expected.text.content)
+    for kind in ("line", "area"):
+        np.testing.assert_array_equal(actual[kind].points, expected[kind].points)
+        np.testing.assert_array_equal(actual[kind].offsets, expected[kind].offsets)
+        np.testing.assert_array_equal(actual[kind].rgb, expected[kind].rgb)
+
+
+def test_binary_round_trip(tmp_path):
+    chart = tokenize_simvec(sample)
+    path = str(tmp_path / "chart.simvec")
+    save_simvec_binary(path, chart)
+    assert_same_chart(load_simvec_binary(path), chart)
+
+
+def test_arrays_are_aligned(tmp_path):
+    path = str(tmp_path / "chart.simvec")
+    save_simvec_binary(path, tokenize_simvec(sample))
+    with open(path, "rb") as f:
+        data = f.read()
+    assert data[:len(magic)] == magic
+    (header_length,) = struct.unpack_from("<I", data, len(magic))
+    header = json.loads(data[len(magic) + 4:len(magic) + 4 + header_length])
+    data_start = len(magic) + 4 + header_length
+    data_start += -data_start % alignment
+    for entry in header["arrays"].values():
+        assert (data_start + entry["offset"]) % alignment == 0
+
+
+def test_empty_chart_round_trip(tmp_path):
+    chart = tokenize_simvec("")
+    path = str(tmp_path / "empty.simvec")
+    save_simvec_binary(path, chart)
+    assert_same_chart(load_simvec_binary(path), chart)
+
+
+def test_rejects_other_files(tmp_path):
+    empty = tmp_path / "empty.simvec"
+    empty.write_bytes(b"")
+    other = tmp_path / "other.simvec"
+    other.write_bytes(b"not a simvec file")
+    for path in (empty, other):
+        with pytest.raises(ValueError):
+            load_simvec_binary(str(path))
+
+
+def test_load_simvec_sources(tmp_path):
+    """.txt 直接解析; 其余路径优先读取二进制文件, 没有时回退到 JSON"""
+    chart = tokenize_simvec(sample)
+    text_path = tmp_path / "chart.txt"
+    text_path.write_text(sample, encoding="utf-8")
+    assert_same_chart(load_simvec(str(text_path)), chart)
+
+    base = tmp_path / "cleaned"
+    with open(str(base) + ".json", "w", encoding="utf-8") as f_out:
+        json.dump(columns_to_json(chart), f_out, ensure_ascii=False)
+    assert_same_chart(load_cleaned_simvec(str(base)), chart)
+    save_simvec_binary(str(base) + ".simvec", tokenize_simvec("rect (1,1,1) [0,0,1,1]"))
+    assert len(load_simvec(str(base)).rect) == 1
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from simvec_model import invalid_rgb
+from simvec_tokenizer import columns_to_json, json_to_columns, tokenize_simvec
+
+sample = "\n".join([
+    "rect (255,0,0) [10,20,4,30]",
+    "rect None [0,0,100,100]",
+    "rect (0,128,255) [16,35,4,15]",
+    "text 1,000 [40.5,5.0,20,6]",
+    "circle bogus [3,4,2,2]",
+    "line (0,0,0) 0,0;10,5;20,0",
+    "area (10,20,30) 1,1;2,2",
+    "",
+    "unknown (1,2,3) [1,2,3,4]",
+])
+
+
+def test_tokenize_columns():
+    chart = tokenize_simvec(sample)
+    # 无填充色的矩形被跳过, 其余按出现顺序
+    np.testing.assert_array_equal(chart.rect.position, [[10, 20, 4, 30], [16, 35, 4, 15]])
+    assert chart.rect.rgb.tolist() == [0xFF0000, 0x0080FF]
+    assert chart.text.content == ["1000"]
+    np.testing.assert_array_equal(chart.text.position, [[40.5, 5.0, 20, 6]])
+    # 无法解析的颜色为 invalid_rgb
+    assert chart.circle.rgb.tolist() == [invalid_rgb]
+    assert chart.circle.valid.tolist() == [False]
+    assert chart.line.offsets.tolist() == [0, 3]
+    np.testing.assert_array_equal(chart.line.polyline(0), [[0, 0], [10, 5], [20, 0]])
+    np.testing.assert_array_equal(chart.area.polyline(0), [[1, 1], [2, 2]])
+
+
+def test_empty_text():
+    chart = tokenize_simvec("")
+    for kind in ("rect", "text", "circle", "line", "area"):
+        assert len(chart[kind]) == 0
+
+
+@pytest.mark.parametrize("line", [
+    "rect (1,2,3) [1,2,x,4]",
+    "rect (1,2,3) [1,2,3]",
+    "line (1,2,3) 0,0;1",
+])
+def test_malformed_numbers_raise(line):
+    with pytest.raises(ValueError):
+        tokenize_simvec(line)
+
+
+def test_json_round_trip():
+    chart = tokenize_simvec(sample)
+    data = columns_to_json(chart)
+    assert data["rect"][0] == {"color": "(255,0,0)", "position": [10, 20, 4, 30]}
+    assert data["circle"][0]["color"] == "None"
+    restored = json_to_columns(data)
+    for kind in ("rect", "circle"):
+        np.testing.assert_array_equal(restored[kind].position, chart[kind].position)
+        np.testing.assert_array_equal(restored[kind].rgb, chart[kind].rgb)
+    assert restored.text.content == chart.text.content
+    for kind in ("line", "area"):
+        np.testing.assert_array_equal(restored[kind].points, chart[kind].points)
+        np.testing.assert_array_equal(restored[kind].offsets, chart[kind].offsets)
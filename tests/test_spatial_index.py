@@ -0,0 +1,75 @@
+import numpy as np
+
+import metadata_inference
+import spatial_index
+from simvec_compressor import parse_primitives
+from simvec_tokenizer import tokenize_simvec
+from spatial_index import SpatialIndex, classify_primitives, is_gray, swatch_shaped
+
+# 一张简单的柱状图: 坐标轴、网格线、两根柱子、图例与刻度
+chart_text = "\n".join([
+    "line (0,0,0) 50,10;50,210",
+    "line (0,0,0) 50,210;450,210",
+    "rect (200,200,200) [250,110,400,1]",
+    "rect (0,0,0) [120,150,2,20]",
+    "rect (255,0,0) [100,60,30,150]",
+    "rect (0,0,255) [200,100,30,110]",
+    "rect (255,0,0) [405,20,10,10]",
+    "rect (0,0,255) [405,40,10,10]",
+    "line (255,0,0) 60,200;150,120;300,90",
+    "text Sales [440,25,30,10]",
+    "text Cost [440,45,30,10]",
+    "text 0 [45,210,6,10]",
+    "text 100 [45,110,18,10]",
+    "text A [103,220,6,10]",
+    "text B [203,220,6,10]",
+])
+metadata = {
+    "xAxis": {"ticks": ["A", "B"]},
+    "yAxis": {"ticks": ["0", "100"]},
+    "legend": {"items": ["Sales", "Cost"], "colors": ["#FF0000", "#0000FF"]},
+}
+
+
+def test_is_gray_and_swatch_shaped():
+    rgb = np.array([0x000000, 0x808890, 0x8090A0, 0xFF0000, -1], dtype=np.int64)
+    assert is_gray(rgb).tolist() == [True, True, False, False, True]
+    boxes = np.array([[0, 0, 10, 10], [0, 0, 3, 3], [0, 0, 20, 10], [0, 0, 30, 2]], dtype=np.float64)
+    assert swatch_shaped(boxes, "rect").tolist() == [True, False, False, False]
+    assert swatch_shaped(boxes, "rect", size=20).tolist() == [True, False, True, False]
+    assert swatch_shaped(boxes, "line").tolist() == [True, False, True, True]
+
+
+def test_classify_primitives_roles():
+    chart = tokenize_simvec(chart_text)
+    layout = classify_primitives(chart, metadata)
+    # 灰色的长细矩形为网格线, 较短的黑色细矩形保留为数据; 图例文本旁的色块为 legend
+    assert [spatial_index.roles[r] for r in layout.roles["rect"]] == ["axis", "mark", "mark", "mark", "legend", "legend"]
+    assert [spatial_index.roles[r] for r in layout.roles["line"]] == ["axis", "axis", "mark"]
+    assert layout.marks("rect").tolist() == [1, 2, 3]
+    assert layout.pruned() == {"legend": 2, "axis": 3, "outside": 0}
+    assert layout.plot_area == (45.0, None, 215.0)
+
+
+def test_query_matches_brute_force():
+    chart = tokenize_simvec(chart_text)
+    index = SpatialIndex(chart, cell_size=8)
+    for box in [(0, 0, 500, 300), (95, 55, 105, 65), (400, 15, 445, 45), (300, 250, 310, 260)]:
+        found = index.query(box)
+        for kind, boxes in index.boxes.items():
+            hit = (boxes[:, 0] <= box[2]) & (boxes[:, 2] >= box[0]) & (boxes[:, 1] <= box[3]) & (boxes[:, 3] >= box[1])
+            assert found[kind].tolist() == np.flatnonzero(hit).tolist()
+
+
+def test_compressor_and_inference_share_axis_roles():
+    # 压缩器删除的坐标轴 / 网格线与 classify_primitives 的 axis 角色一致
+    axis_lines = [p["lines"][0] for p in parse_primitives(chart_text) if p["axis"]]
+    assert axis_lines == [0, 1, 2]
+
+    # 推断的图例色块与数据矩形同样不含网格线
+    chart = tokenize_simvec(chart_text)
+    layout = classify_primitives(chart, {})
+    legend, _, swatches = metadata_inference._find_legend(chart, chart.text.content, layout)
+    assert legend["items"] == ["Sales", "Cost"] and swatches["rect"] == {4, 5}
+    layout = metadata_inference._with_swatches(layout, swatches)
+    assert metadata_inference._data_rects(chart, layout).tolist() == [1, 2, 3]
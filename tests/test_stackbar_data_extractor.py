@@ -0,0 +1,43 @@
+import numpy as np
+
+from simvec_tokenizer import tokenize_simvec
+from stackbar_data_extractor import extract_stackbar_data, group_columns
+
+
+def test_group_columns_by_half_width():
+    # 中点相差不超过半个柱宽的矩形属于同一根柱子, 输出按 X 从左到右
+    centers = np.array([200.0, 100.0, 104.0, 212.0, 300.0])
+    widths = np.array([30.0, 30.0, 30.0, 20.0, 30.0])
+    assert group_columns(centers, widths) == [[1, 2], [0], [3], [4]]
+    assert group_columns(np.array([]), np.array([])) == []
+
+
+def test_segments_use_height_and_stack_bottom_up():
+    chart = tokenize_simvec("\n".join([
+        "line (0,0,0) 50,10;50,210",
+        "line (0,0,0) 50,210;450,210",
+        # 每根柱子中上层 (蓝) 先于下层 (红) 出现
+        "rect (0,0,255) [100,130,30,30]",
+        "rect (255,0,0) [100,160,30,50]",
+        "rect (0,0,255) [200,150,30,40]",
+        "rect (255,0,0) [200,190,30,20]",
+        "rect (255,0,0) [405,20,10,10]",
+        "rect (0,0,255) [405,40,10,10]",
+        "text Sales [440,25,30,10]",
+        "text Cost [440,45,30,10]",
+        "text 0 [40,210,6,10]",
+        "text 100 [40,110,18,10]",
+        "text A [103,220,6,10]",
+        "text B [203,220,6,10]",
+    ]))
+    metadata = {
+        "xAxis": {"ticks": ["A", "B"]},
+        "yAxis": {"ticks": ["0", "100"]},
+        "legend": {"items": ["Sales", "Cost"], "colors": ["#FF0000", "#0000FF"]},
+    }
+    assert extract_stackbar_data(metadata, chart) == [
+        {"x": "A", "y": 50.0, "category": "Sales"},
+        {"x": "A", "y": 30.0, "category": "Cost"},
+        {"x": "B", "y": 20.0, "category": "Sales"},
+        {"x": "B", "y": 40.0, "category": "Cost"},
+    ]
@@ -0,0 +1,79 @@
+import collections
+import glob
+import io
+import os
+
+import pytest
+
+from svg_simvec_converter import convert_svg
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# parse_svg_x.js 在浏览器中生成的 raw_simvec_data 与对应的 SVG
+reference_pairs = [
+    (svg_path, os.path.join(root, "intermediate_data", "raw_simvec_data", chart_type, name + ".txt"))
+    for svg_path in sorted(glob.glob(os.path.join(root, "input_data", "*", "*.svg")))
+    for chart_type, name in [(os.path.basename(os.path.dirname(svg_path)), os.path.basename(svg_path)[:-4])]
+    if os.path.exists(os.path.join(root, "intermediate_data", "raw_simvec_data", chart_type, name + ".txt"))
+]
+
+
+def _text_box(line: str) -> tuple:
+    _, content, box = line.split(" ", 2)
+    return content, [float(v) for v in box.strip("[]").split(",")]
+
+
+@pytest.mark.parametrize("svg_path, reference_path", reference_pairs,
+                         ids=[os.path.relpath(svg, os.path.join(root, "input_data")) for svg, _ in reference_pairs])
+def test_matches_browser_output(svg_path, reference_path):
+    converted = convert_svg(svg_path)
+    with open(reference_path, "r", encoding="utf-8") as f:
+        reference = f.read().split("\n")
+    assert len(converted) == len(reference)
+
+    # 非文本图元逐行一致 (parse_svg_x.js 的排序比较函数不可靠, 只比较集合)
+    shapes = collections.Counter(line for line in converted if not line.startswith("text "))
+    assert shapes == collections.Counter(line for line in reference if not line.startswith("text "))
+
+    # 文本内容与顺序一致; 包围盒依赖字体, 由估算的字宽得到, 误差不超过 1 + 5% 的文本长度
+    texts = [_text_box(line) for line in converted if line.startswith("text ")]
+    expected = [_text_box(line) for line in reference if line.startswith("text ")]
+    assert [content for content, _ in texts] == [content for content, _ in expected]
+    for (content, box), (_, reference_box) in zip(texts, expected):
+        tolerance = 1 + 0.05 * max(reference_box[2], reference_box[3])
+        assert all(abs(a - b) <= tolerance for a, b in zip(box, reference_box)), (content, box, reference_box)
+
+
+def test_reference_pairs_found():
+    assert len(reference_pairs) >= 10
+
+
+def _convert(markup: str) -> list:
+    return convert_svg(io.BytesIO(f'<svg xmlns="http://www.w3.org/2000/svg" width="500" height="500">{markup}</svg>'.encode()))
+
+
+def test_fill_less_rects_and_clip_paths():
+    # 与浏览器一致: 无填充色的矩形输出为 None, clipPath 中的矩形按自身坐标输出, 未知元素 (clippath) 内的不输出
+    lines = _convert(
+        '<defs><clipPath id="c"><rect x="0" y="0" width="100" height="50" fill="none"/></clipPath>'
+        '<clippath><rect x="0" y="0" width="80" height="80"/></clippath></defs>'
+        '<g transform="translate(10,20)"><rect x="5" y="5" width="10" height="30" fill="#ff0000"/>'
+        '<rect x="0" y="0" width="40" height="40" fill="none"/>'
+        '<rect x="0" y="0" width="40" height="40" style="display:none"/></g>'
+    )
+    assert lines == ["rect None [50,0,100,50]", "rect None [30,20,40,40]", "rect (255,0,0) [20,25,10,30]"]
+
+
+def test_text_anchor_and_weight():
+    # text 的 x 为包围盒右边缘; middle / end 锚点按估算的字宽平移, 粗体更宽
+    start, middle, end, bold = _convert(
+        '<g font-family="Arial" font-size="10">'
+        '<text x="100" y="50">2020</text><text x="100" y="50" text-anchor="middle">2020</text>'
+        '<text x="100" y="50" text-anchor="end">2020</text>'
+        '<text x="100" y="80" font-weight="bold">Total</text></g>'
+    )
+    assert _text_box(start)[1][:2] == [122.0, 46.5]
+    assert _text_box(middle)[1][0] == 111.0
+    assert _text_box(end)[1][0] == 99.0
+    # "Total" 的常规字宽为 22.2 像素, 粗体为 23.9 像素
+    assert _text_box(bold)[1][2] == 23
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from simvec_model import TextColumn
+from text_index import AxisCalibrationError, CategoryAxis, TextIndex, tick_value
+
+
+def test_assign_nearest_tick():
+    axis = CategoryAxis({"b": 20.0, "a": 10.0, "c": 30.0})
+    assert axis.labels == ["a", "b", "c"]
+    labels, distances = axis.assign([9, 12, 19, 24, 31, 100, -5])
+    assert labels == ["a", "a", "b", "b", "c", "c", "a"]
+    np.testing.assert_allclose(distances, [1, 2, 1, 4, 1, 70, 15])
+
+
+def test_assign_tie_goes_to_left_tick():
+    axis = CategoryAxis({"a": 10.0, "b": 20.0})
+    labels, distances = axis.assign([15.0])
+    assert labels == ["a"]
+    assert distances.tolist() == [5.0]
+
+
+def test_assign_single_tick_and_empty_input():
+    axis = CategoryAxis({"only": 50.0})
+    assert axis.assign([0, 50, 90])[0] == ["only"] * 3
+    labels, distances = axis.assign([])
+    assert labels == [] and len(distances) == 0
+
+
+def test_assign_empty_axis_raises():
+    with pytest.raises(AxisCalibrationError) as excinfo:
+        CategoryAxis({}).assign([1.0])
+    assert excinfo.value.axis == "x"
+
+
+def test_ambiguous_uses_median_spacing():
+    axis = CategoryAxis({"a": 0.0, "b": 10.0, "c": 20.0})
+    _, distances = axis.assign([1, 3, 12])
+    assert axis.ambiguous(distances).tolist() == [False, True, False]
+    assert CategoryAxis({"a": 0.0}).ambiguous(np.array([50.0])).tolist() == [False]
+
+
+def _index(rows: list) -> TextIndex:
+    contents = [content for content, _ in rows]
+    positions = np.array([position for _, position in rows], dtype=np.float64)
+    return TextIndex(TextColumn(positions, contents))
+
+
+def test_category_axis_centered_labels():
+    # 文本 x 为右边缘: 居中的标签中点为 x - w/2
+    index = _index([("A", [25, 200, 10, 6]), ("B", [45, 200, 10, 6]), ("C", [65, 200, 10, 6])])
+    axis = index.category_axis(["A", "B", "C"], [20, 40, 60])
+    assert axis.pixels.tolist() == [20, 40, 60]
+    assert axis.assign([41])[0] == ["B"]
+
+
+def test_category_axis_right_aligned_labels():
+    # 旋转的长标签以右边缘对齐刻度
+    index = _index([("Alpha", [20, 200, 30, 6]), ("Beta", [40, 200, 30, 6]), ("Gamma", [60, 200, 30, 6])])
+    axis = index.category_axis(["Alpha", "Beta", "Gamma"], [20, 40, 60])
+    assert axis.pixels.tolist() == [20, 40, 60]
+    assert axis.assign([39, 58])[0] == ["Beta", "Gamma"]
+
+
+def test_category_axis_missing_labels_and_pixels():
+    index = _index([("A", [25, 200, 10, 6])])
+    assert index.category_axis(["A", "missing"], []).labels == ["A"]
+    assert index.category_axis(["missing"], [10]).labels == []
+
+
+@pytest.mark.parametrize("label, value", [
+    ("2020", 2020.0), ("-0.5", -0.5), ("$300", 300.0), ("45%", 45.0),
+    ("2.5k", 2500.0), ("3K", 3000.0), ("1.2M", 1.2e6), ("$4B", 4e9),
+])
+def test_tick_value_prefixes_and_suffixes(label, value):
+    assert tick_value(label) == pytest.approx(value)
+
+
+@pytest.mark.parametrize("label", ["FY2020", "k", "", "12kg", "2000-01"])
+def test_tick_value_rejects_non_numbers(label):
+    assert tick_value(label) is None
+
+
+def test_fit_axis_least_squares_and_inverse():
+    # Y 轴刻度 0 / 50 / 100 在 y = 200 / 100 / 0; "50" 同时出现在标题中, 取与其余刻度同一列的那一个
+    index = _index([("0", [40, 200, 8, 6]), ("50", [40, 100, 12, 6]), ("100", [40, 0, 16, 6]), ("50", [300, 10, 12, 6])])
+    scale = index.fit_axis(["0", "50", "100"], "y")
+    assert scale.tick_pixels == {"0": 200.0, "50": 100.0, "100": 0.0}
+    assert scale.value(150.0) == pytest.approx(25.0)
+    np.testing.assert_allclose(scale.pixel(scale.value(np.array([3.0, 77.0]))), [3.0, 77.0])
+
+
+def test_fit_axis_skips_non_numeric_and_needs_two_ticks():
+    index = _index([("0", [40, 200, 8, 6]), ("Total", [40, 100, 20, 6]), ("10", [40, 100, 10, 6])])
+    assert index.fit_axis(["0", "Total", "10"], "y").slope == pytest.approx(-0.1)
+    with pytest.raises(AxisCalibrationError) as excinfo:
+        index.fit_axis(["0", "Total"], "x")
+    assert excinfo.value.axis == "x"
+
+
+def test_region_queries():
+    index = _index([("a", [10, 10, 4, 4]), ("b", [50, 80, 4, 4]), ("c", [90, 200, 4, 4])])
+    assert index.below(100) == [2]
+    assert index.left_of(50) == [0, 1]
+    assert index.within(x_min=20, y_max=100) == [1]
+    assert "b" in index and index.rows("missing") == []
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from vega_lite_emitter import build_spec, dumps_spec, fallback_color, read_extracted_rows, vega_lite_schema, write_ndjson
+
+metadata = {
+    "title": "Revenue",
+    "xAxis": {"name": "Year", "type": "Quantitative", "ticks": ["2021", "2020"]},
+    "yAxis": {"name": "USD", "ticks": ["0", "100"]},
+    "legend": {"title": "Region", "items": ["North", "South"], "colors": ["#FF0000", "#0000FF"]},
+}
+
+
+def test_stacked_bar_spec_shape():
+    rows = [{"x": "2020", "y": 10.0, "category": "North"}, {"x": "2020", "y": 5.0, "category": "Unknown"}]
+    spec = build_spec("stackbar", rows, metadata, "stackbar/1")
+    assert spec["$schema"] == vega_lite_schema
+    assert spec["name"] == "stackbar/1" and spec["title"] == "Revenue"
+    assert spec["data"] == {"values": rows}
+    assert spec["mark"] == {"type": "bar", "tooltip": True}
+    # 数值型的分类轴改为 ordinal, 并保持 metadata 中刻度的顺序
+    assert spec["encoding"]["x"] == {"field": "x", "type": "ordinal", "title": "Year", "sort": ["2021", "2020"]}
+    assert spec["encoding"]["y"] == {"field": "y", "type": "quantitative", "title": "USD", "stack": "zero"}
+    # 图例中没有的分类追加在末尾, 使用灰色
+    assert spec["encoding"]["color"] == {
+        "field": "category", "type": "nominal", "title": "Region",
+        "scale": {"domain": ["North", "South", "Unknown"], "range": ["#FF0000", "#0000FF", fallback_color]},
+    }
+
+
+def test_pie_and_binned_scatter_encodings():
+    pie = build_spec("pie", [{"category": "RGB(255, 128, 0)", "percentage": 100.0}], {})
+    assert pie["mark"]["type"] == "arc" and "name" not in pie and "title" not in pie
+    assert pie["encoding"]["theta"] == {"field": "percentage", "type": "quantitative", "stack": True}
+    # 无图例时由 RGB(...) 分类名称得到颜色
+    assert pie["encoding"]["color"]["scale"] == {"domain": ["RGB(255, 128, 0)"], "range": ["#ff8000"]}
+
+    scatter = build_spec("scatter", [{"x": 1.5, "y": 2.5, "count": 3, "category": "North"}], metadata)
+    assert scatter["mark"]["type"] == "point"
+    assert scatter["encoding"]["x"]["type"] == "quantitative"
+    assert scatter["encoding"]["size"] == {"field": "count", "type": "quantitative"}
+    with pytest.raises(ValueError):
+        build_spec("area", [], metadata)
+
+
+def test_extracted_rows_and_ndjson_round_trip(tmp_path):
+    extracted = tmp_path / "1.txt"
+    extracted.write_text('计算出的折线图数据 (1.json):\n{"x": 1, "y": 2.0, "category": "North"},\n'
+                         '{"x": 2, "y": 3.0, "category": "North"},\n', encoding="utf-8")
+    rows = read_extracted_rows(str(extracted))
+    assert rows == [{"x": 1, "y": 2.0, "category": "North"}, {"x": 2, "y": 3.0, "category": "North"}]
+
+    specs = [dumps_spec(build_spec("line", rows, metadata, "line/1")), dumps_spec(build_spec("bar", [], {}))]
+    assert all("\n" not in spec for spec in specs)
+    path = tmp_path / "out" / "all.ndjson"
+    write_ndjson(str(path), specs)
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["mark"]["type"] for line in lines] == ["line", "bar"]
+    assert json.loads(lines[0])["encoding"]["color"]["scale"]["domain"] == ["North", "South"]
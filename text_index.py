@@ -0,0 +1,192 @@
+import numpy as np
+
+from simvec_model import TextColumn
+
+# 坐标轴名称 → (刻度所在的坐标列, 与之垂直的坐标列)
+axis_columns = {"x": (0, 1), "y": (1, 0)}
+
+# 刻度数值的单位后缀
+number_suffixes = {"%": 1, "k": 1e3, "K": 1e3, "M": 1e6, "B": 1e9}
+
+
+def tick_value(label: str):
+    """解析刻度数值 (允许 $ 前缀与 % / k / M / B 后缀), 不是数值时返回 None"""
+    text = str(label).lstrip("$")
+    scale = number_suffixes.get(text[-1:], None)
+    try:
+        return float(text[:-1]) * scale if scale else float(text)
+    except ValueError:
+        return None
+
+
+class AxisCalibrationError(ValueError):
+    """坐标轴上匹配到的刻度不足, 无法建立像素与数据值之间的映射"""
+
+    def __init__(self, axis: str, message: str):
+        super().__init__(message)
+        self.axis = axis
+
+
+class AxisScale:
+    """
+    像素坐标与数据值之间的线性映射: value = slope * pixel + intercept
+    由所有匹配到的刻度一次最小二乘拟合得到
+    """
+
+    def __init__(self, slope: float, intercept: float, tick_pixels: dict):
+        self.slope = slope
+        self.intercept = intercept
+        self.tick_pixels = tick_pixels  # 参与拟合的刻度标签 → 像素坐标
+
+    def value(self, pixel):
+        """像素坐标 → 数据值 (支持标量与 ndarray)"""
+        return self.slope * pixel + self.intercept
+
+    def pixel(self, value):
+        """数据值 → 像素坐标 (支持标量与 ndarray)"""
+        return (value - self.intercept) / self.slope
+
+
+class CategoryAxis:
+    """
+    分类坐标轴: 刻度像素坐标排序一次, 之后用二分查找把一批像素位置归到最近的刻度
+    """
+
+    def __init__(self, tick_pixels: dict):
+        order = np.argsort(np.array(list(tick_pixels.values()), dtype=np.float64), kind='stable')
+        labels = list(tick_pixels)
+        self.labels = [labels[i] for i in order]
+        self.pixels = np.array([tick_pixels[label] for label in self.labels], dtype=np.float64)
+
+    def assign(self, pixels) -> tuple:
+        """
+        返回 (每个位置最近的刻度标签列表, 到该刻度的像素距离 ndarray)
+        与两侧刻度距离相等时取左侧 (像素较小) 的刻度
+        """
+        pixels = np.asarray(pixels, dtype=np.float64).reshape(-1)
+        if len(self.labels) == 0:
+            raise AxisCalibrationError("x", "分类坐标轴上没有匹配到任何刻度")
+        right = np.clip(np.searchsorted(self.pixels, pixels), 0, len(self.pixels) - 1)
+        left = np.clip(right - 1, 0, len(self.pixels) - 1)
+        left_distance = np.abs(pixels - self.pixels[left])
+        right_distance = np.abs(pixels - self.pixels[right])
+        nearest = np.where(right_distance < left_distance, right, left)
+        return [self.labels[i] for i in nearest.tolist()], np.minimum(left_distance, right_distance)
+
+    def ambiguous(self, distances: np.ndarray, ratio: float = 0.25) -> np.ndarray:
+        """距离最近刻度超过 ratio 倍刻度间距 (中位数) 的位置, 这些位置的归类可能不可靠"""
+        if len(self.pixels) < 2:
+            return np.zeros(len(distances), dtype=bool)
+        spacing = np.median(np.diff(self.pixels))
+        return np.asarray(distances) > ratio * spacing
+
+
+class TextIndex:
+    """
+    每张图表构建一次的 SimVec 文本索引
+    将文本内容 (tokenizer 与 data_formatter 均已规范化) 映射到所有匹配的行, 并支持按区域筛选文本
+    """
+
+    def __init__(self, text_column: TextColumn):
+        self.contents = list(text_column.content)
+        self.positions = np.asarray(text_column.position, dtype=np.float64).reshape(-1, 4)
+        self._rows = {}
+        for row, content in enumerate(self.contents):
+            self._rows.setdefault(content, []).append(row)
+
+    def __len__(self) -> int:
+        return len(self.contents)
+
+    def __contains__(self, content: str) -> bool:
+        return content in self._rows
+
+    def rows(self, content: str) -> list:
+        """返回内容完全相同的所有文本行号 (按文档顺序), 不存在时为空列表"""
+        return self._rows.get(content, [])
+
+    def find(self, content: str) -> np.ndarray:
+        """返回内容完全相同的所有文本位置, 形状为 (k, 4)"""
+        return self.positions[self.rows(content)]
+
+    def within(self, x_min: float = None, x_max: float = None, y_min: float = None, y_max: float = None) -> list:
+        """返回位置落在给定矩形区域内的文本行号, 未给出的边界不做限制"""
+        mask = np.ones(len(self.contents), dtype=bool)
+        for column, low, high in ((0, x_min, x_max), (1, y_min, y_max)):
+            if low is not None:
+                mask &= self.positions[:, column] >= low
+            if high is not None:
+                mask &= self.positions[:, column] <= high
+        return np.flatnonzero(mask).tolist()
+
+    def below(self, y: float) -> list:
+        """位于 y 像素之下的文本 (例如绘图区下方的 X 轴刻度)"""
+        return self.within(y_min=y)
+
+    def left_of(self, x: float) -> list:
+        """位于 x 像素左侧的文本 (例如 Y 轴左侧的刻度)"""
+        return self.within(x_max=x)
+
+    def axis_ticks(self, labels: list, axis: str) -> dict:
+        """找出每个刻度标签在坐标轴上的像素坐标, 返回 标签 → 像素 (找不到的标签不出现)"""
+        column, _ = axis_columns[axis]
+        return {label: float(self.positions[row, column]) for label, row in self.tick_rows(labels, axis).items()}
+
+    def category_axis(self, labels: list, pixels) -> CategoryAxis:
+        """
+        X 轴的分类刻度: 水平的刻度文本居中于刻度, 旋转的刻度文本 (text-anchor: end) 以右边缘对齐刻度
+        分别以文本中点与右边缘建轴, 取图元位置 pixels (例如柱子的中点) 到最近刻度的距离中位数较小的一种
+        """
+        rows = self.tick_rows(labels, "x")
+        position = self.positions[list(rows.values())].reshape(-1, 4)
+        axes = [
+            CategoryAxis(dict(zip(rows, anchors.tolist())))
+            for anchors in (position[:, 0] - position[:, 2] / 2, position[:, 0])
+        ]
+        pixels = np.asarray(pixels, dtype=np.float64).reshape(-1)
+        if not rows or len(pixels) == 0:
+            return axes[0]
+        return min(axes, key=lambda axis: float(np.median(axis.assign(pixels)[1])))
+
+    def tick_rows(self, labels: list, axis: str) -> dict:
+        """
+        找出每个刻度标签对应的文本行号, 返回 标签 → 行号 (找不到的标签不出现)
+        同一内容出现多次时 (例如标签也出现在标题或另一条坐标轴上),
+        取与其余刻度最接近同一行 / 同一列的那一个
+        """
+        _, across = axis_columns[axis]
+        candidates = {label: self.rows(label) for label in dict.fromkeys(labels) if label in self._rows}
+        if not candidates:
+            return {}
+
+        # 刻度沿坐标轴排成一行 (或一列), 以唯一匹配的标签确定这一行的位置;
+        # 所有标签都有重复时 (例如两条坐标轴刻度相同), 取候选中出现最多的行 / 列
+        unique_rows = [rows[0] for rows in candidates.values() if len(rows) == 1]
+        if unique_rows:
+            baseline = np.median(self.positions[unique_rows, across])
+        else:
+            all_rows = [row for rows in candidates.values() for row in rows]
+            values, counts = np.unique(np.rint(self.positions[all_rows, across]), return_counts=True)
+            baseline = values[counts.argmax()]
+
+        return {
+            label: min(rows, key=lambda row: abs(self.positions[row, across] - baseline))
+            for label, rows in candidates.items()
+        }
+
+    def fit_axis(self, labels: list, axis: str, values: list = None) -> AxisScale:
+        """
+        用所有匹配到的刻度一次最小二乘拟合坐标轴的线性比例
+        values 默认为各标签解析出的数值 (见 tick_value); 无法解析为数值的刻度不参与拟合
+        """
+        if values is None:
+            values = [tick_value(label) for label in labels]
+        label_values = {label: value for label, value in zip(labels, values) if value is not None}
+        ticks = self.axis_ticks(list(label_values), axis)
+
+        pixels = np.array(list(ticks.values()), dtype=np.float64)
+        targets = np.array([label_values[label] for label in ticks], dtype=np.float64)
+        if len(np.unique(pixels)) < 2:
+            raise AxisCalibrationError(axis, f"{axis} 轴上匹配到的数值刻度不足两个, 无法计算比例: {list(ticks)}")
+
+        slope, intercept = np.polyfit(pixels, targets, 1)
+        return AxisScale(float(slope), float(intercept), ticks)
@@ -0,0 +1,175 @@
+import json
+import os
+import re
+import sys
+
+# 目录路径
+meta_data_dir = 'intermediate_data/cleaned_meta_data'
+extracted_data_dir = 'intermediate_data/extracted_data'
+output_dir = 'intermediate_data/vega_lite'
+
+vega_lite_schema = "https://vega.github.io/schema/vega-lite/v5.json"
+
+# 各图表类型对应的 Vega-Lite mark
+mark_types = {
+    "bar": "bar",
+    "stackbar": "bar",
+    "line": "line",
+    "scatter": "point",
+    "pie": "arc",
+}
+
+# metadata 中坐标轴类型 → Vega-Lite 编码类型
+axis_types = {
+    "Quantitative": "quantitative",
+    "Categorical": "nominal",
+    "Nominal": "nominal",
+    "Ordinal": "ordinal",
+    "Temporal": "temporal",
+}
+
+# 无图例时 "RGB(r, g, b)" 分类名称对应的颜色, 其余分类 (Unknown 等) 使用灰色
+rgb_label_pattern = re.compile(r"^RGB\((\d+), (\d+), (\d+)\)$")
+fallback_color = "#999999"
+
+
+def read_extracted_rows(path: str) -> list:
+    """读取抽取结果 .txt (首行为说明, 之后每行一个 JSON 对象并以逗号结尾)"""
+    with open(path, "r", encoding="utf-8") as f:
+        f.readline()
+        body = f.read().strip().rstrip(",")
+    return json.loads(f"[{body}]")
+
+
+def _axis(metadata: dict, name: str) -> dict:
+    """返回 metadata 中的坐标轴信息, 缺失时为空字典"""
+    return metadata.get(name) or {}
+
+
+def _color_encoding(metadata: dict, rows: list) -> dict:
+    """由图例构建颜色比例尺; 无图例时直接使用分类名称中的 RGB 颜色"""
+    legend = metadata.get("legend")
+    domain, colors = [], []
+    if isinstance(legend, dict) and legend.get("items") and legend.get("colors"):
+        for item, color in zip(legend["items"], legend["colors"]):
+            domain.append(item)
+            colors.append(color)
+
+    # 补上图例中没有的分类 (例如 Unknown 或无图例时的 RGB(...) 名称)
+    known = set(domain)
+    for row in rows:
+        category = row.get("category")
+        if category is not None and category not in known:
+            known.add(category)
+            domain.append(category)
+            match = rgb_label_pattern.match(category)
+            colors.append("#{:02x}{:02x}{:02x}".format(*map(int, match.groups())) if match else fallback_color)
+
+    encoding = {"field": "category", "type": "nominal", "scale": {"domain": domain, "range": colors}}
+    title = legend.get("title") if isinstance(legend, dict) else None
+    if title:
+        encoding["title"] = title
+    return encoding
+
+
+def _position_encoding(field: str, axis: dict, default_type: str) -> dict:
+    """构建 x / y 位置编码, 坐标轴标题取自 metadata 中的 name"""
+    encoding = {"field": field, "type": axis_types.get(axis.get("type"), default_type)}
+    if axis.get("name"):
+        encoding["title"] = axis["name"]
+    return encoding
+
+
+def build_spec(chart_type: str, rows: list, metadata: dict, name: str = None) -> dict:
+    """由抽取出的数据行与清洗后的 metadata 构建完整的 Vega-Lite 规范"""
+    if chart_type not in mark_types:
+        raise ValueError(f"不支持的图表类型: {chart_type}")
+
+    spec = {"$schema": vega_lite_schema}
+    if name:
+        spec["name"] = name
+    if metadata.get("title"):
+        spec["title"] = metadata["title"]
+    spec["data"] = {"values": rows}
+    spec["mark"] = {"type": mark_types[chart_type], "tooltip": True}
+
+    x_axis, y_axis = _axis(metadata, "xAxis"), _axis(metadata, "yAxis")
+    if chart_type == "pie":
+        encoding = {"theta": {"field": "percentage", "type": "quantitative", "stack": True}}
+    elif chart_type in ("bar", "stackbar"):
+        # 分类轴保持 metadata 中刻度的顺序
+        x_encoding = _position_encoding("x", x_axis, "nominal")
+        if x_encoding["type"] == "quantitative":
+            x_encoding["type"] = "ordinal"
+        if x_axis.get("ticks"):
+            x_encoding["sort"] = list(x_axis["ticks"])
+        encoding = {"x": x_encoding, "y": _position_encoding("y", y_axis, "quantitative")}
+        if chart_type == "stackbar":
+            encoding["y"]["stack"] = "zero"
+    else:
+        encoding = {
+            "x": _position_encoding("x", x_axis, "quantitative"),
+            "y": _position_encoding("y", y_axis, "quantitative"),
+        }
+        # 分箱聚合后的散点图 (scatter_data_extractor.py --bins) 以点的大小表示数量
+        if chart_type == "scatter" and rows and "count" in rows[0]:
+            encoding["size"] = {"field": "count", "type": "quantitative"}
+    encoding["color"] = _color_encoding(metadata, rows)
+    spec["encoding"] = encoding
+    return spec
+
+
+def dumps_spec(spec: dict) -> str:
+    """一次序列化为紧凑的单行 JSON 字符串"""
+    return json.dumps(spec, ensure_ascii=False, separators=(",", ":"))
+
+
+def write_spec(path: str, spec: dict):
+    """将单个 Vega-Lite 规范一次写入文件"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f_out:
+        f_out.write(dumps_spec(spec))
+
+
+def write_ndjson(path: str, serialized_specs: list):
+    """将多个已序列化的规范按每行一个写成 NDJSON, 整个文件只写入一次"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f_out:
+        f_out.write("".join(spec + "\n" for spec in serialized_specs))
+
+
+def emit_chart(chart_type: str, chart_name: str, metadata: dict = None) -> str:
+    """
+    由 extracted_data 与 cleaned_meta_data 生成单个图表的 Vega-Lite 文件, 返回输出路径
+    metadata 已在内存中 (pipeline 的内存模式) 时不再读取 cleaned_meta_data
+    """
+    rows = read_extracted_rows(os.path.join(extracted_data_dir, chart_type, chart_name + ".txt"))
+    if metadata is None:
+        with open(os.path.join(meta_data_dir, chart_type, chart_name + ".json"), "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+
+    output_path = os.path.join(output_dir, chart_type, chart_name + ".json")
+    write_spec(output_path, build_spec(chart_type, rows, metadata, f"{chart_type}/{chart_name}"))
+    return output_path
+
+
+if __name__ == "__main__":
+    # 传入 --ndjson <路径> 时, 额外把所有规范合并为一个 NDJSON 文件
+    ndjson_path = sys.argv[sys.argv.index("--ndjson") + 1] if "--ndjson" in sys.argv else None
+
+    serialized = []
+    for chart_type in mark_types:
+        chart_path = os.path.join(extracted_data_dir, chart_type)
+        if not os.path.isdir(chart_path):
+            continue
+        for file_name in sorted(os.listdir(chart_path)):
+            if file_name.endswith(".txt"):
+                output_path = emit_chart(chart_type, os.path.splitext(file_name)[0])
+                print(f"Vega-Lite 规范已保存: {output_path}")
+                if ndjson_path:
+                    with open(output_path, "r", encoding="utf-8") as f:
+                        serialized.append(f.read())
+
+    if ndjson_path:
+        write_ndjson(ndjson_path, serialized)
+        print(f"NDJSON 已保存: {ndjson_path} ({len(serialized)} 个规范)")